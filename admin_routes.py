@@ -1,72 +1,132 @@
 from flask import Blueprint, render_template, request, jsonify, redirect, url_for, flash
-from models import db, FoundationalPrinciple, CorePillar, SustainabilityStrategy, Project, Contributor, Certification, Synergy
+from models import (db, FoundationalPrinciple, CorePillar, SustainabilityStrategy, Project, Contributor, Certification, Synergy,
+                    COST_LEVELS, PERFORMANCE_LEVELS, level_error)
+from admin_tables import AdminTable
+from filters import LIKE_ESCAPE, contains_pattern
+from cache import all_certifications, all_synergies, principle_choices
+from serializers import serializer_for
+from stats import dashboard_stats
+from storage import store_upload
 from werkzeug.utils import secure_filename
 import os
+import tempfile
 
 admin_bp = Blueprint('admin', __name__)
 
-ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
-
-def allowed_file(filename):
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
-
-def save_uploaded_file(file, folder=''):
-    """Save uploaded file and return the relative URL"""
-    if file and allowed_file(file.filename):
-        filename = secure_filename(file.filename)
-        import time
-        filename = f"{int(time.time())}_{filename}"
-        filepath = os.path.join('uploads', folder, filename)
-        os.makedirs(os.path.dirname(filepath), exist_ok=True)
-        file.save(filepath)
-        return f"/uploads/{folder}/{filename}"
-    return None
+# Admin list views: ?sort= keys -> columns, and the columns ?q= searches
+PRINCIPLE_TABLE = AdminTable(
+    FoundationalPrinciple,
+    sortable={'id': FoundationalPrinciple.id, 'name': FoundationalPrinciple.name,
+              'core_pillars': FoundationalPrinciple.core_pillars_count},
+    searchable=[FoundationalPrinciple.name, FoundationalPrinciple.description],
+)
+PILLAR_TABLE = AdminTable(
+    CorePillar,
+    sortable={'id': CorePillar.id, 'name': CorePillar.name, 'author': CorePillar.author,
+              'principle': CorePillar.computed_columns()['foundational_principle_name'],
+              'strategies': CorePillar.sustainability_strategies_count},
+    searchable=[CorePillar.name, CorePillar.author, CorePillar.description],
+)
+STRATEGY_TABLE = AdminTable(
+    SustainabilityStrategy,
+    sortable={'id': SustainabilityStrategy.id, 'name': SustainabilityStrategy.name,
+              'author': SustainabilityStrategy.author, 'cost': SustainabilityStrategy.cost,
+              'performance': SustainabilityStrategy.performance_contribution},
+    searchable=[SustainabilityStrategy.name, SustainabilityStrategy.author, SustainabilityStrategy.description],
+)
+PROJECT_TABLE = AdminTable(
+    Project,
+    sortable={'id': Project.id, 'name': Project.project_name, 'size': Project.project_size,
+              'construction_type': Project.construction_type, 'project_type': Project.project_type,
+              'design_stage': Project.design_stage},
+    searchable=[Project.project_name, Project.project_address, Project.project_type],
+)
+CONTRIBUTOR_TABLE = AdminTable(
+    Contributor,
+    sortable={'id': Contributor.id, 'name': Contributor.name, 'role': Contributor.role, 'email': Contributor.email},
+    searchable=[Contributor.name, Contributor.role, Contributor.email],
+)
+LOOKUP_LIMIT = 50
 
 @admin_bp.route('/')
 def dashboard():
     """Admin dashboard"""
-    stats = {
-        'foundational_principles': FoundationalPrinciple.query.count(),
-        'core_pillars': CorePillar.query.count(),
-        'sustainability_strategies': SustainabilityStrategy.query.count(),
-        'projects': Project.query.count(),
-        'contributors': Contributor.query.count()
-    }
-    return render_template('admin/index.html', stats=stats)
+    return render_template('admin/index.html', stats=dashboard_stats())
+
+@admin_bp.route('/import', methods=['POST'])
+def import_data():
+    """Import an uploaded .xlsx workbook or .csv file"""
+    from importer import import_file
+    file = request.files.get('file')
+    if not file or not file.filename.lower().endswith(('.xlsx', '.csv')):
+        flash('Please choose an .xlsx or .csv file', 'error')
+        return redirect(url_for('admin.dashboard'))
+    
+    suffix = os.path.splitext(file.filename)[1].lower()
+    handle, path = tempfile.mkstemp(suffix=suffix)
+    try:
+        with os.fdopen(handle, 'wb') as out:
+            file.save(out)
+        resource = os.path.splitext(secure_filename(file.filename))[0] if suffix == '.csv' else None
+        report = import_file(path, resource).to_dict()
+        errors = sum(len(r['errors']) for r in report['resources'].values())
+        created = sum(r['created'] for r in report['resources'].values())
+        updated = sum(r['updated'] for r in report['resources'].values())
+        flash(f"Imported {report['rows']} rows ({created} created, {updated} updated, {errors} errors) "
+              f"in {report['seconds']}s ({report['rows_per_sec']} rows/sec)", 'error' if errors else 'success')
+    except Exception as e:
+        db.session.rollback()
+        flash(f'Error importing file: {str(e)}', 'error')
+    finally:
+        os.remove(path)
+    
+    return redirect(url_for('admin.dashboard'))
 
 @admin_bp.route('/foundational-principles')
 def foundational_principles():
-    """View all foundational principles"""
-    principles = FoundationalPrinciple.query.all()
-    return render_template('admin/foundational_principles.html', principles=principles)
+    """View foundational principles"""
+    return render_template('admin/foundational_principles.html', table=PRINCIPLE_TABLE.page())
 
 @admin_bp.route('/core-pillars')
 def core_pillars():
-    """View all core pillars"""
-    pillars = CorePillar.query.all()
-    principles = FoundationalPrinciple.query.all()
-    certifications = Certification.query.all()
-    return render_template('admin/core_pillars.html', pillars=pillars, principles=principles, certifications=certifications)
+    """View core pillars"""
+    principles = principle_choices()
+    certifications = all_certifications()
+    return render_template('admin/core_pillars.html', table=PILLAR_TABLE.page(), principles=principles,
+                           certifications=certifications)
+
+@admin_bp.route('/core-pillars/lookup')
+def core_pillar_lookup():
+    """Pillars whose name contains ?q=, for the typeahead pillar pickers"""
+    q = (request.args.get('q') or '').strip()
+    limit = min(max(request.args.get('limit', 10, type=int), 1), LOOKUP_LIMIT)
+    query = CorePillar.query
+    if q:
+        query = query.filter(CorePillar.name.ilike(contains_pattern(q), escape=LIKE_ESCAPE))
+    serializer = serializer_for(CorePillar, ['id', 'name', 'foundational_principle_name'])
+    return jsonify(serializer.fetch(query.order_by(CorePillar.name, CorePillar.id).limit(limit)))
 
 @admin_bp.route('/sustainability-strategies')
 def sustainability_strategies():
-    """View all sustainability strategies"""
-    strategies = SustainabilityStrategy.query.all()
-    pillars = CorePillar.query.all()
-    synergies = Synergy.query.all()
-    return render_template('admin/sustainability_strategies.html', strategies=strategies, pillars=pillars, synergies=synergies)
+    """View sustainability strategies, optionally those of one pillar (?core_pillar_id=)"""
+    query, pillar = None, None
+    pillar_id = request.args.get('core_pillar_id', type=int)
+    if pillar_id is not None:
+        pillar = db.session.get(CorePillar, pillar_id)
+        query = SustainabilityStrategy.query.filter_by(core_pillar_id=pillar_id)
+    synergies = all_synergies()
+    return render_template('admin/sustainability_strategies.html', table=STRATEGY_TABLE.page(query), pillar=pillar,
+                           synergies=synergies, cost_levels=COST_LEVELS, performance_levels=PERFORMANCE_LEVELS)
 
 @admin_bp.route('/projects')
 def projects():
-    """View all projects"""
-    projects = Project.query.all()
-    return render_template('admin/projects.html', projects=projects)
+    """View projects"""
+    return render_template('admin/projects.html', table=PROJECT_TABLE.page())
 
 @admin_bp.route('/contributors')
 def contributors():
-    """View all contributors"""
-    contributors = Contributor.query.all()
-    return render_template('admin/contributors.html', contributors=contributors)
+    """View contributors"""
+    return render_template('admin/contributors.html', table=CONTRIBUTOR_TABLE.page())
 
 # CRUD operations via forms
 @admin_bp.route('/core-pillars/create', methods=['POST'])
@@ -84,7 +144,7 @@ def create_core_pillar():
         # Handle image upload
         if 'image' in request.files:
             file = request.files['image']
-            image_url = save_uploaded_file(file, 'core-pillars')
+            image_url = store_upload(file)
             if image_url:
                 pillar.image_url = image_url
         
@@ -109,7 +169,7 @@ def upload_core_pillar_image(pillar_id):
     pillar = CorePillar.query.get_or_404(pillar_id)
     if 'image' in request.files:
         file = request.files['image']
-        image_url = save_uploaded_file(file, 'core-pillars')
+        image_url = store_upload(file)
         if image_url:
             pillar.image_url = image_url
             db.session.commit()
@@ -128,9 +188,18 @@ def delete_core_pillar(pillar_id):
 @admin_bp.route('/sustainability-strategies/create', methods=['POST'])
 def create_sustainability_strategy():
     """Create sustainability strategy via form"""
+    for column in (SustainabilityStrategy.cost, SustainabilityStrategy.performance_contribution):
+        error = level_error(column, request.form.get(column.key))
+        if error:
+            flash(f'Error creating strategy: {error}', 'error')
+            return redirect(url_for('admin.sustainability_strategies'))
+    pillar_id = request.form.get('core_pillar_id', type=int)
+    if pillar_id is None or db.session.get(CorePillar, pillar_id) is None:
+        flash('Error creating strategy: choose a core pillar from the suggestions', 'error')
+        return redirect(url_for('admin.sustainability_strategies'))
     try:
         strategy = SustainabilityStrategy(
-            core_pillar_id=request.form.get('core_pillar_id'),
+            core_pillar_id=pillar_id,
             name=request.form.get('name'),
             description=request.form.get('description'),
             text_content=request.form.get('text_content'),
@@ -142,7 +211,7 @@ def create_sustainability_strategy():
         # Handle image upload
         if 'image' in request.files:
             file = request.files['image']
-            image_url = save_uploaded_file(file, 'strategies')
+            image_url = store_upload(file)
             if image_url:
                 strategy.image_url = image_url
         
@@ -214,7 +283,7 @@ def create_contributor():
         # Handle image upload
         if 'image' in request.files:
             file = request.files['image']
-            image_url = save_uploaded_file(file, 'contributors')
+            image_url = store_upload(file)
             if image_url:
                 contributor.image_url = image_url
         
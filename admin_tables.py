@@ -0,0 +1,105 @@
+"""Server-side pagination, sorting and search for the admin list pages.
+
+An ``AdminTable`` turns ``?page=``, ``?per_page=``, ``?sort=`` (a column key,
+``-`` prefix for descending) and ``?q=`` into a page of rows. Each page costs
+the same few queries whatever the table size: a COUNT for the page links and
+the page itself with the model's loading plan (joined names, counts as
+subqueries, collections by selectin). Unknown or malformed parameters fall
+back to the defaults instead of failing the page.
+"""
+import math
+import re
+
+from flask import request, url_for
+from sqlalchemy import func, or_
+
+from filters import LIKE_ESCAPE, contains_pattern
+
+PER_PAGE_CHOICES = (25, 50, 100)
+
+
+class TablePage:
+    """One page of an admin table plus what the template needs to link to others"""
+
+    def __init__(self, items, total, page, per_page, sort, q):
+        self.items = items
+        self.total = total
+        self.page = page
+        self.per_page = per_page
+        self.pages = max(1, math.ceil(total / per_page))
+        self.sort = sort
+        self.q = q
+        self.first = (page - 1) * per_page + 1 if total else 0
+        self.last = min(page * per_page, total)
+
+    def url(self, **changes):
+        """URL of this view with the current parameters, updated by ``changes``"""
+        args = request.args.to_dict()
+        args.update(changes)
+        return url_for(request.endpoint, **{k: v for k, v in args.items() if v not in (None, '')})
+
+    def sort_url(self, key):
+        """Link for a column header: sort by ``key``, or reverse it if already sorted by it"""
+        return self.url(sort='-' + key if self.sort == key else key, page=None)
+
+    def sort_indicator(self, key):
+        if self.sort == key:
+            return '▲'
+        if self.sort == '-' + key:
+            return '▼'
+        return ''
+
+    def window(self, size=2):
+        """Page numbers to link around the current one (None marks a gap)"""
+        shown = sorted({1, self.pages, *range(max(1, self.page - size), min(self.pages, self.page + size) + 1)})
+        numbers = []
+        for number in shown:
+            if numbers and number - numbers[-1] > 1:
+                numbers.append(None)
+            numbers.append(number)
+        return numbers
+
+
+class AdminTable:
+    """Sortable, searchable, paginated listing of ``model``"""
+
+    def __init__(self, model, sortable, searchable, default_sort='id', per_page=PER_PAGE_CHOICES[0]):
+        self.model = model
+        self.sortable = sortable      # ?sort= key -> column or SQL expression
+        self.searchable = searchable  # columns ?q= terms are matched against
+        self.default_sort = default_sort
+        self.per_page = per_page
+
+    def _order(self, sort):
+        key = sort.lstrip('-')
+        if key not in self.sortable:
+            sort, key = self.default_sort, self.default_sort.lstrip('-')
+        column = self.sortable[key]
+        order = column.desc() if sort.startswith('-') else column.asc()
+        # id breaks ties so pages don't overlap
+        return sort, [order, self.model.id.desc() if sort.startswith('-') else self.model.id.asc()]
+
+    def search(self, query, q):
+        """Rows where every word of ``q`` appears in one of the searchable columns"""
+        for term in re.findall(r'\w+', q, flags=re.UNICODE):
+            pattern = contains_pattern(term)
+            query = query.filter(or_(*[column.ilike(pattern, escape=LIKE_ESCAPE) for column in self.searchable]))
+        return query
+
+    def page(self, query=None):
+        """The page of ``query`` (default: every row) described by the request's parameters"""
+        query = self.model.query if query is None else query
+        q = (request.args.get('q') or '').strip()
+        if q:
+            query = self.search(query, q)
+        per_page = request.args.get('per_page', self.per_page, type=int)
+        if per_page not in PER_PAGE_CHOICES:
+            per_page = self.per_page
+        sort, order = self._order(request.args.get('sort') or self.default_sort)
+
+        total = query.with_entities(func.count(self.model.id)).order_by(None).scalar()
+        pages = max(1, math.ceil(total / per_page))
+        page = min(max(request.args.get('page', 1, type=int), 1), pages)
+        items = (query.options(*self.model.loading_plan())
+                 .order_by(*order).limit(per_page).offset((page - 1) * per_page).all())
+        return TablePage(items, total, page, per_page, sort, q)
@@ -1,40 +1,37 @@
 from flask import Blueprint, request, jsonify, send_from_directory
-from models import db, FoundationalPrinciple, CorePillar, SustainabilityStrategy, Project, Contributor, Certification, Synergy
-from werkzeug.utils import secure_filename
-import os
+from models import db, FoundationalPrinciple, CorePillar, SustainabilityStrategy, Project, Contributor, Certification, Synergy, level_error
+from pagination import list_response, QueryParamError
+from hierarchy import get_hierarchy_snapshot, HIERARCHY_TABLES
+from conditional import conditional
+from cache import certifications_body, synergies_body, reference_cache
+from search import search
+from filters import CORE_PILLAR_FILTERS, STRATEGY_FILTERS
+from recommend import recommend
+from similarity import similar_response, co_occurrence
+from bulk import (bulk_upsert_response, bulk_delete_response, missing_fields_error,
+                  CORE_PILLAR_BULK, STRATEGY_BULK, PROJECT_BULK, CONTRIBUTOR_BULK)
+from stats import dashboard_stats, STATS_TABLES
+from storage import store_upload
 
 api_bp = Blueprint('api', __name__)
 
-ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
-
-def allowed_file(filename):
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
-
-def save_uploaded_file(file, folder=''):
-    """Save uploaded file and return the relative URL"""
-    if file and allowed_file(file.filename):
-        filename = secure_filename(file.filename)
-        # Add timestamp to avoid conflicts
-        import time
-        filename = f"{int(time.time())}_{filename}"
-        filepath = os.path.join('uploads', folder, filename)
-        os.makedirs(os.path.dirname(filepath), exist_ok=True)
-        file.save(filepath)
-        return f"/uploads/{folder}/{filename}"
-    return None
+@api_bp.errorhandler(QueryParamError)
+def handle_query_param_error(error):
+    return jsonify({'error': str(error)}), 400
 
 # ==================== FOUNDATIONAL PRINCIPLES ====================
 
 @api_bp.route('/foundational-principles', methods=['GET'])
+@conditional(*FoundationalPrinciple.dependent_tables())
 def get_foundational_principles():
     """Get all foundational principles"""
-    principles = FoundationalPrinciple.query.all()
-    return jsonify([p.to_dict() for p in principles])
+    return list_response(FoundationalPrinciple.query, FoundationalPrinciple)
 
 @api_bp.route('/foundational-principles/<int:principle_id>', methods=['GET'])
+@conditional(*FoundationalPrinciple.dependent_tables())
 def get_foundational_principle(principle_id):
     """Get a specific foundational principle"""
-    principle = FoundationalPrinciple.query.get_or_404(principle_id)
+    principle = FoundationalPrinciple.query.options(*FoundationalPrinciple.loading_plan()).get_or_404(principle_id)
     return jsonify(principle.to_dict())
 
 @api_bp.route('/foundational-principles', methods=['POST'])
@@ -67,28 +64,45 @@ def delete_foundational_principle(principle_id):
     db.session.commit()
     return jsonify({'message': 'Deleted successfully'}), 200
 
+# ==================== HIERARCHY ====================
+
+@api_bp.route('/hierarchy', methods=['GET'])
+@conditional(*HIERARCHY_TABLES)
+def get_hierarchy():
+    """Get the full Principles -> Pillars -> Strategies tree"""
+    return get_hierarchy_snapshot().body.response()
+
+# ==================== SEARCH ====================
+
+@api_bp.route('/search', methods=['GET'])
+@conditional('core_pillar', 'sustainability_strategy')
+def search_content():
+    """Full-text search over core pillars and sustainability strategies"""
+    return jsonify(search())
+
 # ==================== CORE PILLARS ====================
 
 @api_bp.route('/core-pillars', methods=['GET'])
+@conditional(*CorePillar.dependent_tables())
 def get_core_pillars():
-    """Get all core pillars"""
-    principle_id = request.args.get('principle_id', type=int)
-    query = CorePillar.query
-    if principle_id:
-        query = query.filter_by(foundational_principle_id=principle_id)
-    pillars = query.all()
-    return jsonify([p.to_dict() for p in pillars])
+    """Get all core pillars (filterable, with optional ?facets= counts)"""
+    query = CORE_PILLAR_FILTERS.apply(CorePillar.query)
+    return list_response(query, CorePillar, facets=CORE_PILLAR_FILTERS.facet_counts())
 
 @api_bp.route('/core-pillars/<int:pillar_id>', methods=['GET'])
+@conditional(*CorePillar.dependent_tables())
 def get_core_pillar(pillar_id):
     """Get a specific core pillar"""
-    pillar = CorePillar.query.get_or_404(pillar_id)
+    pillar = CorePillar.query.options(*CorePillar.loading_plan()).get_or_404(pillar_id)
     return jsonify(pillar.to_dict())
 
 @api_bp.route('/core-pillars', methods=['POST'])
 def create_core_pillar():
     """Create a new core pillar"""
     data = request.json
+    error = missing_fields_error(CORE_PILLAR_BULK, data)
+    if error:
+        return jsonify({'error': error}), 400
     pillar = CorePillar(
         foundational_principle_id=data.get('foundational_principle_id'),
         name=data.get('name'),
@@ -141,35 +155,61 @@ def upload_core_pillar_image(pillar_id):
         return jsonify({'error': 'No file provided'}), 400
     
     file = request.files['image']
-    image_url = save_uploaded_file(file, 'core-pillars')
+    image_url = store_upload(file)
     if image_url:
         pillar.image_url = image_url
         db.session.commit()
         return jsonify({'image_url': image_url}), 200
     return jsonify({'error': 'Invalid file type'}), 400
 
+@api_bp.route('/core-pillars/bulk', methods=['POST'])
+def bulk_upsert_core_pillars():
+    """Create (no id) or update (with id) many core pillars in one transaction"""
+    return bulk_upsert_response(CORE_PILLAR_BULK)
+
+@api_bp.route('/core-pillars/bulk', methods=['DELETE'])
+def bulk_delete_core_pillars():
+    """Delete many core pillars in one transaction"""
+    return bulk_delete_response(CORE_PILLAR_BULK)
+
 # ==================== SUSTAINABILITY STRATEGIES ====================
 
+def strategy_rating_error(data):
+    """Validation message for invalid cost/performance_contribution labels"""
+    for column in (SustainabilityStrategy.cost, SustainabilityStrategy.performance_contribution):
+        if data.get(column.key) is not None:
+            error = level_error(column, data[column.key])
+            if error:
+                return error
+    return None
+
 @api_bp.route('/sustainability-strategies', methods=['GET'])
+@conditional(*SustainabilityStrategy.dependent_tables())
 def get_sustainability_strategies():
-    """Get all sustainability strategies"""
-    pillar_id = request.args.get('pillar_id', type=int)
-    query = SustainabilityStrategy.query
-    if pillar_id:
-        query = query.filter_by(core_pillar_id=pillar_id)
-    strategies = query.all()
-    return jsonify([s.to_dict() for s in strategies])
+    """Get all sustainability strategies (filterable, with optional ?facets= counts)"""
+    query = STRATEGY_FILTERS.apply(SustainabilityStrategy.query)
+    return list_response(query, SustainabilityStrategy, facets=STRATEGY_FILTERS.facet_counts())
 
 @api_bp.route('/sustainability-strategies/<int:strategy_id>', methods=['GET'])
+@conditional(*SustainabilityStrategy.dependent_tables())
 def get_sustainability_strategy(strategy_id):
     """Get a specific sustainability strategy"""
-    strategy = SustainabilityStrategy.query.get_or_404(strategy_id)
+    strategy = SustainabilityStrategy.query.options(*SustainabilityStrategy.loading_plan()).get_or_404(strategy_id)
     return jsonify(strategy.to_dict())
 
+@api_bp.route('/sustainability-strategies/<int:strategy_id>/similar', methods=['GET'])
+@conditional('sustainability_strategy', 'strategy_synergies', 'synergy')
+def get_similar_strategies(strategy_id):
+    """Strategies sharing synergies with this one, ranked by Jaccard similarity"""
+    return jsonify(similar_response(strategy_id))
+
 @api_bp.route('/sustainability-strategies', methods=['POST'])
 def create_sustainability_strategy():
     """Create a new sustainability strategy"""
     data = request.json
+    error = missing_fields_error(STRATEGY_BULK, data) or strategy_rating_error(data)
+    if error:
+        return jsonify({'error': error}), 400
     strategy = SustainabilityStrategy(
         core_pillar_id=data.get('core_pillar_id'),
         name=data.get('name'),
@@ -195,6 +235,9 @@ def update_sustainability_strategy(strategy_id):
     """Update a sustainability strategy"""
     strategy = SustainabilityStrategy.query.get_or_404(strategy_id)
     data = request.json
+    error = strategy_rating_error(data)
+    if error:
+        return jsonify({'error': error}), 400
     strategy.name = data.get('name', strategy.name)
     strategy.description = data.get('description', strategy.description)
     strategy.text_content = data.get('text_content', strategy.text_content)
@@ -226,31 +269,52 @@ def upload_strategy_image(strategy_id):
         return jsonify({'error': 'No file provided'}), 400
     
     file = request.files['image']
-    image_url = save_uploaded_file(file, 'strategies')
+    image_url = store_upload(file)
     if image_url:
         strategy.image_url = image_url
         db.session.commit()
         return jsonify({'image_url': image_url}), 200
     return jsonify({'error': 'Invalid file type'}), 400
 
+@api_bp.route('/sustainability-strategies/bulk', methods=['POST'])
+def bulk_upsert_sustainability_strategies():
+    """Create (no id) or update (with id) many sustainability strategies in one transaction"""
+    return bulk_upsert_response(STRATEGY_BULK)
+
+@api_bp.route('/sustainability-strategies/bulk', methods=['DELETE'])
+def bulk_delete_sustainability_strategies():
+    """Delete many sustainability strategies in one transaction"""
+    return bulk_delete_response(STRATEGY_BULK)
+
 # ==================== PROJECTS ====================
 
 @api_bp.route('/projects', methods=['GET'])
+@conditional(*Project.dependent_tables())
 def get_projects():
     """Get all projects"""
-    projects = Project.query.all()
-    return jsonify([p.to_dict() for p in projects])
+    return list_response(Project.query, Project)
 
 @api_bp.route('/projects/<int:project_id>', methods=['GET'])
+@conditional(*Project.dependent_tables())
 def get_project(project_id):
     """Get a specific project"""
     project = Project.query.get_or_404(project_id)
     return jsonify(project.to_dict())
 
+@api_bp.route('/projects/<int:project_id>/recommended-strategies', methods=['GET'])
+@conditional('project', 'sustainability_strategy', 'strategy_synergies', 'synergy')
+def get_recommended_strategies(project_id):
+    """Top strategies for a project, scored on performance, cost and synergy fit"""
+    project = Project.query.get_or_404(project_id)
+    return jsonify(recommend(project))
+
 @api_bp.route('/projects', methods=['POST'])
 def create_project():
     """Create a new project"""
     data = request.json
+    error = missing_fields_error(PROJECT_BULK, data)
+    if error:
+        return jsonify({'error': error}), 400
     project = Project(
         project_name=data.get('project_name'),
         project_size=data.get('project_size'),
@@ -285,15 +349,26 @@ def delete_project(project_id):
     db.session.commit()
     return jsonify({'message': 'Deleted successfully'}), 200
 
+@api_bp.route('/projects/bulk', methods=['POST'])
+def bulk_upsert_projects():
+    """Create (no id) or update (with id) many projects in one transaction"""
+    return bulk_upsert_response(PROJECT_BULK)
+
+@api_bp.route('/projects/bulk', methods=['DELETE'])
+def bulk_delete_projects():
+    """Delete many projects in one transaction"""
+    return bulk_delete_response(PROJECT_BULK)
+
 # ==================== CONTRIBUTORS ====================
 
 @api_bp.route('/contributors', methods=['GET'])
+@conditional(*Contributor.dependent_tables())
 def get_contributors():
     """Get all contributors"""
-    contributors = Contributor.query.all()
-    return jsonify([c.to_dict() for c in contributors])
+    return list_response(Contributor.query, Contributor)
 
 @api_bp.route('/contributors/<int:contributor_id>', methods=['GET'])
+@conditional(*Contributor.dependent_tables())
 def get_contributor(contributor_id):
     """Get a specific contributor"""
     contributor = Contributor.query.get_or_404(contributor_id)
@@ -303,6 +378,9 @@ def get_contributor(contributor_id):
 def create_contributor():
     """Create a new contributor"""
     data = request.json
+    error = missing_fields_error(CONTRIBUTOR_BULK, data)
+    if error:
+        return jsonify({'error': error}), 400
     contributor = Contributor(
         name=data.get('name'),
         role=data.get('role'),
@@ -335,19 +413,54 @@ def delete_contributor(contributor_id):
     db.session.commit()
     return jsonify({'message': 'Deleted successfully'}), 200
 
+@api_bp.route('/contributors/bulk', methods=['POST'])
+def bulk_upsert_contributors():
+    """Create (no id) or update (with id) many contributors in one transaction"""
+    return bulk_upsert_response(CONTRIBUTOR_BULK)
+
+@api_bp.route('/contributors/bulk', methods=['DELETE'])
+def bulk_delete_contributors():
+    """Delete many contributors in one transaction"""
+    return bulk_delete_response(CONTRIBUTOR_BULK)
+
 # ==================== CERTIFICATIONS ====================
 
 @api_bp.route('/certifications', methods=['GET'])
+@conditional(*Certification.dependent_tables())
 def get_certifications():
     """Get all certifications"""
-    certifications = Certification.query.all()
-    return jsonify([c.to_dict() for c in certifications])
+    if not request.args:
+        return certifications_body().response()
+    return list_response(Certification.query, Certification)
 
 # ==================== SYNERGIES ====================
 
 @api_bp.route('/synergies', methods=['GET'])
+@conditional(*Synergy.dependent_tables())
 def get_synergies():
     """Get all synergies"""
-    synergies = Synergy.query.all()
-    return jsonify([s.to_dict() for s in synergies])
+    if not request.args:
+        return synergies_body().response()
+    return list_response(Synergy.query, Synergy)
+
+@api_bp.route('/synergies/co-occurrence', methods=['GET'])
+@conditional('sustainability_strategy', 'strategy_synergies', 'synergy')
+def get_synergy_co_occurrence():
+    """How many strategies have each pair of synergies"""
+    return jsonify(co_occurrence())
+
+# ==================== STATS ====================
+
+@api_bp.route('/stats', methods=['GET'])
+@conditional(*STATS_TABLES)
+def get_stats():
+    """Get row counts and strategy breakdowns (cost, performance, principle, synergy/certification usage)"""
+    return jsonify(dashboard_stats())
+
+# ==================== CACHE ====================
+
+@api_bp.route('/cache/stats', methods=['GET'])
+def get_cache_stats():
+    """Get reference data cache hit/miss counters"""
+    return jsonify(reference_cache.stats())
 
@@ -1,16 +1,27 @@
 from flask import Flask, render_template, request, jsonify, send_from_directory
 from flask_cors import CORS
+import click
 from models import db
+from database import configure_app
 from api_routes import api_bp
 from admin_routes import admin_bp
+from uploads import uploads_bp
+from storage import init_storage
+from profiling import init_profiling
+from serializers import init_json
+from compression import init_compression
 import os
 
 app = Flask(__name__)
+init_json(app)  # orjson for jsonify when installed
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev-secret-key-change-in-production-12345')
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///sustainability_db.sqlite'
+configure_app(app)  # DATABASE_URL, pool and SQLite settings from the environment
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['UPLOAD_FOLDER'] = 'uploads'
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
+# Hand upload transfers to the web server (see uploads.py)
+app.config['UPLOAD_ACCEL_REDIRECT'] = os.environ.get('UPLOAD_ACCEL_REDIRECT')
+app.config['USE_X_SENDFILE'] = os.environ.get('USE_X_SENDFILE') == '1'
 
 # Create upload folder if it doesn't exist
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
@@ -18,34 +29,93 @@ os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 # Initialize extensions
 db.init_app(app)
 CORS(app)  # Enable CORS for API endpoints
+init_storage(app)  # Content-addressed upload storage (local disk)
 
 # Register blueprints
 app.register_blueprint(api_bp, url_prefix='/api')
 app.register_blueprint(admin_bp, url_prefix='/admin')
+app.register_blueprint(uploads_bp)
+init_profiling(app)  # Server-Timing, /metrics and ?profile=1
+# Registered last so it runs first: timings and sizes include compression
+init_compression(app)
 
 @app.route('/')
 def index():
     """Redirect to admin dashboard"""
     return render_template('admin/index.html')
 
-@app.route('/uploads/<filename>')
-def uploaded_file(filename):
-    """Serve uploaded files"""
-    return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
-
 def init_db():
     """Initialize database with sample data"""
     with app.app_context():
-        db.create_all()
+        from migrations import upgrade
+        upgrade()
         
         # Import after app context to avoid circular imports
         from init_data import init_sample_data
         init_sample_data()
 
+@app.cli.command('upgrade-db')
+def upgrade_db():
+    """Create missing tables and apply pending schema migrations"""
+    from migrations import upgrade
+    applied = upgrade()
+    for name in applied:
+        print(f"Applied: {name}")
+    print("Database is up to date" if not applied else f"{len(applied)} migration(s) applied")
+
+@app.cli.command('import-data')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--resource', help='Resource for a CSV file (defaults to the file name)')
+@click.option('--batch-size', default=500, show_default=True, help='Rows per upsert batch')
+def import_data(path, resource, batch_size):
+    """Import an .xlsx workbook or .csv file without dropping existing data"""
+    from importer import import_file
+    from migrations import upgrade
+    upgrade()
+    report = import_file(path, resource, batch_size).to_dict()
+    for name, counts in report['resources'].items():
+        print(f"{name}: {counts['rows']} rows, {counts['created']} created, "
+              f"{counts['updated']} updated, {len(counts['errors'])} errors")
+        for error in counts['errors'][:10]:
+            print(f"  row {error['row']}: {error['error']}")
+    if report['skipped_sheets']:
+        print(f"Skipped sheets: {', '.join(report['skipped_sheets'])}")
+    print(f"{report['rows']} rows in {report['seconds']}s ({report['rows_per_sec']} rows/sec)")
+
+@app.cli.command('gc-uploads')
+def gc_uploads():
+    """Delete stored uploads that no pillar, strategy or contributor refers to (past the grace period)"""
+    from storage import collect_garbage
+    deleted = collect_garbage()
+    for key in deleted:
+        print(f"Deleted: {key}")
+    print(f"{len(deleted)} unreferenced upload(s) deleted")
+
+@app.cli.command('check-query-plans')
+def check_query_plans():
+    """Fail if an endpoint exceeds its query budget or a list query scans a table"""
+    from instrumentation import check_query_budgets, check_index_usage
+    failures = check_query_budgets(app, db)
+    for url, status, count, budget in failures:
+        print(f"FAIL {url}: status {status}, {count} queries (budget {budget})")
+    scans = check_index_usage(app, db)
+    for url, statement, detail in scans:
+        print(f"FAIL {url}: full table scan ({detail})\n    {statement}")
+    if failures or scans:
+        raise SystemExit(1)
+    print("All endpoints within their query budgets and using indexes")
+
 if __name__ == '__main__':
     # Initialize database on first run
-    if not os.path.exists('sustainability_db.sqlite'):
+    with app.app_context():
+        is_new = not db.inspect(db.engine).has_table('foundational_principle')
+    if is_new:
         init_db()
+    else:
+        # Bring databases created by older versions up to date
+        with app.app_context():
+            from migrations import upgrade
+            upgrade()
     
     app.run(debug=True, host='0.0.0.0', port=5003)
 
@@ -0,0 +1,188 @@
+"""ASGI entry point with async database reads for the plain collection endpoints.
+
+    uvicorn asgi:app --workers 4 --timeout-keep-alive 5
+
+``GET /api/projects`` and ``/api/contributors`` (pages and whole lists,
+``?fields=``) and their detail views are answered here through an async
+engine (aiosqlite for SQLite, asyncpg for Postgres), so a request waiting on
+the database does not hold a thread. The responses match the Flask views:
+bodies, ETags and 304s, compression, the CORS headers of ``CORS(app)`` and
+profiling's Server-Timing header and /metrics histograms. Every other request, including reads using options only the
+Flask views implement (sort, streaming, ...), goes to the Flask app, which
+runs in a thread pool.
+
+Needs the packages in requirements-asgi.txt.
+"""
+import hashlib
+import re
+from time import perf_counter
+from urllib.parse import parse_qsl
+
+from a2wsgi import WSGIMiddleware
+from flask_cors.core import get_cors_headers, get_cors_options
+from sqlalchemy import event, func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from werkzeug.datastructures import Headers, MIMEAccept, MultiDict
+from werkzeug.http import http_date, parse_accept_header, parse_date, parse_etags
+
+from app import app as flask_app
+from compression import compress, negotiate
+from database import apply_sqlite_pragmas, database_url
+from models import Contributor, Project, TableVersion
+from pagination import (QueryParamError, Page, after_clause, apply_projection, cursor_for,
+                        parse_fields, parse_limit, sort_order)
+from profiling import record_request, request_timing, server_timing
+from serializers import serializer_for
+from streaming import NDJSON_MIMETYPE
+
+ASYNC_DRIVERS = {'sqlite': 'sqlite+aiosqlite', 'postgresql': 'postgresql+asyncpg'}
+ASYNC_COLLECTIONS = {'projects': Project, 'contributors': Contributor}
+# Query parameters the async handlers implement; anything else goes to Flask
+ASYNC_PARAMS = {'fields', 'limit', 'after'}
+ROUTE = re.compile(r'/api/(?P<collection>[a-z]+)(?:/(?P<id>\d+))?')
+
+
+def async_database_url(url):
+    scheme, rest = url.split('://', 1)
+    driver = ASYNC_DRIVERS.get(scheme.split('+')[0])
+    if driver is None:
+        raise ValueError(f'No async driver configured for {scheme} URLs')
+    return f'{driver}://{rest}'
+
+
+engine = create_async_engine(async_database_url(database_url()))
+if engine.dialect.name == 'sqlite':
+    event.listen(engine.sync_engine, 'connect', lambda dbapi_connection, record: apply_sqlite_pragmas(dbapi_connection))
+Session = async_sessionmaker(engine, expire_on_commit=False)
+wsgi_app = WSGIMiddleware(flask_app)
+# app.py calls CORS(app) without arguments, so its options come from the config alone
+cors_options = get_cors_options(flask_app)
+url_adapter = flask_app.url_map.bind('localhost')
+
+
+async def _table_state(session, tables):
+    row = (await session.execute(
+        select(func.coalesce(func.sum(TableVersion.version), 0), func.max(TableVersion.changed_at))
+        .where(TableVersion.table_name.in_(tables))
+    )).one()
+    return row[0], row[1]
+
+
+def _etag(scope, headers, version, changed_at):
+    # Same key as conditional.compute_etag
+    full_path = scope['path'] + '?' + scope['query_string'].decode('latin-1')
+    key = '|'.join([full_path, headers.get('accept', ''), str(version),
+                    changed_at.isoformat() if changed_at else ''])
+    return hashlib.sha1(key.encode()).hexdigest()
+
+
+async def _send(send, status, headers, body=b''):
+    await send({'type': 'http.response.start', 'status': status,
+                'headers': [(k.encode('latin-1'), v.encode('latin-1')) for k, v in headers]})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+def _json(data):
+    # As jsonify outside debug mode
+    return (flask_app.json.dumps(data, separators=(',', ':')) + '\n').encode()
+
+
+async def _read(scope, model, row_id, args):
+    """(status, headers, body) for a list or detail read; None to let Flask answer"""
+    headers = {k.decode('latin-1').lower(): v.decode('latin-1') for k, v in scope['headers']}
+    if parse_accept_header(headers.get('accept'), MIMEAccept).best == NDJSON_MIMETYPE:
+        return None
+    fields = parse_fields(model, args) if row_id is None else None
+    # Eager loads only: an async session cannot lazy-load during to_dict()
+    statement = apply_projection(select(model), model, fields).options(*model.loading_plan(fields))
+    async with Session() as session:
+        version, changed_at = await _table_state(session, model.dependent_tables())
+        etag = _etag(scope, headers, version, changed_at)
+        validators = [('ETag', f'"{etag}"'), ('Cache-Control', 'no-cache')]
+        if changed_at:
+            validators.append(('Last-Modified', http_date(changed_at)))
+        if_none_match = None
+        if 'if-none-match' in headers:
+            if_none_match = parse_etags(headers['if-none-match'])
+            not_modified = if_none_match.contains_weak(etag)
+        else:
+            since = parse_date(headers.get('if-modified-since'))
+            not_modified = bool(since and changed_at) and changed_at.replace(microsecond=0) <= since.replace(tzinfo=None)
+        if not_modified:
+            # As Werkzeug (no entity headers on a 304) and compression.compress_response
+            validators = [(k, v) for k, v in validators if k != 'Last-Modified']
+            if if_none_match is not None and if_none_match.is_weak(etag):
+                validators[0] = ('ETag', f'W/"{etag}"')
+                validators.append(('Vary', 'Accept-Encoding'))
+            return 304, validators, b''
+
+        if row_id is not None:
+            row = (await session.scalars(statement.where(model.id == row_id))).first()
+            if row is None:
+                return None
+            return 200, validators, _json(serializer_for(model).instance(row))
+
+        order = sort_order(model, None, False)
+        if 'after' not in args and 'limit' not in args:
+            rows = (await session.scalars(statement.order_by(*order))).all()
+            return 200, validators, _json(Page(serializer_for(model, fields).instances(rows)).to_response())
+        limit = parse_limit(args)
+        if args.get('after'):
+            statement = statement.where(after_clause(model, None, False, args['after']))
+        rows = (await session.scalars(statement.order_by(*order).limit(limit + 1))).all()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = cursor_for(rows[-1], None)
+        data = serializer_for(model, fields).instances(rows)
+        return 200, validators, _json(Page(data, next_cursor, paginated=True).to_response())
+
+
+def _cors(scope):
+    # As flask_cors' after_request hook
+    request_headers = Headers([(k.decode('latin-1'), v.decode('latin-1')) for k, v in scope['headers']])
+    return list(get_cors_headers(cors_options, request_headers, scope['method']).items(multi=True))
+
+
+def _endpoint(scope):
+    # The URL rule, as profiling labels Flask requests
+    rule, _ = url_adapter.match(scope['path'], method=scope['method'], return_rule=True)
+    return rule.rule
+
+
+def _compress(scope, headers, body):
+    # As compression.compress_response
+    accept_encoding = dict(scope['headers']).get(b'accept-encoding', b'').decode('latin-1')
+    headers = headers + [('Vary', 'Accept-Encoding')]
+    encoding = negotiate(accept_encoding)
+    if encoding is None:
+        return 200, headers, body
+    headers = [(k, f'W/{v}' if k == 'ETag' else v) for k, v in headers]
+    return 200, headers + [('Content-Encoding', encoding)], compress(body, encoding)
+
+
+async def app(scope, receive, send):
+    if scope['type'] == 'http' and scope['method'] == 'GET':
+        match = ROUTE.fullmatch(scope['path'])
+        args = MultiDict(parse_qsl(scope['query_string'].decode('latin-1'), keep_blank_values=True))
+        model = match and ASYNC_COLLECTIONS.get(match['collection'])
+        if model is not None and set(args) <= ASYNC_PARAMS:
+            row_id = int(match['id']) if match['id'] else None
+            with request_timing() as stats:
+                try:
+                    result = await _read(scope, model, row_id, args)
+                except QueryParamError as error:
+                    result = 400, [], _json({'error': str(error)})
+                if result is not None:
+                    status, headers, body = result
+                    if status == 200 and len(body) >= flask_app.config['COMPRESS_MIN_SIZE']:
+                        status, headers, body = _compress(scope, headers, body)
+            if result is not None:
+                if status != 304:
+                    headers = headers + [('Content-Type', 'application/json'), ('Content-Length', str(len(body)))]
+                headers = headers + [('Server-Timing', server_timing(stats, perf_counter() - stats.start))]
+                headers = headers + _cors(scope)
+                record_request(stats, scope['method'], _endpoint(scope), status, len(body))
+                await _send(send, status, headers, body)
+                return
+    await wsgi_app(scope, receive, send)
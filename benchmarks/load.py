@@ -0,0 +1,265 @@
+"""Load test of the API and admin pages against a seeded database.
+
+Seeds a scratch database (see seed.py), then drives every endpoint group
+(lists, detail, search, analytics, admin pages, bulk writes, uploads) from
+concurrent threads through the WSGI app in-process, and reports per scenario
+p50/p95/p99 latency, throughput and SQL statements per request (from the
+Server-Timing header), plus the process's peak RSS, as JSON.
+
+    python benchmarks/load.py --scale medium --threads 8 --requests 300 --output results.json
+    python benchmarks/load.py --baseline benchmarks/baseline.json          # exit 1 on regressions
+    python benchmarks/load.py --save-baseline benchmarks/baseline.json
+
+A scenario regresses when its median latency grows by more than --tolerance
+(and by at least --min-delta-ms), or when it issues more SQL statements per request than
+in the baseline. Latency baselines are machine specific: record one on the
+machine that runs the comparison.
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import re
+import resource
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from seed import add_scale_arguments, scale_counts, seed  # noqa: E402
+from sqlite_concurrency import percentile  # noqa: E402
+
+SERVER_TIMING_QUERIES = re.compile(r'db;dur=[\d.]+;desc="(\d+) queries"')
+SEARCH_TERMS = ('solar', 'ventilation', 'timber', 'rainwater', 'heat pump', 'biodiversity', 'retrofit')
+
+
+def scenarios(ids):
+    """name -> (group, request factory); a factory returns (method, url, client kwargs)"""
+    def pick(kind):
+        return lambda rng: rng.randint(1, ids[kind])
+
+    from pagination import encode_cursor
+
+    pillar, strategy, project = pick('core_pillar'), pick('sustainability_strategy'), pick('project')
+
+    def bulk_projects(rng):
+        items = [{'project_name': f'Bench {rng.random():.8f}', 'project_type': 'Office',
+                  'construction_type': 'Retrofit', 'design_stage': 'Concept Design'} for _ in range(50)]
+        return 'POST', '/api/projects/bulk', {'json': items}
+
+    def upload(rng):
+        data = b'\x89PNG\r\n\x1a\n' + rng.randbytes(32 * 1024)
+        return ('POST', f'/api/sustainability-strategies/{strategy(rng)}/upload-image',
+                {'data': {'image': (io.BytesIO(data), 'bench.png')}, 'content_type': 'multipart/form-data'})
+
+    return {
+        'principles': ('list', lambda rng: ('GET', '/api/foundational-principles', {})),
+        'pillars': ('list', lambda rng: ('GET', '/api/core-pillars?limit=50', {})),
+        'pillars_filtered': ('list', lambda rng: (
+            'GET', f'/api/core-pillars?principle_id={rng.randint(1, 7)}&facets=certification_id&limit=50', {})),
+        'strategies': ('list', lambda rng: ('GET', '/api/sustainability-strategies?limit=50', {})),
+        'strategies_deep_page': ('list', lambda rng: (
+            'GET', f'/api/sustainability-strategies?limit=50&after={encode_cursor([strategy(rng)])}', {})),
+        'strategies_sorted': ('list', lambda rng: ('GET', '/api/sustainability-strategies?sort=-cost&limit=50', {})),
+        'strategies_filtered': ('list', lambda rng: (
+            'GET', f'/api/sustainability-strategies?cost_min=Low&cost_max=High&synergy_id={rng.randint(1, 7)}'
+                   f'&facets=performance_contribution&limit=50', {})),
+        'projects': ('list', lambda rng: ('GET', '/api/projects?limit=50', {})),
+        'contributors': ('list', lambda rng: ('GET', '/api/contributors?limit=50', {})),
+        'reference_lists': ('list', lambda rng: ('GET', rng.choice(('/api/certifications', '/api/synergies')), {})),
+        'pillar_detail': ('detail', lambda rng: ('GET', f'/api/core-pillars/{pillar(rng)}', {})),
+        'strategy_detail': ('detail', lambda rng: ('GET', f'/api/sustainability-strategies/{strategy(rng)}', {})),
+        'project_detail': ('detail', lambda rng: ('GET', f'/api/projects/{project(rng)}', {})),
+        'search': ('search', lambda rng: ('GET', f'/api/search?q={rng.choice(SEARCH_TERMS)}', {})),
+        'hierarchy': ('analytics', lambda rng: ('GET', '/api/hierarchy', {})),
+        'recommended': ('analytics', lambda rng: ('GET', f'/api/projects/{project(rng)}/recommended-strategies', {})),
+        'similar': ('analytics', lambda rng: ('GET', f'/api/sustainability-strategies/{strategy(rng)}/similar', {})),
+        'co_occurrence': ('analytics', lambda rng: ('GET', '/api/synergies/co-occurrence', {})),
+        'stats': ('analytics', lambda rng: ('GET', '/api/stats', {})),
+        'admin_dashboard': ('admin', lambda rng: ('GET', '/admin/', {})),
+        'admin_pillars': ('admin', lambda rng: ('GET', '/admin/core-pillars', {})),
+        'admin_strategies': ('admin', lambda rng: ('GET', '/admin/sustainability-strategies', {})),
+        'admin_strategies_search': ('admin', lambda rng: (
+            'GET', f'/admin/sustainability-strategies?q={rng.choice(SEARCH_TERMS)}&sort=-cost&page={rng.randint(1, 5)}', {})),
+        'admin_projects': ('admin', lambda rng: ('GET', '/admin/projects', {})),
+        'admin_pillar_lookup': ('admin', lambda rng: (
+            'GET', f'/admin/core-pillars/lookup?q={rng.choice(SEARCH_TERMS)[:3]}', {})),
+        'update_strategy': ('write', lambda rng: (
+            'PUT', f'/api/sustainability-strategies/{strategy(rng)}', {'json': {'description': f'v{rng.random()}'}})),
+        'bulk_projects': ('write', bulk_projects),
+        'upload': ('upload', upload),
+        'serve_upload': ('upload', lambda rng: ('GET', ids['upload_url'], {})),
+    }
+
+
+def run_scenario(app, factory, threads, requests, seed_value, warmup):
+    # Unmeasured requests first: cold caches and lazy loading are not what is compared
+    client, rng = app.test_client(), random.Random(-seed_value)
+    for _ in range(warmup):
+        method, url, kwargs = factory(rng)
+        client.open(url, method=method, **kwargs).get_data()
+
+    latencies, queries, errors = [], [], []
+    lock = threading.Lock()
+    remaining = [requests]
+
+    def worker(index):
+        client = app.test_client()
+        rng = random.Random(seed_value * 1000 + index)
+        local_latencies, local_queries, local_errors = [], [], []
+        while True:
+            with lock:
+                if remaining[0] <= 0:
+                    break
+                remaining[0] -= 1
+            method, url, kwargs = factory(rng)
+            start = time.perf_counter()
+            response = client.open(url, method=method, **kwargs)
+            response.get_data()  # drain streamed bodies
+            local_latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                local_errors.append(response.status_code)
+            match = SERVER_TIMING_QUERIES.search(response.headers.get('Server-Timing', ''))
+            if match:
+                local_queries.append(int(match.group(1)))
+        with lock:
+            latencies.extend(local_latencies)
+            queries.extend(local_queries)
+            errors.extend(local_errors)
+
+    started = time.perf_counter()
+    pool = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    def ms(pct):
+        return round(percentile(latencies, pct) * 1000, 3)
+
+    return {
+        'requests': len(latencies),
+        'errors': len(errors),
+        'error_statuses': sorted(set(errors)),
+        'requests_per_sec': round(len(latencies) / elapsed, 1),
+        'p50_ms': ms(50),
+        'p95_ms': ms(95),
+        'p99_ms': ms(99),
+        'queries_p50': percentile(queries, 50),
+        'queries_max': max(queries) if queries else None,
+    }
+
+
+def compare(results, baseline, tolerance, min_delta_ms):
+    """Regressions of ``results`` against ``baseline`` as readable strings"""
+    for setting in ('rows', 'threads', 'requests_per_scenario'):
+        if results['meta'][setting] != baseline['meta'].get(setting):
+            raise SystemExit(f'Baseline was recorded with a different {setting}; record a new one')
+    regressions = []
+    for name, current in results['scenarios'].items():
+        previous = baseline.get('scenarios', {}).get(name)
+        if previous is None:
+            continue
+        # The median: under thread contention the tail varies too much between runs
+        if (current['p50_ms'] > previous['p50_ms'] * (1 + tolerance)
+                and current['p50_ms'] - previous['p50_ms'] >= min_delta_ms):
+            regressions.append(f"{name}: p50 {previous['p50_ms']} ms -> {current['p50_ms']} ms")
+        if (previous.get('queries_max') is not None and current['queries_max'] is not None
+                and current['queries_max'] > previous['queries_max']):
+            regressions.append(f"{name}: {previous['queries_max']} -> {current['queries_max']} SQL statements")
+        if current['errors'] > previous.get('errors', 0):
+            regressions.append(f"{name}: {current['errors']} errors (baseline {previous.get('errors', 0)})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_scale_arguments(parser)
+    parser.add_argument('--db', help='use (and keep) this SQLite file instead of a scratch copy')
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=200, help='requests per scenario')
+    parser.add_argument('--warmup', type=int, default=10, help='unmeasured requests before each scenario')
+    parser.add_argument('--only', help='comma separated scenario names or groups')
+    parser.add_argument('--output', help='write the JSON results here (default: stdout)')
+    parser.add_argument('--baseline', help='compare against this results file; exit 1 on regressions')
+    parser.add_argument('--save-baseline', help='also write the results to this file')
+    parser.add_argument('--tolerance', type=float, default=0.5, help='allowed relative p50 growth')
+    parser.add_argument('--min-delta-ms', type=float, default=5.0, help='ignore p50 changes below this')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bench-')
+    db_path = os.path.abspath(args.db) if args.db else os.path.join(workdir, 'bench.sqlite')
+    os.environ['DATABASE_URL'] = 'sqlite:///' + db_path
+    from app import app
+    from storage import init_storage
+
+    # Uploads from the benchmark must not land in the real upload folder
+    app.config['UPLOAD_FOLDER'] = os.path.join(workdir, 'uploads')
+    init_storage(app)
+    try:
+        started = time.perf_counter()
+        with app.app_context():
+            counts = seed(scale_counts(args), args.seed)
+        seed_seconds = round(time.perf_counter() - started, 1)
+
+        ids = dict(counts)
+        client = app.test_client()
+        response = client.post('/api/core-pillars/1/upload-image', content_type='multipart/form-data',
+                               data={'image': (io.BytesIO(b'\x89PNG\r\n\x1a\n' + os.urandom(16384)), 'seed.png')})
+        ids['upload_url'] = response.get_json()['image_url']
+
+        selected = set(args.only.split(',')) if args.only else None
+        results = {
+            'meta': {
+                'rows': counts,
+                'seed_seconds': seed_seconds,
+                'threads': args.threads,
+                'requests_per_scenario': args.requests,
+                'warmup': args.warmup,
+                'python': platform.python_version(),
+                'sqlite': sqlite3.sqlite_version,
+                'platform': platform.platform(),
+            },
+            'scenarios': {},
+        }
+        for name, (group, factory) in scenarios(ids).items():
+            if selected and name not in selected and group not in selected:
+                continue
+            print(f'{name}...', file=sys.stderr)
+            results['scenarios'][name] = {'group': group, **run_scenario(
+                app, factory, args.threads, args.requests, args.seed, args.warmup)}
+        # ru_maxrss is in KiB on Linux, bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        results['peak_rss_mb'] = round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance, args.min_delta_ms)
+        results['regressions'] = regressions
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            f.write(text + '\n')
+    for regression in regressions:
+        print(f'REGRESSION {regression}', file=sys.stderr)
+    if regressions:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
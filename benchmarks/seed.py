@@ -0,0 +1,179 @@
+"""Synthetic data generator for benchmarks.
+
+Creates a database at the chosen scale: the sample data from init_data.py
+plus generated pillars, strategies, projects and contributors with realistic
+many-to-many fan-out (0-3 certifications per pillar, 1-4 synergies per
+strategy, skewed towards the popular ones). Output is deterministic for a
+given --seed.
+
+    python benchmarks/seed.py --db /tmp/bench.sqlite --scale large
+    python benchmarks/seed.py --db /tmp/bench.sqlite --scale small --strategies 50000
+"""
+import argparse
+import contextlib
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SCALES = {
+    'small': {'pillars': 200, 'strategies': 2000, 'projects': 1000, 'contributors': 50},
+    'medium': {'pillars': 1000, 'strategies': 20000, 'projects': 10000, 'contributors': 200},
+    'large': {'pillars': 5000, 'strategies': 100000, 'projects': 50000, 'contributors': 500},
+}
+BATCH_SIZE = 5000
+
+WORDS = (
+    'solar', 'thermal', 'passive', 'ventilation', 'daylight', 'insulation', 'rainwater', 'greywater',
+    'timber', 'recycled', 'concrete', 'low-carbon', 'biodiversity', 'green roof', 'heat pump',
+    'metering', 'acoustic', 'wellbeing', 'circular', 'modular', 'retrofit', 'embodied carbon',
+    'glazing', 'shading', 'landscaping', 'storage', 'battery', 'lighting', 'controls', 'envelope',
+    'airtightness', 'commissioning', 'monitoring', 'reuse', 'demolition', 'procurement', 'transport',
+    'cycling', 'habitat', 'drainage', 'flood', 'resilience', 'cooling', 'geothermal', 'biomass',
+)
+AUTHORS = ('Admin', 'Jane Smith', 'John Doe', 'Design Team', 'Sustainability Lead')
+ADDRESS_STREETS = ('High St', 'Station Rd', 'Park Ave', 'Mill Lane', 'Harbour Way', 'Church Rd')
+
+
+def _phrase(rng, words):
+    return ' '.join(rng.choice(WORDS) for _ in range(words))
+
+
+def _weighted_sample(rng, ids, count):
+    """``count`` distinct ids, earlier ids more likely (popular categories)"""
+    weights = [len(ids) - i for i in range(len(ids))]
+    chosen = set()
+    while len(chosen) < min(count, len(ids)):
+        chosen.add(rng.choices(ids, weights)[0])
+    return sorted(chosen)
+
+
+def _insert(db, table, rows):
+    for start in range(0, len(rows), BATCH_SIZE):
+        db.session.execute(table.insert(), rows[start:start + BATCH_SIZE])
+
+
+def seed(counts, seed_value=42):
+    """Fill the current app's database up to ``counts``; returns the row counts.
+
+    Must run inside an app context on an empty (or sample-only) database.
+    """
+    from sqlalchemy import func, select
+
+    from init_data import init_sample_data
+    from migrations import upgrade
+    from models import (db, FoundationalPrinciple, CorePillar, SustainabilityStrategy, Project, Contributor,
+                        Certification, Synergy, COST_LEVELS, PERFORMANCE_LEVELS,
+                        core_pillar_certifications, strategy_synergies)
+    from recommend import CONSTRUCTION_COST_SENSITIVITY, DESIGN_STAGE_COST_SENSITIVITY, PROJECT_TYPE_SYNERGIES
+
+    rng = random.Random(seed_value)
+    upgrade()
+    with contextlib.redirect_stdout(sys.stderr):  # keep stdout for results
+        init_sample_data()
+
+    def count(model):
+        return db.session.execute(select(func.count()).select_from(model)).scalar()
+
+    def max_id(model):
+        return db.session.execute(select(func.max(model.id))).scalar() or 0
+
+    principle_ids = db.session.execute(select(FoundationalPrinciple.id)).scalars().all()
+    certification_ids = db.session.execute(select(Certification.id).order_by(Certification.id)).scalars().all()
+    synergy_ids = db.session.execute(select(Synergy.id).order_by(Synergy.id)).scalars().all()
+
+    # Pillars and their certifications
+    first = max_id(CorePillar) + 1
+    new = max(0, counts['pillars'] - count(CorePillar))
+    pillars = [{
+        'id': first + i,
+        'foundational_principle_id': rng.choice(principle_ids),
+        'name': f'{_phrase(rng, 2).title()} Pillar {first + i}',
+        'description': _phrase(rng, 12),
+        'text_content': _phrase(rng, 60),
+        'author': rng.choice(AUTHORS),
+    } for i in range(new)]
+    _insert(db, CorePillar.__table__, pillars)
+    _insert(db, core_pillar_certifications, [
+        {'core_pillar_id': p['id'], 'certification_id': c}
+        for p in pillars for c in _weighted_sample(rng, certification_ids, rng.randint(0, 3))
+    ])
+    pillar_ids = db.session.execute(select(CorePillar.id)).scalars().all()
+
+    # Strategies and their synergies
+    first = max_id(SustainabilityStrategy) + 1
+    new = max(0, counts['strategies'] - count(SustainabilityStrategy))
+    strategies = [{
+        'id': first + i,
+        'core_pillar_id': rng.choice(pillar_ids),
+        'name': f'{_phrase(rng, 3).capitalize()} {first + i}',
+        'description': _phrase(rng, 15),
+        'text_content': _phrase(rng, 80),
+        'author': rng.choice(AUTHORS),
+        'cost': rng.choice(COST_LEVELS + (None,)),
+        'performance_contribution': rng.choice(PERFORMANCE_LEVELS + (None,)),
+    } for i in range(new)]
+    _insert(db, SustainabilityStrategy.__table__, strategies)
+    _insert(db, strategy_synergies, [
+        {'sustainability_strategy_id': s['id'], 'synergy_id': y}
+        for s in strategies for y in _weighted_sample(rng, synergy_ids, rng.randint(1, 4))
+    ])
+
+    new = max(0, counts['projects'] - count(Project))
+    _insert(db, Project.__table__, [{
+        'project_name': f'{_phrase(rng, 2).title()} Project',
+        'project_size': round(rng.uniform(500, 100000), 2),
+        'project_address': f'{rng.randint(1, 999)} {rng.choice(ADDRESS_STREETS)}',
+        'construction_type': rng.choice(list(CONSTRUCTION_COST_SENSITIVITY)),
+        'project_type': rng.choice(list(PROJECT_TYPE_SYNERGIES)),
+        'design_stage': rng.choice(list(DESIGN_STAGE_COST_SENSITIVITY)),
+    } for _ in range(new)])
+
+    new = max(0, counts['contributors'] - count(Contributor))
+    _insert(db, Contributor.__table__, [{
+        'name': f'Contributor {i}',
+        'role': rng.choice(('Engineer', 'Architect', 'Consultant', 'Researcher')),
+        'email': f'contributor{i}@example.com',
+        'bio': _phrase(rng, 25),
+    } for i in range(new)])
+    db.session.commit()
+
+    return {model.__tablename__: count(model) for model in (
+        FoundationalPrinciple, CorePillar, SustainabilityStrategy, Project, Contributor
+    )}
+
+
+def scale_counts(args):
+    counts = dict(SCALES[args.scale])
+    for name in counts:
+        if getattr(args, name, None) is not None:
+            counts[name] = getattr(args, name)
+    return counts
+
+
+def add_scale_arguments(parser):
+    parser.add_argument('--scale', choices=sorted(SCALES), default='small')
+    parser.add_argument('--seed', type=int, default=42)
+    for name in SCALES['small']:
+        parser.add_argument(f'--{name}', type=int, help=f'override the number of {name}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--db', required=True, help='SQLite file to create or extend')
+    add_scale_arguments(parser)
+    args = parser.parse_args()
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.abspath(args.db)
+    from app import app
+
+    started = time.perf_counter()
+    with app.app_context():
+        counts = seed(scale_counts(args), args.seed)
+    print(json.dumps({'rows': counts, 'seconds': round(time.perf_counter() - started, 1)}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
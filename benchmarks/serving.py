@@ -0,0 +1,170 @@
+"""Throughput of the development server vs the production entry points.
+
+Seeds a scratch database (see seed.py), starts each server on a free port and
+drives it over HTTP with keep-alive connections from concurrent client
+threads for a fixed time, using a mix of read endpoints:
+
+- ``dev``: ``app.run(debug=True)`` as ``python app.py`` does (reloader off)
+- ``gunicorn``: ``gunicorn -c gunicorn.conf.py wsgi:app``
+- ``uvicorn``: ``uvicorn asgi:app`` (async reads for projects/contributors)
+
+Servers whose packages are not installed are reported as skipped.
+
+    python benchmarks/serving.py --scale small --clients 16 --seconds 10 --workers 4
+"""
+import argparse
+import http.client
+import importlib.util
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from seed import add_scale_arguments, scale_counts  # noqa: E402
+from sqlite_concurrency import percentile  # noqa: E402
+
+PATHS = (
+    '/api/projects?limit=50',
+    '/api/projects/{project}',
+    '/api/contributors?limit=50',
+    '/api/core-pillars?limit=50',
+    '/api/sustainability-strategies?limit=50',
+    '/api/sustainability-strategies/{strategy}',
+    '/api/search?q=solar',
+    '/api/certifications',
+)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def server_commands(port, workers, threads):
+    return {
+        'dev': ([sys.executable, '-c',
+                 f"from app import app; app.run(debug=True, port={port}, use_reloader=False)"], None),
+        'gunicorn': ([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:app'], 'gunicorn'),
+        'uvicorn': ([sys.executable, '-m', 'uvicorn', 'asgi:app', '--port', str(port),
+                     '--workers', str(workers), '--no-access-log'], 'uvicorn'),
+    }
+
+
+def wait_until_up(port, process, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'server exited with {process.returncode}')
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.2):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError('server did not start')
+
+
+def drive(port, clients, seconds, counts):
+    latencies, errors = [], []
+    lock = threading.Lock()
+    stop = time.monotonic() + seconds
+
+    def client(index):
+        rng = random.Random(index)
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        local, failed = [], 0
+        while time.monotonic() < stop:
+            path = rng.choice(PATHS).format(project=rng.randint(1, counts['project']),
+                                            strategy=rng.randint(1, counts['sustainability_strategy']))
+            start = time.perf_counter()
+            try:
+                connection.request('GET', path)
+                response = connection.getresponse()
+                response.read()
+                if response.status >= 400:
+                    failed += 1
+            except (OSError, http.client.HTTPException):
+                failed += 1
+                connection.close()
+                connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+                continue
+            local.append(time.perf_counter() - start)
+        connection.close()
+        with lock:
+            latencies.extend(local)
+            errors.append(failed)
+
+    pool = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    return {
+        'requests': len(latencies),
+        'errors': sum(errors),
+        'requests_per_sec': round(len(latencies) / seconds, 1),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3) if latencies else None,
+        'p95_ms': round(percentile(latencies, 95) * 1000, 3) if latencies else None,
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3) if latencies else None,
+    }
+
+
+def seed_database(path, args):
+    code = ('import json, sys; from app import app; from seed import seed; '
+            'app.app_context().push(); '
+            f'print(json.dumps(seed({scale_counts(args)!r}, {args.seed})))')
+    env = dict(os.environ, DATABASE_URL='sqlite:///' + path,
+               PYTHONPATH=os.pathsep.join([ROOT, os.path.join(ROOT, 'benchmarks')]))
+    output = subprocess.run([sys.executable, '-c', code], cwd=ROOT, env=env, check=True,
+                            capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_scale_arguments(parser)
+    parser.add_argument('--servers', default='dev,gunicorn,uvicorn')
+    parser.add_argument('--clients', type=int, default=16, help='concurrent keep-alive connections')
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--workers', type=int, default=4, help='gunicorn/uvicorn worker processes')
+    parser.add_argument('--threads', type=int, default=4, help='gunicorn threads per worker')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bench-serving-')
+    db_path = os.path.join(workdir, 'bench.sqlite')
+    counts = seed_database(db_path, args)
+    results = {'meta': {'rows': counts, 'clients': args.clients, 'seconds': args.seconds,
+                        'workers': args.workers, 'threads': args.threads}, 'servers': {}}
+    for name in args.servers.split(','):
+        port = free_port()
+        command, module = server_commands(port, args.workers, args.threads)[name]
+        if module and importlib.util.find_spec(module) is None:
+            results['servers'][name] = {'skipped': f'{module} is not installed'}
+            continue
+        env = dict(os.environ, DATABASE_URL='sqlite:///' + db_path, BIND=f'127.0.0.1:{port}',
+                   WEB_CONCURRENCY=str(args.workers), THREADS=str(args.threads), ACCESS_LOG='')
+        process = subprocess.Popen(command, cwd=ROOT, env=env,
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            wait_until_up(port, process)
+            print(f'{name}...', file=sys.stderr)
+            drive(port, args.clients, 1, counts)  # warm up caches and connections
+            results['servers'][name] = drive(port, args.clients, args.seconds, counts)
+        except RuntimeError as error:
+            results['servers'][name] = {'skipped': str(error)}
+        finally:
+            process.terminate()
+            process.wait(timeout=30)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
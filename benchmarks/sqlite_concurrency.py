@@ -0,0 +1,137 @@
+"""Concurrent read/write benchmark: default SQLite settings vs database.py tuning.
+
+Runs reader threads (paged SELECTs, like the list endpoints) alongside writer
+threads (single-row INSERT + COMMIT, like admin form posts) against a scratch
+database, once with SQLite's defaults (rollback journal, synchronous=FULL) and
+once with the pragmas from database.sqlite_pragmas().
+
+    python benchmarks/sqlite_concurrency.py --readers 8 --writers 2 --seconds 5
+"""
+import argparse
+import json
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import sqlite_pragmas  # noqa: E402
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def connect(path, tuned, busy_timeout):
+    conn = sqlite3.connect(path, timeout=busy_timeout, check_same_thread=False)
+    if tuned:
+        for name, value in sqlite_pragmas():
+            conn.execute(f'PRAGMA {name}={value}')
+        # Same lock timeout as the default run so only the tuning differs
+        conn.execute(f'PRAGMA busy_timeout={int(busy_timeout * 1000)}')
+    else:
+        conn.execute('PRAGMA journal_mode=DELETE')
+    return conn
+
+
+def seed(path, rows):
+    conn = sqlite3.connect(path)
+    conn.execute('CREATE TABLE strategy (id INTEGER PRIMARY KEY, core_pillar_id INTEGER, name TEXT, '
+                 'description TEXT, cost TEXT)')
+    conn.executemany('INSERT INTO strategy (core_pillar_id, name, description, cost) VALUES (?, ?, ?, ?)',
+                     ((i % 500, f'Strategy {i}', 'x' * 200, 'Low') for i in range(rows)))
+    conn.commit()
+    conn.close()
+
+
+def run(tuned, args):
+    handle, path = tempfile.mkstemp(suffix='.sqlite')
+    os.close(handle)
+    try:
+        seed(path, args.rows)
+        stop = time.monotonic() + args.seconds
+        stats = {'read': [], 'write': [], 'errors': 0}
+        lock = threading.Lock()
+
+        def reader():
+            conn = connect(path, tuned, args.busy_timeout)
+            latencies = []
+            errors = 0
+            while time.monotonic() < stop:
+                start = time.perf_counter()
+                try:
+                    after = random.randint(0, args.rows)
+                    conn.execute('SELECT * FROM strategy WHERE id > ? ORDER BY id LIMIT 50', (after,)).fetchall()
+                    latencies.append(time.perf_counter() - start)
+                except sqlite3.OperationalError:
+                    errors += 1
+            with lock:
+                stats['read'].extend(latencies)
+                stats['errors'] += errors
+            conn.close()
+
+        def writer():
+            conn = connect(path, tuned, args.busy_timeout)
+            latencies = []
+            errors = 0
+            while time.monotonic() < stop:
+                start = time.perf_counter()
+                try:
+                    conn.execute('INSERT INTO strategy (core_pillar_id, name, description, cost) VALUES (?, ?, ?, ?)',
+                                 (random.randint(0, 500), 'new', 'y' * 200, 'High'))
+                    conn.commit()
+                    latencies.append(time.perf_counter() - start)
+                except sqlite3.OperationalError:
+                    conn.rollback()
+                    errors += 1
+            with lock:
+                stats['write'].extend(latencies)
+                stats['errors'] += errors
+            conn.close()
+
+        threads = [threading.Thread(target=reader) for _ in range(args.readers)]
+        threads += [threading.Thread(target=writer) for _ in range(args.writers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        def summary(latencies):
+            return {
+                'ops': len(latencies),
+                'ops_per_sec': round(len(latencies) / args.seconds, 1),
+                'p50_ms': round(percentile(latencies, 50) * 1000, 3) if latencies else None,
+                'p95_ms': round(percentile(latencies, 95) * 1000, 3) if latencies else None,
+                'p99_ms': round(percentile(latencies, 99) * 1000, 3) if latencies else None,
+            }
+
+        return {'reads': summary(stats['read']), 'writes': summary(stats['write']),
+                'locked_errors': stats['errors']}
+    finally:
+        for suffix in ('', '-wal', '-shm', '-journal'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--busy-timeout', type=float, default=0.5,
+                        help='driver lock timeout in seconds for both runs')
+    args = parser.parse_args()
+    results = {'default': run(False, args), 'tuned': run(True, args)}
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
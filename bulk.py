@@ -0,0 +1,266 @@
+"""Bulk create/update/delete for the API's writable collections.
+
+A bulk request is validated as a whole: every referenced parent row and
+certification/synergy id is resolved with one query per table, and if any
+item is invalid nothing is written. Valid batches are written with executemany
+INSERT/UPDATE statements in a single transaction.
+"""
+import logging
+
+from flask import jsonify, request
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import selectinload
+
+from change_tracking import mark_changed
+from models import (db, FoundationalPrinciple, CorePillar, SustainabilityStrategy, Project, Contributor,
+                    Certification, Synergy, Ordinal, core_pillar_certifications, strategy_synergies, level_error)
+
+MAX_BULK_ITEMS = 5000
+
+logger = logging.getLogger(__name__)
+
+
+class Association:
+    """A many-to-many list written from ``<ids_key>`` in the payload"""
+
+    def __init__(self, ids_key, table, local_column, remote_column, remote_model):
+        self.ids_key = ids_key
+        self.table = table
+        self.local_column = local_column
+        self.remote_column = remote_column
+        self.remote_model = remote_model
+
+
+class BulkSpec:
+    def __init__(self, model, fields, required=(), parents=None, association=None, delete_options=()):
+        self.model = model
+        self.fields = fields
+        self.required = required
+        self.parents = parents or {}
+        self.association = association
+        self.delete_options = delete_options
+
+
+CORE_PILLAR_BULK = BulkSpec(
+    CorePillar,
+    fields=('foundational_principle_id', 'name', 'description', 'text_content', 'author', 'image_url'),
+    required=('foundational_principle_id', 'name'),
+    parents={'foundational_principle_id': FoundationalPrinciple},
+    association=Association('certification_ids', core_pillar_certifications,
+                            'core_pillar_id', 'certification_id', Certification),
+    # Everything the delete cascade visits, loaded per relationship rather than per row
+    delete_options=(selectinload(CorePillar.certifications),
+                    selectinload(CorePillar.sustainability_strategies)
+                    .selectinload(SustainabilityStrategy.synergies)),
+)
+
+STRATEGY_BULK = BulkSpec(
+    SustainabilityStrategy,
+    fields=('core_pillar_id', 'name', 'description', 'text_content', 'author', 'cost',
+            'performance_contribution', 'image_url'),
+    required=('core_pillar_id', 'name'),
+    parents={'core_pillar_id': CorePillar},
+    association=Association('synergy_ids', strategy_synergies,
+                            'sustainability_strategy_id', 'synergy_id', Synergy),
+    delete_options=(selectinload(SustainabilityStrategy.synergies),),
+)
+
+PROJECT_BULK = BulkSpec(
+    Project,
+    fields=('project_name', 'project_size', 'project_address', 'construction_type', 'project_type', 'design_stage'),
+    required=('project_name',),
+)
+
+CONTRIBUTOR_BULK = BulkSpec(
+    Contributor,
+    fields=('name', 'role', 'email', 'bio', 'image_url'),
+    required=('name',),
+)
+
+
+def _existing_ids(model, ids):
+    if not ids:
+        return set()
+    return set(db.session.scalars(select(model.id).where(model.id.in_(ids))))
+
+
+def _is_id(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _is_id_list(value):
+    return isinstance(value, list) and all(_is_id(v) for v in value)
+
+
+def missing_fields_error(spec, item, update=False):
+    """Validation message for an ``item`` lacking any of ``spec.required`` (also used by single POSTs).
+
+    Updates only change the keys they carry, so only those are checked.
+    """
+    missing = [f for f in spec.required if (f in item or not update) and item.get(f) in (None, '')]
+    if missing:
+        return f"Missing required field(s): {', '.join(missing)}"
+    return None
+
+
+def validate_items(spec, items):
+    """Return a list of per-item error messages (None for valid items)"""
+    errors = [None] * len(items)
+    ordinals = [spec.model.__table__.c[f] for f in spec.fields if isinstance(spec.model.__table__.c[f].type, Ordinal)]
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            errors[index] = 'Item must be an object'
+        elif 'id' in item and not _is_id(item['id']):
+            errors[index] = 'id must be an integer'
+        else:
+            errors[index] = missing_fields_error(spec, item, update='id' in item)
+        if errors[index] is None and spec.association and spec.association.ids_key in item:
+            if not _is_id_list(item[spec.association.ids_key]):
+                errors[index] = f'{spec.association.ids_key} must be a list of integers'
+        if errors[index] is None:
+            for column in ordinals:
+                if item.get(column.key) is not None:
+                    errors[index] = level_error(column, item[column.key])
+                    if errors[index]:
+                        break
+
+    valid = [item for item, error in zip(items, errors) if error is None]
+
+    # Resolve every referenced id with one query per table
+    existing = _existing_ids(spec.model, {i['id'] for i in valid if 'id' in i})
+    parents = {
+        field: _existing_ids(parent, {i[field] for i in valid if i.get(field) is not None})
+        for field, parent in spec.parents.items()
+    }
+    remote = set()
+    if spec.association:
+        wanted = {rid for i in valid for rid in i.get(spec.association.ids_key, [])}
+        remote = _existing_ids(spec.association.remote_model, wanted)
+
+    for index, item in enumerate(items):
+        if errors[index] is not None:
+            continue
+        if 'id' in item and item['id'] not in existing:
+            errors[index] = f"{spec.model.__name__} {item['id']} not found"
+            continue
+        for field in spec.parents:
+            if item.get(field) is not None and item[field] not in parents[field]:
+                errors[index] = f'{field} {item[field]} not found'
+                break
+        if errors[index] is None and spec.association:
+            unknown = sorted(set(item.get(spec.association.ids_key, [])) - remote)
+            if unknown:
+                errors[index] = f"Unknown {spec.association.ids_key}: {', '.join(map(str, unknown))}"
+    return errors
+
+
+def _replace_associations(spec, links):
+    """Replace association rows for the given {local_id: [remote_ids]}"""
+    assoc = spec.association
+    table = assoc.table
+    db.session.execute(delete(table).where(table.c[assoc.local_column].in_(list(links))))
+    rows = [{assoc.local_column: local_id, assoc.remote_column: remote_id}
+            for local_id, remote_ids in links.items() for remote_id in dict.fromkeys(remote_ids)]
+    if rows:
+        db.session.execute(insert(table), rows)
+
+
+def _insert_returning_ids(model, rows):
+    """executemany INSERT returning the new ids in parameter order"""
+    if db.session.get_bind().dialect.name == 'sqlite':
+        # SQLite can't order RETURNING rows, so SQLAlchemy would fall back to
+        # one INSERT per row. A single INSERT assigns ascending rowids in
+        # VALUES order, so sorting the batch's ids restores parameter order.
+        ids = db.session.execute(insert(model).returning(model.id), rows).scalars().all()
+        return sorted(ids)
+    return db.session.execute(
+        insert(model).returning(model.id, sort_by_parameter_order=True), rows
+    ).scalars().all()
+
+
+def apply_items(spec, items):
+    """Write validated items; returns per-item results in request order"""
+    model = spec.model
+    creates = [(index, item) for index, item in enumerate(items) if 'id' not in item]
+    updates = [(index, item) for index, item in enumerate(items) if 'id' in item]
+    results = [None] * len(items)
+    links = {}
+
+    if creates:
+        rows = [{f: item.get(f) for f in spec.fields} for _, item in creates]
+        ids = _insert_returning_ids(model, rows)
+        for (index, item), new_id in zip(creates, ids):
+            results[index] = {'index': index, 'status': 'created', 'id': new_id}
+            if spec.association and spec.association.ids_key in item:
+                links[new_id] = item[spec.association.ids_key]
+
+    if updates:
+        # Group by the set of keys present so each group is one executemany
+        groups = {}
+        for index, item in updates:
+            keys = tuple(f for f in spec.fields if f in item)
+            groups.setdefault(keys, []).append(item)
+            results[index] = {'index': index, 'status': 'updated', 'id': item['id']}
+            if spec.association and spec.association.ids_key in item:
+                links[item['id']] = item[spec.association.ids_key]
+        for keys, group in groups.items():
+            if keys:
+                db.session.execute(update(model), [{'id': i['id'], **{k: i[k] for k in keys}} for i in group])
+
+    if links:
+        _replace_associations(spec, links)
+
+    tables = [model.__tablename__]
+    if spec.association:
+        tables.append(spec.association.table.name)
+    mark_changed(db.session, *tables, ids=[r['id'] for r in results])
+    return results
+
+
+def _bulk_error(message):
+    return jsonify({'error': message}), 400
+
+
+def bulk_upsert_response(spec):
+    """Handle POST /<resource>/bulk"""
+    items = request.get_json(silent=True)
+    if not isinstance(items, list):
+        return _bulk_error('Request body must be a JSON array')
+    if len(items) > MAX_BULK_ITEMS:
+        return _bulk_error(f'At most {MAX_BULK_ITEMS} items per request')
+
+    errors = validate_items(spec, items)
+    if any(errors):
+        results = [{'index': i, 'status': 'error' if e else 'valid', **({'error': e} if e else {})}
+                   for i, e in enumerate(errors)]
+        return jsonify({'committed': False, 'results': results}), 400
+
+    try:
+        results = apply_items(spec, items)
+        db.session.commit()
+    except IntegrityError:
+        # References were validated up front, so this is a concurrent write (e.g. a parent deleted since)
+        db.session.rollback()
+        logger.exception('Bulk write to %s violated a constraint', spec.model.__tablename__)
+        return _bulk_error('Bulk write failed: an item conflicts with existing data')
+    return jsonify({'committed': True, 'results': results}), 200
+
+
+def bulk_delete_response(spec):
+    """Handle DELETE /<resource>/bulk with {"ids": [...]}"""
+    data = request.get_json(silent=True)
+    ids = data.get('ids') if isinstance(data, dict) else None
+    if not _is_id_list(ids):
+        return _bulk_error('ids must be a list of integers')
+    if len(ids) > MAX_BULK_ITEMS:
+        return _bulk_error(f'At most {MAX_BULK_ITEMS} items per request')
+
+    model = spec.model
+    objects = model.query.options(*spec.delete_options).filter(model.id.in_(ids)).all()
+    found = {obj.id for obj in objects}
+    for obj in objects:
+        db.session.delete(obj)
+    db.session.commit()
+    results = [{'id': i, 'status': 'deleted' if i in found else 'not_found'} for i in ids]
+    return jsonify({'committed': True, 'results': results}), 200
@@ -0,0 +1,118 @@
+"""Bounded in-process read-through cache for reference data.
+
+Each entry records the ``table_version`` of the tables it was built from and
+is reloaded when that version has moved, so a worker never serves data older
+than another worker's commit (one version lookup per read). Entries also
+expire after a TTL, the least recently used entry is evicted when the cache
+is full, and local commits drop the entries they touch straight away.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from flask import jsonify
+
+from change_tracking import subscribe, table_version
+from compression import CompressedBody
+from models import Certification, Synergy, FoundationalPrinciple
+
+
+class TTLCache:
+    def __init__(self, maxsize=128, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # key -> (expires_at, tables, version, value)
+        self._lock = threading.Lock()
+
+    def get_or_load(self, key, tables, loader):
+        """Return the cached value for ``key``, calling ``loader()`` on a miss or a version change"""
+        # Read before loading: a commit racing the load leaves the entry stale-looking, not stale
+        version = table_version(*tables)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now and entry[2] == version:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[3]
+            self.misses += 1
+        value = loader()
+        with self._lock:
+            self._entries[key] = (now + self.ttl, frozenset(tables), version, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    def invalidate_tables(self, tables):
+        with self._lock:
+            stale = [k for k, (_, deps, _, _) in self._entries.items() if deps & tables]
+            for key in stale:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+
+reference_cache = TTLCache(
+    maxsize=int(os.environ.get('REFERENCE_CACHE_SIZE', 128)),
+    ttl=float(os.environ.get('REFERENCE_CACHE_TTL', 300)),
+)
+subscribe(reference_cache.invalidate_tables)
+
+
+def all_certifications():
+    """All certifications as dicts"""
+    return reference_cache.get_or_load(
+        'certifications', ('certification',),
+        lambda: [c.to_dict() for c in Certification.query.order_by(Certification.id)]
+    )
+
+
+def all_synergies():
+    """All synergies as dicts"""
+    return reference_cache.get_or_load(
+        'synergies', ('synergy',),
+        lambda: [s.to_dict() for s in Synergy.query.order_by(Synergy.id)]
+    )
+
+
+def certifications_body():
+    """all_certifications() as a JSON response body, compressed once per encoding"""
+    return reference_cache.get_or_load(
+        'certifications_body', ('certification',),
+        lambda: CompressedBody(jsonify(all_certifications()).get_data())
+    )
+
+
+def synergies_body():
+    """all_synergies() as a JSON response body, compressed once per encoding"""
+    return reference_cache.get_or_load(
+        'synergies_body', ('synergy',),
+        lambda: CompressedBody(jsonify(all_synergies()).get_data())
+    )
+
+
+def principle_choices():
+    """id/name of every foundational principle, for form dropdowns"""
+    return reference_cache.get_or_load(
+        'principle_choices', ('foundational_principle',),
+        lambda: [p.to_dict(['id', 'name']) for p in FoundationalPrinciple.query.order_by(FoundationalPrinciple.id)]
+    )
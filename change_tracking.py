@@ -0,0 +1,135 @@
+"""Per-table change counters maintained from SQLAlchemy session events.
+
+Every commit bumps a version counter (and a last-changed timestamp) in the
+``table_version`` table for each table it wrote to, inside the same
+transaction, so all worker processes agree on the current versions. Caches,
+snapshots and ETags compare versions to decide whether they are stale; local
+caches can also subscribe to be told which tables (and which rows, by
+primary key) this process changed.
+"""
+from datetime import datetime
+
+from flask import has_request_context, request
+from sqlalchemy import event, func, insert, select, update
+from sqlalchemy.orm import Session
+
+from models import db, TableVersion
+
+_subscribers = []
+
+_PENDING_KEY = 'touched_tables'
+_ROWS_KEY = 'touched_rows'
+# The per-request table_state memo. Kept in the WSGI environ, not on ``g``:
+# CLI commands and test clients run many requests in one app context
+_STATES_KEY = 'change_tracking.table_states'
+
+
+def table_state(*tables):
+    """(combined version, last change time) for ``tables`` in one query.
+
+    Looked up once per request: the ETag and the caches behind a view see the
+    same version. A local commit clears the memo.
+    """
+    memo = request.environ.setdefault(_STATES_KEY, {}) if has_request_context() else {}
+    key = frozenset(tables)
+    if key not in memo:
+        row = db.session.execute(
+            select(func.coalesce(func.sum(TableVersion.version), 0), func.max(TableVersion.changed_at))
+            .where(TableVersion.table_name.in_(tables))
+        ).one()
+        memo[key] = row[0], row[1]
+    return memo[key]
+
+
+def table_version(*tables):
+    """Combined version of ``tables``; increases whenever any of them changes"""
+    return table_state(*tables)[0]
+
+
+def last_changed(*tables):
+    """Most recent commit time touching any of ``tables`` (None if unchanged)"""
+    return table_state(*tables)[1]
+
+
+def subscribe(callback, rows=False):
+    """Call ``callback(tables)`` after every local commit that changed ``tables``.
+
+    With ``rows=True`` the callback is called as ``callback(tables, rows)``
+    where ``rows`` maps table names to the primary keys written, as far as
+    they are known (ORM objects and rows passed to mark_changed).
+    """
+    _subscribers.append((callback, rows))
+    return callback
+
+
+def mark_changed(session, *tables, ids=None):
+    """Record writes that bypass the unit of work (bulk/Core statements).
+
+    ``ids`` lists the primary keys written in the first of ``tables``.
+    """
+    session.info.setdefault(_PENDING_KEY, set()).update(tables)
+    if ids:
+        session.info.setdefault(_ROWS_KEY, {}).setdefault(tables[0], set()).update(ids)
+
+
+def _tables_for(obj):
+    mapper = obj.__mapper__
+    tables = {t.name for t in mapper.tables}
+    for rel in mapper.relationships:
+        if rel.secondary is not None:
+            tables.add(rel.secondary.name)
+    return tables
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_touched_tables(session, flush_context):
+    touched = session.info.setdefault(_PENDING_KEY, set())
+    rows = session.info.setdefault(_ROWS_KEY, {})
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        touched.update(_tables_for(obj))
+        mapper = obj.__mapper__
+        key = mapper.primary_key_from_instance(obj)
+        if len(key) == 1:
+            rows.setdefault(mapper.local_table.name, set()).add(key[0])
+
+
+@event.listens_for(Session, 'before_commit')
+def _write_versions(session):
+    # Flush first so pending objects are counted, then bump the counters in
+    # the transaction being committed
+    session.flush()
+    touched = session.info.get(_PENDING_KEY)
+    if not touched:
+        return
+    now = datetime.utcnow()
+    for table in sorted(touched):
+        result = session.execute(
+            update(TableVersion)
+            .where(TableVersion.table_name == table)
+            .values(version=TableVersion.version + 1, changed_at=now)
+        )
+        if result.rowcount == 0:
+            session.execute(insert(TableVersion).values(table_name=table, version=1, changed_at=now))
+
+
+@event.listens_for(Session, 'after_commit')
+def _notify_subscribers(session):
+    touched = session.info.pop(_PENDING_KEY, None)
+    rows = session.info.pop(_ROWS_KEY, None) or {}
+    if not touched:
+        return
+    if has_request_context():
+        request.environ.pop(_STATES_KEY, None)
+    tables = frozenset(touched)
+    rows = {table: frozenset(ids) for table, ids in rows.items()}
+    for callback, with_rows in _subscribers:
+        if with_rows:
+            callback(tables, rows)
+        else:
+            callback(tables)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_touched_tables(session):
+    session.info.pop(_PENDING_KEY, None)
+    session.info.pop(_ROWS_KEY, None)
@@ -0,0 +1,150 @@
+"""Content-negotiated response compression (brotli when installed, gzip).
+
+Text, JSON and NDJSON responses of at least ``COMPRESS_MIN_SIZE`` bytes are
+encoded for clients that accept it; streamed lists are encoded
+incrementally. Bodies that are identical on every hit (the hierarchy
+snapshot, the reference lists) are wrapped in ``CompressedBody`` and kept
+with their cache entry, so each encoding is computed once per version
+instead of once per request.
+
+Encoded responses carry a weak ETag: the validator still identifies the
+data version, but not the bytes of one particular encoding.
+"""
+import gzip
+import os
+import threading
+import zlib
+
+from flask import current_app, request
+from werkzeug.http import parse_accept_header
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+ENCODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+COMPRESSIBLE_MIMETYPES = {
+    'application/json', 'application/x-ndjson', 'application/javascript',
+    'application/xml', 'image/svg+xml',
+}
+# Per-request encoding favours speed; stored bodies are encoded once, so they
+# can afford a better ratio
+LEVELS = {'br': 4, 'gzip': 4}
+STORED_LEVELS = {'br': 9, 'gzip': 9}
+
+
+def negotiate(accept_encoding):
+    """Best encoding allowed by an Accept-Encoding header, or None for identity"""
+    if not accept_encoding:
+        return None
+    return parse_accept_header(accept_encoding).best_match(ENCODINGS)
+
+
+def compress(data, encoding, levels=LEVELS):
+    if encoding == 'br':
+        return brotli.compress(data, quality=levels['br'])
+    # mtime=0 keeps the output, and so stored bodies, deterministic
+    return gzip.compress(data, compresslevel=levels['gzip'], mtime=0)
+
+
+def _stream_encoder(encoding):
+    """(compress, flush, finish) callables encoding a body chunk by chunk"""
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=LEVELS['br'])
+        return compressor.process, compressor.flush, compressor.finish
+    compressor = zlib.compressobj(LEVELS['gzip'], zlib.DEFLATED, 31)  # 31: gzip container
+    return compressor.compress, lambda: compressor.flush(zlib.Z_SYNC_FLUSH), compressor.flush
+
+
+def _compress_chunks(chunks, encoding):
+    encode, flush, finish = _stream_encoder(encoding)
+    try:
+        for chunk in chunks:
+            # Flushed per chunk, so the client gets each chunk as it is produced
+            # instead of when the encoder's buffer fills
+            data = encode(chunk.encode() if isinstance(chunk, str) else chunk) + flush()
+            if data:
+                yield data
+        yield finish()
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
+
+
+def is_compressible(mimetype):
+    return mimetype is not None and (mimetype.startswith('text/') or mimetype in COMPRESSIBLE_MIMETYPES)
+
+
+def _weaken_etag(response):
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+
+
+class CompressedBody:
+    """A cacheable response body, compressed at most once per encoding"""
+
+    def __init__(self, body, mimetype='application/json'):
+        self.body = body.encode() if isinstance(body, str) else body
+        self.mimetype = mimetype
+        self._encoded = {}
+        self._lock = threading.Lock()
+
+    def encoded(self, encoding):
+        data = self._encoded.get(encoding)
+        if data is None:
+            with self._lock:
+                data = self._encoded.get(encoding)
+                if data is None:
+                    data = self._encoded[encoding] = compress(self.body, encoding, STORED_LEVELS)
+        return data
+
+    def response(self):
+        """Response for the current request, using a stored encoding if the client accepts one"""
+        response = current_app.response_class(self.body, mimetype=self.mimetype)
+        if len(self.body) >= current_app.config['COMPRESS_MIN_SIZE']:
+            response.vary.add('Accept-Encoding')
+            encoding = negotiate(request.headers.get('Accept-Encoding'))
+            if encoding is not None:
+                response.set_data(self.encoded(encoding))
+                response.headers['Content-Encoding'] = encoding
+        return response
+
+
+def compress_response(response):
+    """after_request hook: encode the response if it is worth it and the client accepts it"""
+    if response.status_code == 304:
+        # Revalidating an encoded copy: answer with the validator the client holds
+        etag, weak = response.get_etag()
+        if etag and request.if_none_match.is_weak(etag):
+            _weaken_etag(response)
+            response.vary.add('Accept-Encoding')
+        return response
+    if (not is_compressible(response.mimetype) or response.direct_passthrough
+            or response.status_code < 200 or response.status_code in (204, 206) or response.status_code >= 300
+            or 'no-transform' in response.headers.get('Cache-Control', '')):
+        return response
+    if 'Content-Encoding' in response.headers:
+        # Encoded by the view, e.g. a CompressedBody
+        _weaken_etag(response)
+        return response
+    if not response.is_streamed and response.calculate_content_length() < current_app.config['COMPRESS_MIN_SIZE']:
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = negotiate(request.headers.get('Accept-Encoding'))
+    if encoding is None:
+        return response
+    if response.is_streamed:
+        response.response = _compress_chunks(response.response, encoding)
+        response.headers.pop('Content-Length', None)
+    else:
+        response.set_data(compress(response.get_data(), encoding))
+    response.headers['Content-Encoding'] = encoding
+    _weaken_etag(response)
+    return response
+
+
+def init_compression(app):
+    app.config.setdefault('COMPRESS_MIN_SIZE', int(os.environ.get('COMPRESS_MIN_SIZE', 500)))
+    app.after_request(compress_response)
@@ -0,0 +1,54 @@
+"""Conditional GET support (ETag / Last-Modified) for read endpoints.
+
+Validators are derived from the table version counters kept by
+change_tracking, so a matching If-None-Match is answered with 304 after a
+single lookup, without running the list query or serializing anything.
+"""
+import hashlib
+from functools import wraps
+
+from flask import Response, make_response, request
+
+from change_tracking import table_state
+
+
+def compute_etag(tables):
+    """Strong ETag for the current request given the tables it reads"""
+    version, changed_at = table_state(*tables)
+    key = '|'.join([
+        request.full_path,
+        request.headers.get('Accept', ''),
+        str(version),
+        changed_at.isoformat() if changed_at else '',
+    ])
+    return hashlib.sha1(key.encode()).hexdigest(), changed_at
+
+
+def _not_modified(etag, changed_at):
+    if request.if_none_match:
+        # Weak comparison (RFC 7232): compressed responses carry W/ ETags
+        return request.if_none_match.contains_weak(etag)
+    if request.if_modified_since and changed_at:
+        return changed_at.replace(microsecond=0) <= request.if_modified_since.replace(tzinfo=None)
+    return False
+
+
+def conditional(*tables):
+    """Decorate a GET view so its response is validated by ``tables``' versions"""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            etag, changed_at = compute_etag(tables)
+            if _not_modified(etag, changed_at):
+                response = Response(status=304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            if changed_at:
+                response.last_modified = changed_at
+            response.headers['Cache-Control'] = 'no-cache'
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,139 @@
+"""Engine configuration: database URLs, pool settings and SQLite tuning.
+
+Everything is read from the environment so deployments can point at another
+database (e.g. Postgres) without code changes:
+
+- ``DATABASE_URL``: primary (read/write) database, default local SQLite file
+- ``DATABASE_READ_URL``: optional separate pool used for reads; for SQLite
+  set it to the same file to give readers their own ``query_only`` connections
+- ``DB_POOL_SIZE`` / ``DB_MAX_OVERFLOW`` / ``DB_POOL_TIMEOUT``: pool sizing
+- ``SQLITE_BUSY_TIMEOUT_MS`` / ``SQLITE_CACHE_SIZE_KB`` / ``SQLITE_MMAP_SIZE``
+"""
+import os
+
+from flask_sqlalchemy.session import Session
+from sqlalchemy import Delete, Insert, Select, Update, event
+from sqlalchemy.engine import Engine
+
+DEFAULT_DATABASE_URL = 'sqlite:///sustainability_db.sqlite'
+READ_BIND = 'read'
+
+_WROTE_KEY = 'wrote_in_transaction'
+
+
+def _env_int(name, default):
+    return int(os.environ.get(name, default))
+
+
+def database_url():
+    return os.environ.get('DATABASE_URL', DEFAULT_DATABASE_URL)
+
+
+def read_database_url():
+    return os.environ.get('DATABASE_READ_URL')
+
+
+def sqlite_pragmas():
+    """PRAGMAs applied to every new SQLite connection"""
+    return [
+        # Readers no longer block the writer (and vice versa)
+        ('journal_mode', 'WAL'),
+        # Safe with WAL; fsync only at checkpoints
+        ('synchronous', 'NORMAL'),
+        # Wait for the write lock instead of failing with "database is locked"
+        ('busy_timeout', _env_int('SQLITE_BUSY_TIMEOUT_MS', 5000)),
+        # Negative cache_size is in KiB
+        ('cache_size', -_env_int('SQLITE_CACHE_SIZE_KB', 64 * 1024)),
+        ('mmap_size', _env_int('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),
+        ('temp_store', 'MEMORY'),
+    ]
+
+
+def engine_options(url):
+    """SQLALCHEMY_ENGINE_OPTIONS for ``url``"""
+    if url.startswith('sqlite'):
+        if ':memory:' in url or url.rstrip('/') == 'sqlite:':
+            return {}
+        return {
+            'pool_size': _env_int('DB_POOL_SIZE', 10),
+            'max_overflow': _env_int('DB_MAX_OVERFLOW', 20),
+            'pool_timeout': _env_int('DB_POOL_TIMEOUT', 30),
+            # Connections are shared by worker threads through the pool;
+            # the driver-level timeout backs up busy_timeout
+            'connect_args': {'check_same_thread': False, 'timeout': _env_int('SQLITE_BUSY_TIMEOUT_MS', 5000) / 1000},
+        }
+    return {
+        'pool_size': _env_int('DB_POOL_SIZE', 10),
+        'max_overflow': _env_int('DB_MAX_OVERFLOW', 20),
+        'pool_timeout': _env_int('DB_POOL_TIMEOUT', 30),
+        'pool_pre_ping': True,
+        'pool_recycle': 1800,
+    }
+
+
+def configure_app(app):
+    """Set the SQLAlchemy config keys on ``app`` from the environment"""
+    url = database_url()
+    app.config['SQLALCHEMY_DATABASE_URI'] = url
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(url)
+    read_url = read_database_url()
+    if read_url:
+        options = engine_options(read_url)
+        options['execution_options'] = {'query_only': True}
+        app.config['SQLALCHEMY_BINDS'] = {READ_BIND: {'url': read_url, **options}}
+
+
+def apply_sqlite_pragmas(dbapi_connection):
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in sqlite_pragmas():
+            cursor.execute(f'PRAGMA {name}={value}')
+    finally:
+        cursor.close()
+
+
+@event.listens_for(Engine, 'connect')
+def _on_connect(dbapi_connection, connection_record):
+    if type(dbapi_connection).__module__.startswith('sqlite3'):
+        # journal_mode=WAL is persistent, the rest are per connection
+        apply_sqlite_pragmas(dbapi_connection)
+
+
+@event.listens_for(Engine, 'engine_connect')
+def _on_engine_connect(connection):
+    # The pool 'connect' event doesn't know which engine it serves, so read
+    # engines mark their DBAPI connections query_only on first checkout
+    if connection.engine.dialect.name != 'sqlite' or not connection.engine.get_execution_options().get('query_only'):
+        return
+    record_info = connection.connection.info
+    if not record_info.get('query_only'):
+        cursor = connection.connection.dbapi_connection.cursor()
+        try:
+            cursor.execute('PRAGMA query_only=ON')
+        finally:
+            cursor.close()
+        record_info['query_only'] = True
+
+
+class RoutingSession(Session):
+    """Sends plain SELECTs to the read bind when one is configured.
+
+    Once a transaction has written, it keeps using the primary database until
+    it ends so it always reads its own writes.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and READ_BIND in self._db.engines:
+            if self._flushing or isinstance(clause, (Insert, Update, Delete)):
+                self.info[_WROTE_KEY] = True
+            elif isinstance(clause, Select) and not self.info.get(_WROTE_KEY):
+                return self._db.engines[READ_BIND]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def _transaction_ended(session, *args):
+    session.info.pop(_WROTE_KEY, None)
+
+
+event.listen(RoutingSession, 'after_commit', _transaction_ended)
+event.listen(RoutingSession, 'after_rollback', _transaction_ended)
@@ -0,0 +1,177 @@
+"""Filter query language and facet counts for the list endpoints.
+
+Each filter is a query parameter holding one or more comma-separated values:
+values within a parameter are OR'ed, parameters are AND'ed::
+
+    /api/sustainability-strategies?cost=Low,Moderate&synergy_id=2,5
+
+Filters that reach another table (through a parent or an association table)
+are written as correlated EXISTS subqueries, so a strategy linked to several
+matching synergies is still returned once and the main query never joins.
+
+Ordinal ratings also accept ``<param>_min`` / ``<param>_max`` bounds
+(``?cost_max=Moderate``), which compare ranks and use the column's index.
+
+``?facets=cost,synergy_id`` adds per-value counts computed with GROUP BY. Each
+facet is counted under every filter except its own, so a client can show how
+many results each alternative value would give.
+"""
+from flask import request
+from sqlalchemy import exists, func, select
+
+from models import (db, FoundationalPrinciple, CorePillar, SustainabilityStrategy, Certification, Synergy,
+                    core_pillar_certifications, strategy_synergies)
+from pagination import QueryParamError
+
+LIKE_ESCAPE = '\\'
+
+
+def contains_pattern(term):
+    """``%term%`` with ``term``'s own ``%``/``_`` matched literally; use with ``escape=LIKE_ESCAPE``"""
+    for char in (LIKE_ESCAPE, '%', '_'):
+        term = term.replace(char, LIKE_ESCAPE + char)
+    return f'%{term}%'
+
+
+def _parse_int(param, raw):
+    try:
+        return int(raw)
+    except ValueError:
+        raise QueryParamError(f'{param} must be a comma-separated list of integers')
+
+
+def _parse_level(column):
+    def parse(param, raw):
+        try:
+            return column.type.normalize(raw)
+        except ValueError as e:
+            raise QueryParamError(f'{param} {e}')
+    return parse
+
+
+class Filter:
+    """A filterable/facetable value reached from the list's model.
+
+    ``joins`` is the (target, onclause) path from the model to the table
+    holding ``value``; ``label`` is a model whose ``name`` labels id values.
+    ``ranged`` columns also accept ``<param>_min`` / ``<param>_max``.
+    """
+
+    def __init__(self, param, value, parse=None, joins=(), label=None, ranged=False):
+        self.param = param
+        self.value = value
+        self.parse = parse
+        self.joins = joins
+        self.label = label
+        self.ranged = ranged
+
+    def parse_values(self, raw):
+        values = [v.strip() for v in raw.split(',') if v.strip()]
+        if not values:
+            raise QueryParamError(f'{self.param} must not be empty')
+        if self.parse is not None:
+            values = [self.parse(self.param, v) for v in values]
+        return values
+
+    def condition(self, model, values):
+        if not self.joins:
+            return self.value.in_(values)
+        # Semi-join: match rows that have at least one related value
+        onclauses = [onclause for _, onclause in self.joins]
+        return exists(select(1).where(*onclauses, self.value.in_(values)).correlate(model))
+
+    def conditions(self, model):
+        """WHERE clauses for this filter's parameters in the request"""
+        conditions = []
+        if self.param in request.args:
+            conditions.append(self.condition(model, self.parse_values(request.args[self.param])))
+        if self.ranged:
+            low, high = request.args.get(self.param + '_min'), request.args.get(self.param + '_max')
+            if low:
+                conditions.append(self.value >= self.parse(self.param + '_min', low))
+            if high:
+                conditions.append(self.value <= self.parse(self.param + '_max', high))
+        return conditions
+
+    def facet_query(self, model, conditions):
+        count = func.count(func.distinct(model.id)) if len(self.joins) > 1 else func.count()
+        columns = [self.value.label('value')]
+        if self.label is not None:
+            columns.append(self.label.name.label('name'))
+        query = select(*columns, count.label('count')).select_from(model)
+        for target, onclause in self.joins:
+            query = query.join(target, onclause)
+        if self.label is not None:
+            query = query.join(self.label, self.label.id == self.value)
+        query = query.where(self.value.is_not(None), *conditions).group_by(*columns[:2])
+        return query.order_by(columns[-1] if self.label is None else self.label.name)
+
+
+class FilterSpec:
+    """The filters and facets accepted by one list endpoint"""
+
+    def __init__(self, model, filters):
+        self.model = model
+        self.filters = {f.param: f for f in filters}
+
+    def conditions(self, exclude=None):
+        """WHERE clauses for the request's filters, optionally leaving one out"""
+        return [condition for param, f in self.filters.items() if param != exclude
+                for condition in f.conditions(self.model)]
+
+    def apply(self, query):
+        """Apply the request's filters to ``query``"""
+        conditions = self.conditions()
+        return query.filter(*conditions) if conditions else query
+
+    def requested_facets(self):
+        raw = request.args.get('facets')
+        if not raw:
+            return []
+        facets = [f.strip() for f in raw.split(',') if f.strip()]
+        unknown = [f for f in facets if f not in self.filters]
+        if unknown:
+            raise QueryParamError(f"Unknown facet(s): {', '.join(unknown)}")
+        return facets
+
+    def facet_counts(self):
+        """{facet: [{value, [name], count}]} for ?facets=, or None when not requested"""
+        facets = self.requested_facets()
+        if not facets:
+            return None
+        counts = {}
+        for param in facets:
+            query = self.filters[param].facet_query(self.model, self.conditions(exclude=param))
+            counts[param] = [dict(row._mapping) for row in db.session.execute(query)]
+        return counts
+
+
+STRATEGY_FILTERS = FilterSpec(SustainabilityStrategy, [
+    Filter('pillar_id', SustainabilityStrategy.core_pillar_id, _parse_int, label=CorePillar),
+    Filter('principle_id', CorePillar.foundational_principle_id, _parse_int,
+           joins=[(CorePillar, CorePillar.id == SustainabilityStrategy.core_pillar_id)],
+           label=FoundationalPrinciple),
+    Filter('cost', SustainabilityStrategy.cost, _parse_level(SustainabilityStrategy.cost), ranged=True),
+    Filter('performance_contribution', SustainabilityStrategy.performance_contribution,
+           _parse_level(SustainabilityStrategy.performance_contribution), ranged=True),
+    Filter('synergy_id', strategy_synergies.c.synergy_id, _parse_int,
+           joins=[(strategy_synergies,
+                   strategy_synergies.c.sustainability_strategy_id == SustainabilityStrategy.id)],
+           label=Synergy),
+    Filter('certification_id', core_pillar_certifications.c.certification_id, _parse_int,
+           joins=[(core_pillar_certifications,
+                   core_pillar_certifications.c.core_pillar_id == SustainabilityStrategy.core_pillar_id)],
+           label=Certification),
+])
+
+CORE_PILLAR_FILTERS = FilterSpec(CorePillar, [
+    Filter('principle_id', CorePillar.foundational_principle_id, _parse_int, label=FoundationalPrinciple),
+    Filter('certification_id', core_pillar_certifications.c.certification_id, _parse_int,
+           joins=[(core_pillar_certifications, core_pillar_certifications.c.core_pillar_id == CorePillar.id)],
+           label=Certification),
+    Filter('synergy_id', strategy_synergies.c.synergy_id, _parse_int,
+           joins=[(SustainabilityStrategy, SustainabilityStrategy.core_pillar_id == CorePillar.id),
+                  (strategy_synergies,
+                   strategy_synergies.c.sustainability_strategy_id == SustainabilityStrategy.id)],
+           label=Synergy),
+])
@@ -0,0 +1,49 @@
+"""Gunicorn settings, read from the environment.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+- ``BIND``: address to listen on (default ``0.0.0.0:5003``)
+- ``WEB_CONCURRENCY``: worker processes (default 2 x CPUs + 1)
+- ``THREADS``: threads per worker; above 1 uses the gthread worker (default 4)
+- ``KEEPALIVE``: seconds to hold idle keep-alive connections (default 5)
+- ``TIMEOUT`` / ``GRACEFUL_TIMEOUT``: worker timeouts in seconds (default 30)
+- ``MAX_REQUESTS``: recycle workers after this many requests (default 0, never)
+- ``ACCESS_LOG``: access log file, ``-`` for stdout, empty to disable (default ``-``)
+
+Each worker keeps its own in-process caches (reference lists, hierarchy
+snapshot, strategy index); they stay consistent through the shared
+``table_version`` counters.
+"""
+import multiprocessing
+import os
+
+
+def _env_int(name, default):
+    return int(os.environ.get(name, default))
+
+
+bind = os.environ.get('BIND', '0.0.0.0:5003')
+workers = _env_int('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1)
+threads = _env_int('THREADS', 4)
+worker_class = 'gthread' if threads > 1 else 'sync'
+keepalive = _env_int('KEEPALIVE', 5)
+timeout = _env_int('TIMEOUT', 30)
+graceful_timeout = _env_int('GRACEFUL_TIMEOUT', 30)
+max_requests = _env_int('MAX_REQUESTS', 0)
+max_requests_jitter = max_requests // 10
+accesslog = os.environ.get('ACCESS_LOG', '-') or None
+# Workers import the app themselves: database connections must not be
+# shared across fork
+preload_app = False
+
+
+def on_starting(server):
+    """Apply schema migrations once, in the master, before any worker starts"""
+    from app import app
+    from migrations import upgrade
+    from models import db
+
+    with app.app_context():
+        upgrade()
+        for engine in db.engines.values():
+            engine.dispose()
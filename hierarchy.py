@@ -0,0 +1,85 @@
+"""Materialized Principles -> Pillars -> Strategies tree for /api/hierarchy.
+
+The tree is built from row tuples in a fixed number of queries and kept
+in-process as a pre-encoded JSON body, compressed at most once per encoding.
+Commits touching any hierarchy table bump the snapshot version; the next
+request rebuilds it.
+"""
+import threading
+
+from flask import current_app
+
+from change_tracking import table_version
+from compression import CompressedBody
+from models import FoundationalPrinciple, CorePillar, SustainabilityStrategy
+from serializers import serializer_for
+
+HIERARCHY_TABLES = (
+    'foundational_principle',
+    'core_pillar',
+    'sustainability_strategy',
+    'certification',
+    'synergy',
+    'core_pillar_certifications',
+    'strategy_synergies',
+)
+
+
+class HierarchySnapshot:
+    def __init__(self, version, body):
+        self.version = version
+        self.body = body
+
+
+_snapshot = None
+_rebuild_lock = threading.Lock()
+
+
+def build_hierarchy():
+    """Build the nested tree from row tuples (5 queries, plus 2 per further 500 pillars/strategies)"""
+    principles = serializer_for(FoundationalPrinciple).fetch(
+        FoundationalPrinciple.query.order_by(FoundationalPrinciple.id))
+    # Parent names come from the rows already fetched instead of subqueries
+    pillars = serializer_for(CorePillar, [f for f in CorePillar.projectable_fields()
+                                          if f != 'foundational_principle_name']).fetch(
+        CorePillar.query.order_by(CorePillar.id))
+    strategies = serializer_for(SustainabilityStrategy, [f for f in SustainabilityStrategy.projectable_fields()
+                                                         if f != 'core_pillar_name']).fetch(
+        SustainabilityStrategy.query.order_by(SustainabilityStrategy.id))
+
+    principle_names = {p['id']: p['name'] for p in principles}
+    pillar_names = {p['id']: p['name'] for p in pillars}
+
+    strategies_by_pillar = {}
+    for data in strategies:
+        data['core_pillar_name'] = pillar_names.get(data['core_pillar_id'])
+        strategies_by_pillar.setdefault(data['core_pillar_id'], []).append(data)
+
+    pillars_by_principle = {}
+    for data in pillars:
+        data['foundational_principle_name'] = principle_names.get(data['foundational_principle_id'])
+        data['sustainability_strategies'] = strategies_by_pillar.get(data['id'], [])
+        pillars_by_principle.setdefault(data['foundational_principle_id'], []).append(data)
+
+    tree = []
+    for data in principles:
+        data['core_pillars'] = pillars_by_principle.get(data['id'], [])
+        tree.append(data)
+    return tree
+
+
+def get_hierarchy_snapshot():
+    """Return the current snapshot, rebuilding it if a commit made it stale"""
+    global _snapshot
+    version = table_version(*HIERARCHY_TABLES)
+    snapshot = _snapshot
+    if snapshot is not None and snapshot.version == version:
+        return snapshot
+    with _rebuild_lock:
+        snapshot = _snapshot
+        if snapshot is None or snapshot.version != version:
+            tree = build_hierarchy()
+            body = CompressedBody(current_app.json.dumps({'version': version, 'principles': tree}))
+            snapshot = HierarchySnapshot(version, body)
+            _snapshot = snapshot
+    return snapshot
@@ -0,0 +1,194 @@
+"""Resized and re-encoded variants of uploaded images.
+
+When a commit sets a new ``image_url`` on a pillar, strategy or contributor,
+the upload is queued on a background thread pool. The pool writes one resized
+copy per width in VARIANT_WIDTHS that is narrower than the original, both in
+the original format and as WebP (and AVIF when Pillow supports it), next to
+the original as ``<name>@<width>w.<ext>``. The row's ``image_variants`` is
+then filled in without touching ``updated_at``.
+
+Threads are enough: Pillow releases the GIL while decoding, resizing and
+encoding. Pillow is optional; without it uploads are served as-is.
+
+``/uploads/<path>?w=<px>`` serves the smallest variant at least ``w`` wide
+in the best format the client accepts (see resolve_variant).
+"""
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app, has_app_context
+from sqlalchemy import event, inspect, update
+from sqlalchemy.orm import Session
+from werkzeug.utils import safe_join
+
+from change_tracking import mark_changed
+from models import db
+from storage import UPLOAD_PREFIX, UPLOAD_MODELS
+
+try:
+    from PIL import Image, ImageOps, features
+except ImportError:  # optional dependency
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+VARIANT_WIDTHS = (160, 320, 640, 1280)
+IMAGE_WORKERS = int(os.environ.get('IMAGE_WORKERS', 2))
+
+# Encoder settings per output format (Pillow format name, save options)
+ENCODERS = {
+    'avif': ('AVIF', {'quality': 60}),
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+    'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+    'png': ('PNG', {'optimize': True}),
+}
+MIMETYPES = {'avif': 'image/avif', 'webp': 'image/webp'}
+
+_JOBS_KEY = 'image_jobs'
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _supports(feature):
+    try:
+        return bool(features.check(feature))
+    except ValueError:  # feature unknown to this Pillow version
+        return False
+
+
+def modern_formats():
+    """Extra formats written for every variant, best first"""
+    if Image is None:
+        return []
+    return [f for f in ('avif', 'webp') if _supports(f)]
+
+
+def variant_name(relative_path, width, extension):
+    stem = os.path.splitext(relative_path)[0]
+    return f'{stem}@{width}w.{extension}'
+
+
+def render_variants(upload_folder, relative_path):
+    """Write the variants of one upload; returns their descriptions"""
+    source = os.path.join(upload_folder, relative_path)
+    original_ext = os.path.splitext(relative_path)[1].lstrip('.').lower()
+    variants = []
+    with Image.open(source) as image:
+        if getattr(image, 'is_animated', False):
+            return variants  # keep animations as uploaded
+        # Let JPEG decode at a reduced scale when every variant is much smaller
+        image.draft('RGB', (max(VARIANT_WIDTHS), max(VARIANT_WIDTHS)))
+        image = ImageOps.exif_transpose(image)
+        formats = modern_formats()
+        if original_ext in ENCODERS and original_ext not in formats:
+            formats.append(original_ext)
+        for width in VARIANT_WIDTHS:
+            if width >= image.width:
+                break
+            height = max(1, round(image.height * width / image.width))
+            resized = image.resize((width, height), Image.LANCZOS)
+            for extension in formats:
+                pillow_format, options = ENCODERS[extension]
+                frame = resized
+                if pillow_format == 'JPEG' and frame.mode not in ('RGB', 'L'):
+                    frame = frame.convert('RGB')
+                name = variant_name(relative_path, width, extension)
+                frame.save(os.path.join(upload_folder, name), pillow_format, **options)
+                variants.append({'width': width, 'format': extension, 'url': UPLOAD_PREFIX + name})
+    return variants
+
+
+def _process(app, model, row_id, image_url):
+    with app.app_context():
+        try:
+            variants = render_variants(app.config['UPLOAD_FOLDER'], image_url[len(UPLOAD_PREFIX):])
+        except Exception:
+            logger.exception('Could not render variants of %s', image_url)
+            return
+        # Only if the row still shows this image; background work isn't an edit
+        result = db.session.execute(
+            update(model)
+            .where(model.id == row_id, model.image_url == image_url)
+            .values(image_variants=variants, updated_at=model.updated_at)
+        )
+        if result.rowcount:
+            mark_changed(db.session, model.__tablename__, ids=[row_id])
+        db.session.commit()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=IMAGE_WORKERS, thread_name_prefix='image-variants')
+        return _executor
+
+
+def schedule_variants(model, row_id, image_url, app=None):
+    """Queue variant generation for an uploaded image; returns the future (or None)"""
+    if Image is None or not image_url or not image_url.startswith(UPLOAD_PREFIX):
+        return None
+    app = app or current_app._get_current_object()
+    return _get_executor().submit(_process, app, model, row_id, image_url)
+
+
+def _image_changed(obj):
+    return isinstance(obj, UPLOAD_MODELS) and inspect(obj).attrs.image_url.history.has_changes()
+
+
+@event.listens_for(Session, 'before_flush')
+def _reset_variants(session, flush_context, instances):
+    # Variants of the previous image no longer apply
+    for obj in list(session.new) + list(session.dirty):
+        if _image_changed(obj):
+            obj.image_variants = []
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_jobs(session, flush_context):
+    jobs = session.info.setdefault(_JOBS_KEY, [])
+    for obj in list(session.new) + list(session.dirty):
+        if _image_changed(obj) and obj.image_url:
+            jobs.append((type(obj), obj.id, obj.image_url))
+
+
+@event.listens_for(Session, 'after_commit')
+def _submit_jobs(session):
+    jobs = session.info.pop(_JOBS_KEY, None)
+    if not jobs or not has_app_context():
+        return
+    for model, row_id, image_url in jobs:
+        schedule_variants(model, row_id, image_url)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_jobs(session):
+    session.info.pop(_JOBS_KEY, None)
+
+
+def _accepts(accept_mimetypes, extension):
+    mimetype = MIMETYPES.get(extension)
+    return mimetype is None or accept_mimetypes[mimetype] > 0
+
+
+def resolve_variant(upload_folder, relative_path, width, accept_mimetypes):
+    """Path of the best pre-rendered file for a ``width``-pixel slot.
+
+    The smallest variant at least ``width`` wide, preferring AVIF/WebP when
+    the client accepts them; the original when no variant is wide enough.
+    """
+    if safe_join(upload_folder, relative_path) is None:
+        return relative_path  # send_from_directory rejects it
+    original_ext = os.path.splitext(relative_path)[1].lstrip('.').lower()
+    extensions = [f for f in ('avif', 'webp') if _accepts(accept_mimetypes, f)] + [original_ext]
+    for candidate_width in VARIANT_WIDTHS:
+        if candidate_width < width:
+            continue
+        for extension in extensions:
+            name = variant_name(relative_path, candidate_width, extension)
+            if os.path.isfile(os.path.join(upload_folder, name)):
+                return name
+    return relative_path
@@ -0,0 +1,299 @@
+"""Incremental importer for workbook (.xlsx) and CSV data.
+
+Each worksheet (or CSV file) holds one resource; the sheet/file name selects
+it ("Core Pillars", "core_pillars.csv", ...) and the header row names the
+fields. Related rows are referenced by name (``foundational_principle``,
+``core_pillar``, ``certifications``, ``synergies``) or by id.
+
+Rows are read one at a time (openpyxl read-only mode / csv reader) and
+upserted in batches on each resource's natural key, so re-importing the same
+file updates rows in place and nothing is ever dropped.
+"""
+import csv
+import os
+import re
+import time
+
+from sqlalchemy import select
+
+from bulk import (BulkSpec, validate_items, apply_items,
+                  CORE_PILLAR_BULK, STRATEGY_BULK, PROJECT_BULK, CONTRIBUTOR_BULK)
+from models import db, FoundationalPrinciple, CorePillar, Certification, Synergy
+
+DEFAULT_BATCH_SIZE = 500
+MAX_REPORTED_ERRORS = 100
+
+PRINCIPLE_IMPORT = BulkSpec(FoundationalPrinciple, fields=('name', 'description'), required=('name',))
+CERTIFICATION_IMPORT = BulkSpec(Certification, fields=('name', 'icon_url'), required=('name',))
+SYNERGY_IMPORT = BulkSpec(Synergy, fields=('name', 'icon_url'), required=('name',))
+
+
+class ImportRowError(ValueError):
+    """A row that cannot be converted to an item"""
+
+
+def normalize_name(name):
+    """'Core Pillars' / 'core-pillars.csv' -> 'core_pillars'"""
+    return re.sub(r'[^a-z0-9]+', '_', str(name).strip().lower()).strip('_')
+
+
+def split_names(value):
+    """Split a multi-value cell ("SBTi, LEED" or one bullet per line)"""
+    if value is None:
+        return []
+    if isinstance(value, (list, tuple)):
+        return [str(v).strip() for v in value if str(v).strip()]
+    parts = re.split(r'[,;\n]', str(value))
+    return [p.strip().lstrip('•').strip() for p in parts if p.strip().lstrip('•').strip()]
+
+
+def _as_int(value, field):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ImportRowError(f'{field} must be an integer')
+
+
+def _name_map(model, column='name'):
+    """name -> set of ids for a (small) reference table"""
+    names = {}
+    for row_id, name in db.session.execute(select(model.id, getattr(model, column))):
+        names.setdefault(name, set()).add(row_id)
+    return names
+
+
+def _resolve_one(names, value, field):
+    ids = names.get(str(value).strip(), set())
+    if not ids:
+        raise ImportRowError(f'Unknown {field}: {value}')
+    if len(ids) > 1:
+        raise ImportRowError(f'Ambiguous {field} "{value}"; use {field}_id')
+    return next(iter(ids))
+
+
+def _resolve_many(names, values, field):
+    return [_resolve_one(names, v, field) for v in split_names(values)]
+
+
+class ImportResource:
+    """How rows of one sheet map onto a model"""
+
+    def __init__(self, name, spec, key, relations=None):
+        self.name = name
+        self.spec = spec
+        self.key = key
+        self.relations = relations or {}
+
+    def load_lookups(self):
+        """Name maps for the relations (loaded once per sheet)"""
+        return {field: _name_map(model) for field, (model, _, _) in self.relations.items()}
+
+    def to_item(self, row, lookups):
+        item = {f: row[f] for f in self.spec.fields if row.get(f) not in (None, '')}
+        for field in self.spec.fields:
+            if field.endswith('_id') and field in item:
+                item[field] = _as_int(item[field], field)
+        for field, (model, target, many) in self.relations.items():
+            if row.get(field) in (None, '') or target in item:
+                continue
+            if many:
+                item[target] = _resolve_many(lookups[field], row[field], field)
+            else:
+                item[target] = _resolve_one(lookups[field], row[field], field)
+        ids_key = self.spec.association.ids_key if self.spec.association else None
+        if ids_key and row.get(ids_key) not in (None, ''):
+            item[ids_key] = [_as_int(v, ids_key) for v in split_names(row[ids_key])]
+        if 'project_size' in item:
+            try:
+                item['project_size'] = float(item['project_size'])
+            except (TypeError, ValueError):
+                raise ImportRowError('project_size must be a number')
+        return item
+
+    def assign_existing_ids(self, items):
+        """Set ``id`` on items whose natural key already exists (one query)"""
+        model = self.spec.model
+        keyed = [i for i in items if all(i.get(k) is not None for k in self.key)]
+        if not keyed:
+            return
+        columns = [getattr(model, k) for k in self.key]
+        last = columns[-1]
+        query = select(model.id, *columns).where(last.in_({i[self.key[-1]] for i in keyed}))
+        existing = {tuple(row[1:]): row[0] for row in db.session.execute(query)}
+        for item in keyed:
+            row_id = existing.get(tuple(item[k] for k in self.key))
+            if row_id is not None:
+                item['id'] = row_id
+
+
+# Listed in dependency order: parents before the rows that reference them
+RESOURCES = [
+    ImportResource('foundational_principles', PRINCIPLE_IMPORT, key=('name',)),
+    ImportResource('certifications', CERTIFICATION_IMPORT, key=('name',)),
+    ImportResource('synergies', SYNERGY_IMPORT, key=('name',)),
+    ImportResource('core_pillars', CORE_PILLAR_BULK, key=('foundational_principle_id', 'name'),
+                   relations={
+                       'foundational_principle': (FoundationalPrinciple, 'foundational_principle_id', False),
+                       'certifications': (Certification, 'certification_ids', True),
+                   }),
+    ImportResource('sustainability_strategies', STRATEGY_BULK, key=('core_pillar_id', 'name'),
+                   relations={
+                       'core_pillar': (CorePillar, 'core_pillar_id', False),
+                       'synergies': (Synergy, 'synergy_ids', True),
+                   }),
+    ImportResource('projects', PROJECT_BULK, key=('project_name',)),
+    ImportResource('contributors', CONTRIBUTOR_BULK, key=('name',)),
+]
+RESOURCES_BY_NAME = {r.name: r for r in RESOURCES}
+ALIASES = {'principles': 'foundational_principles', 'pillars': 'core_pillars', 'strategies': 'sustainability_strategies'}
+
+
+def find_resource(name):
+    name = normalize_name(name)
+    return RESOURCES_BY_NAME.get(ALIASES.get(name, name))
+
+
+class ImportReport:
+    def __init__(self):
+        self.resources = {}
+        self.skipped = []
+        self.started = time.perf_counter()
+
+    def counts(self, resource):
+        return self.resources.setdefault(resource, {'rows': 0, 'created': 0, 'updated': 0, 'errors': []})
+
+    @property
+    def rows(self):
+        return sum(r['rows'] for r in self.resources.values())
+
+    def to_dict(self):
+        elapsed = time.perf_counter() - self.started
+        return {
+            'resources': self.resources,
+            'skipped_sheets': self.skipped,
+            'rows': self.rows,
+            'seconds': round(elapsed, 3),
+            'rows_per_sec': round(self.rows / elapsed, 1) if elapsed > 0 else None,
+        }
+
+
+def _flush_batch(resource, batch, counts):
+    """Upsert one batch of (row_number, item) and commit it"""
+    items = [item for _, item in batch]
+    resource.assign_existing_ids(items)
+    # Rows repeating a key within the batch: the last one wins
+    last_row = {}
+    for row_number, item in batch:
+        if all(item.get(k) is not None for k in resource.key):
+            last_row[tuple(item[k] for k in resource.key)] = row_number
+    superseded = {}
+    for row_number, item in batch:
+        if all(item.get(k) is not None for k in resource.key):
+            winner = last_row[tuple(item[k] for k in resource.key)]
+            if winner != row_number:
+                superseded[row_number] = f'Duplicate key; superseded by row {winner}'
+    errors = validate_items(resource.spec, items)
+    errors = [superseded.get(row_number, error) for (row_number, _), error in zip(batch, errors)]
+    valid = [item for item, error in zip(items, errors) if error is None]
+    for (row_number, _), error in zip(batch, errors):
+        if error and len(counts['errors']) < MAX_REPORTED_ERRORS:
+            counts['errors'].append({'row': row_number, 'error': error})
+    if not valid:
+        return
+    try:
+        results = apply_items(resource.spec, valid)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        counts['errors'].append({'row': batch[0][0], 'error': f'Batch failed: {str(e)}'})
+        return
+    for result in results:
+        counts[result['status']] += 1
+
+
+def import_rows(resource, rows, report=None, batch_size=DEFAULT_BATCH_SIZE):
+    """Upsert an iterable of {field: value} dicts (first data row is row 2)"""
+    report = report or ImportReport()
+    counts = report.counts(resource.name)
+    lookups = resource.load_lookups()
+    batch = []
+    for row_number, row in enumerate(rows, start=2):
+        if not any(v not in (None, '') for v in row.values()):
+            continue
+        counts['rows'] += 1
+        try:
+            batch.append((row_number, resource.to_item(row, lookups)))
+        except ImportRowError as e:
+            if len(counts['errors']) < MAX_REPORTED_ERRORS:
+                counts['errors'].append({'row': row_number, 'error': str(e)})
+        if len(batch) >= batch_size:
+            _flush_batch(resource, batch, counts)
+            batch = []
+    if batch:
+        _flush_batch(resource, batch, counts)
+    return report
+
+
+def _iter_sheet_rows(worksheet):
+    rows = worksheet.iter_rows(values_only=True)
+    header = None
+    for values in rows:
+        if header is None:
+            if any(v not in (None, '') for v in values):
+                header = [normalize_name(v) if v is not None else None for v in values]
+            continue
+        yield {k: v for k, v in zip(header, values) if k}
+
+
+def _iter_csv_rows(handle):
+    reader = csv.reader(handle)
+    header = None
+    for values in reader:
+        if header is None:
+            if any(values):
+                header = [normalize_name(v) for v in values]
+            continue
+        yield {k: v for k, v in zip(header, values) if k}
+
+
+def import_workbook(path, batch_size=DEFAULT_BATCH_SIZE, report=None):
+    """Import every recognised sheet of an .xlsx workbook in dependency order"""
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise RuntimeError('openpyxl is required to import .xlsx files (pip install openpyxl)')
+    report = report or ImportReport()
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        sheets = {}
+        for worksheet in workbook.worksheets:
+            resource = find_resource(worksheet.title)
+            if resource is None:
+                report.skipped.append(worksheet.title)
+            else:
+                sheets[resource.name] = worksheet
+        for resource in RESOURCES:
+            if resource.name in sheets:
+                import_rows(resource, _iter_sheet_rows(sheets[resource.name]), report, batch_size)
+    finally:
+        workbook.close()
+    return report
+
+
+def import_csv(path, resource_name=None, batch_size=DEFAULT_BATCH_SIZE, report=None):
+    """Import one CSV file; the resource defaults to the file name"""
+    report = report or ImportReport()
+    name = resource_name or os.path.splitext(os.path.basename(path))[0]
+    resource = find_resource(name)
+    if resource is None:
+        raise ValueError(f'Unknown resource "{name}"; expected one of: {", ".join(RESOURCES_BY_NAME)}')
+    with open(path, newline='', encoding='utf-8-sig') as handle:
+        import_rows(resource, _iter_csv_rows(handle), report, batch_size)
+    return report
+
+
+def import_file(path, resource_name=None, batch_size=DEFAULT_BATCH_SIZE):
+    """Import an .xlsx workbook or a .csv file"""
+    if path.lower().endswith('.csv'):
+        return import_csv(path, resource_name, batch_size)
+    return import_workbook(path, batch_size)
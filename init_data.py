@@ -1,10 +1,9 @@
 from models import db, FoundationalPrinciple, CorePillar, SustainabilityStrategy, Project, Contributor, Certification, Synergy
+from importer import ImportReport, find_resource, import_rows
 
 def init_sample_data():
-    """Initialize database with sample data from Excel structure"""
+    """Initialize database with sample data from Excel structure (existing rows are kept)"""
     
-    # Clear existing data
-    db.drop_all()
     db.create_all()
     
     # 1. Create 7 Foundational Principles (fixed)
@@ -18,14 +17,6 @@ def init_sample_data():
         {"name": "Innovation & Technology", "description": "Leveraging innovation and technology for sustainable solutions"}
     ]
     
-    principles = []
-    for p_data in principles_data:
-        principle = FoundationalPrinciple(**p_data)
-        db.session.add(principle)
-        principles.append(principle)
-    
-    db.session.commit()
-    
     # 2. Create Green Building Certifications
     certifications_data = [
         {"name": "SBTi"},
@@ -37,14 +28,6 @@ def init_sample_data():
         {"name": "National Priority"}
     ]
     
-    certifications = []
-    for c_data in certifications_data:
-        cert = Certification(**c_data)
-        db.session.add(cert)
-        certifications.append(cert)
-    
-    db.session.commit()
-    
     # 3. Create Synergy Categories
     synergies_data = [
         {"name": "Site & Ecology"},
@@ -56,91 +39,57 @@ def init_sample_data():
         {"name": "Lifecycle Value"}
     ]
     
-    synergies = []
-    for s_data in synergies_data:
-        synergy = Synergy(**s_data)
-        db.session.add(synergy)
-        synergies.append(synergy)
-    
-    db.session.commit()
+    # 4. Create sample Core Pillars (principles and certifications referenced by name)
+    core_pillars_data = [
+        {
+            "name": "Renewable Energy Integration",
+            "description": "Incorporating renewable energy sources",
+            "text_content": "Integrating solar, wind, and other renewable energy technologies",
+            "author": "Admin",
+            "foundational_principle": "Environmental Stewardship",
+            "certifications": ["SBTi", "GHG Protocol"]
+        },
+        {
+            "name": "Community Engagement",
+            "description": "Engaging with local communities",
+            "text_content": "Building strong relationships with local stakeholders",
+            "author": "Admin",
+            "foundational_principle": "Social Responsibility",
+            "certifications": ["UN SDG"]
+        },
+        {
+            "name": "Lifecycle Cost Analysis",
+            "description": "Evaluating total cost of ownership",
+            "text_content": "Considering long-term economic impacts",
+            "author": "Admin",
+            "foundational_principle": "Economic Viability",
+            "certifications": []
+        }
+    ]
     
-    # 4. Create sample Core Pillars (under first principle)
-    if principles:
-        core_pillars_data = [
-            {
-                "name": "Renewable Energy Integration",
-                "description": "Incorporating renewable energy sources",
-                "text_content": "Integrating solar, wind, and other renewable energy technologies",
-                "author": "Admin",
-                "foundational_principle": principles[0],  # Environmental Stewardship
-                "certifications": [certifications[0], certifications[1]]  # SBTi, GHG Protocol
-            },
-            {
-                "name": "Community Engagement",
-                "description": "Engaging with local communities",
-                "text_content": "Building strong relationships with local stakeholders",
-                "author": "Admin",
-                "foundational_principle": principles[1],  # Social Responsibility
-                "certifications": [certifications[2]]  # UN SDG
-            },
-            {
-                "name": "Lifecycle Cost Analysis",
-                "description": "Evaluating total cost of ownership",
-                "text_content": "Considering long-term economic impacts",
-                "author": "Admin",
-                "foundational_principle": principles[2],  # Economic Viability
-                "certifications": []
-            }
-        ]
-        
-        core_pillars = []
-        for cp_data in core_pillars_data:
-            certs = cp_data.pop('certifications', [])
-            fp = cp_data.pop('foundational_principle')
-            cp_data['foundational_principle_id'] = fp.id
-            
-            cp = CorePillar(**cp_data)
-            cp.certifications = certs
-            db.session.add(cp)
-            core_pillars.append(cp)
-        
-        db.session.commit()
-        
-        # 5. Create sample Sustainability Strategies
-        if core_pillars:
-            strategies_data = [
-                {
-                    "name": "Solar Panel Installation",
-                    "description": "Install rooftop solar panels",
-                    "text_content": "Photovoltaic panels for renewable electricity generation",
-                    "author": "Admin",
-                    "cost": "High",
-                    "performance_contribution": "Exemplary",
-                    "core_pillar": core_pillars[0],
-                    "synergies": [synergies[1], synergies[2]]  # Energy Efficiency, Water Conservation
-                },
-                {
-                    "name": "Energy Efficient HVAC",
-                    "description": "High-efficiency heating and cooling systems",
-                    "text_content": "Modern HVAC systems with high SEER ratings",
-                    "author": "Admin",
-                    "cost": "Moderate",
-                    "performance_contribution": "High",
-                    "core_pillar": core_pillars[0],
-                    "synergies": [synergies[1], synergies[4]]  # Energy Efficiency, Indoor Wellbeing
-                }
-            ]
-            
-            for s_data in strategies_data:
-                syns = s_data.pop('synergies', [])
-                cp = s_data.pop('core_pillar')
-                s_data['core_pillar_id'] = cp.id
-                
-                strategy = SustainabilityStrategy(**s_data)
-                strategy.synergies = syns
-                db.session.add(strategy)
-            
-            db.session.commit()
+    # 5. Create sample Sustainability Strategies
+    strategies_data = [
+        {
+            "name": "Solar Panel Installation",
+            "description": "Install rooftop solar panels",
+            "text_content": "Photovoltaic panels for renewable electricity generation",
+            "author": "Admin",
+            "cost": "High",
+            "performance_contribution": "Exemplary",
+            "core_pillar": "Renewable Energy Integration",
+            "synergies": ["Energy Efficiency", "Water Conservation"]
+        },
+        {
+            "name": "Energy Efficient HVAC",
+            "description": "High-efficiency heating and cooling systems",
+            "text_content": "Modern HVAC systems with high SEER ratings",
+            "author": "Admin",
+            "cost": "Moderate",
+            "performance_contribution": "High",
+            "core_pillar": "Renewable Energy Integration",
+            "synergies": ["Energy Efficiency", "Indoor Wellbeing"]
+        }
+    ]
     
     # 6. Create sample Projects
     projects_data = [
@@ -162,12 +111,6 @@ def init_sample_data():
         }
     ]
     
-    for p_data in projects_data:
-        project = Project(**p_data)
-        db.session.add(project)
-    
-    db.session.commit()
-    
     # 7. Create sample Contributors
     contributors_data = [
         {
@@ -184,11 +127,18 @@ def init_sample_data():
         }
     ]
     
-    for c_data in contributors_data:
-        contributor = Contributor(**c_data)
-        db.session.add(contributor)
-    
-    db.session.commit()
+    # Upsert everything through the importer: re-running updates rows in place
+    report = ImportReport()
+    for resource_name, rows in [
+        ('foundational_principles', principles_data),
+        ('certifications', certifications_data),
+        ('synergies', synergies_data),
+        ('core_pillars', core_pillars_data),
+        ('sustainability_strategies', strategies_data),
+        ('projects', projects_data),
+        ('contributors', contributors_data),
+    ]:
+        import_rows(find_resource(resource_name), rows, report)
     
     print("Database initialized with sample data!")
     print(f"- {FoundationalPrinciple.query.count()} Foundational Principles")
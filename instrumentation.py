@@ -0,0 +1,125 @@
+"""Query counting, per-endpoint query budgets and index checks.
+
+``QUERY_BUDGETS`` caps the SQL statements each endpoint may issue, whatever
+the table sizes; ``INDEXED_URLS`` lists filtered and paginated reads whose
+queries must not scan a whole table. tests/test_query_plans.py enforces both
+against a seeded database, and ``flask --app app check-query-plans`` runs the
+same checks against the configured one.
+"""
+from contextlib import contextmanager
+from sqlalchemy import event
+
+
+class QueryCounter:
+    """Counts SQL statements executed on an engine"""
+
+    def __init__(self):
+        self.count = 0
+        self.statements = []
+        self.queries = []
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+        self.statements.append(statement)
+        if not executemany:
+            self.queries.append((conn.engine, statement, parameters))
+
+
+@contextmanager
+def count_queries(*engines):
+    """Context manager yielding a QueryCounter for statements run inside it"""
+    counter = QueryCounter()
+    for engine in engines:
+        event.listen(engine, 'before_cursor_execute', counter)
+    try:
+        yield counter
+    finally:
+        for engine in engines:
+            event.remove(engine, 'before_cursor_execute', counter)
+
+
+# Queries each endpoint may issue, independent of table size. API reads
+# include one table_version lookup for their ETag.
+QUERY_BUDGETS = {
+    '/api/foundational-principles': 2,
+    '/api/core-pillars': 3,
+    '/api/sustainability-strategies': 3,
+    '/api/projects': 2,
+    '/api/contributors': 2,
+    '/api/certifications': 2,
+    '/api/synergies': 2,
+    # ETag, project, synergy version, index version + first index load (2), top-k rows
+    '/api/projects/1/recommended-strategies': 7,
+    '/api/sustainability-strategies/1/similar': 6,
+    '/api/synergies/co-occurrence': 5,
+    # ETag (also the rollup's version), then all counts and breakdowns in one query (stats.py)
+    '/api/stats': 2,
+    '/admin/': 2,
+    # Admin tables: a COUNT for the pager plus the page (and its collections)
+    '/admin/foundational-principles': 2,
+    # plus a version lookup each for the cached principle and certification choices
+    # (and the first load of the principle choices)
+    '/admin/core-pillars': 6,
+    '/admin/core-pillars?q=energy&sort=-strategies&page=2': 5,
+    '/admin/core-pillars/lookup?q=en': 1,
+    '/admin/sustainability-strategies': 4,
+    # plus the pillar being filtered on
+    '/admin/sustainability-strategies?core_pillar_id=1&sort=-cost&per_page=100': 5,
+    '/admin/projects': 2,
+    '/admin/contributors': 2,
+}
+
+
+def check_query_budgets(app, db, budgets=QUERY_BUDGETS):
+    """Request every budgeted endpoint and return the ones over budget"""
+    failures = []
+    client = app.test_client()
+    with app.app_context():
+        engines = list(db.engines.values())
+    for url, budget in budgets.items():
+        with count_queries(*engines) as counter:
+            response = client.get(url)
+        if response.status_code != 200 or counter.count > budget:
+            failures.append((url, response.status_code, counter.count, budget))
+    return failures
+
+
+# Filtered and paginated list requests whose queries must all be index
+# searches. Unfiltered full listings scan by design and are not included.
+INDEXED_URLS = [
+    '/api/core-pillars?principle_id=1',
+    '/api/core-pillars?principle_id=1&limit=10&after=WzBd',
+    '/api/core-pillars?limit=10&after=WzBd',
+    '/api/sustainability-strategies?pillar_id=1',
+    '/api/sustainability-strategies?pillar_id=1&limit=10&after=WzBd',
+    '/api/sustainability-strategies?limit=10&after=WzBd',
+    '/api/sustainability-strategies?sort=cost&limit=10&after=WyJMb3ciLDVd',
+    '/api/sustainability-strategies?sort=-performance_contribution&limit=10',
+    '/api/sustainability-strategies?cost_min=Low&cost_max=Moderate&limit=10',
+    '/api/projects?limit=10&after=WzBd',
+    '/api/contributors?limit=10&after=WzBd',
+]
+
+
+def full_scans(engine, statement, parameters):
+    """EXPLAIN QUERY PLAN details that read a whole table (SQLite only)"""
+    if engine.dialect.name != 'sqlite' or not statement.lstrip().upper().startswith('SELECT'):
+        return []
+    with engine.connect() as connection:
+        plan = connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters).all()
+    return [row[-1] for row in plan if row[-1].startswith('SCAN ') and ' USING ' not in row[-1]]
+
+
+def check_index_usage(app, db, urls=INDEXED_URLS):
+    """Request ``urls`` and return (url, statement, plan detail) for every scan"""
+    failures = []
+    client = app.test_client()
+    with app.app_context():
+        engines = list(db.engines.values())
+    for url in urls:
+        with count_queries(*engines) as counter:
+            client.get(url)
+        for engine, statement, parameters in counter.queries:
+            for detail in full_scans(engine, statement, parameters):
+                failures.append((url, ' '.join(statement.split()), detail))
+    return failures
@@ -0,0 +1,106 @@
+"""Schema migrations for existing databases.
+
+``db.create_all()`` creates missing tables but never alters existing ones, so
+changes to tables that already exist are applied here as numbered steps.
+Applied steps are recorded in ``schema_migration``; ``upgrade()`` is safe to
+run repeatedly (``flask --app app upgrade-db``, and on every ``python app.py``).
+"""
+from datetime import datetime
+
+from sqlalchemy import Integer, inspect
+
+from models import db, CorePillar, SustainabilityStrategy, Contributor
+from search import create_search_index
+
+
+class SchemaMigration(db.Model):
+    __tablename__ = 'schema_migration'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(200), nullable=False)
+    applied_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+def create_missing_indexes(connection):
+    """Create every index declared in models.py that the database lacks"""
+    inspector = inspect(connection)
+    created = []
+    for table in db.metadata.sorted_tables:
+        existing = {ix['name'] for ix in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(connection)
+                created.append(index.name)
+    return created
+
+
+def convert_strategy_ratings(connection):
+    """Replace the cost/performance_contribution labels with their ordinal ranks"""
+    table = SustainabilityStrategy.__table__
+    existing = {c['name']: c['type'] for c in inspect(connection).get_columns(table.name)}
+    pending = [table.c[name] for name in ('cost', 'performance_contribution')
+               if not isinstance(existing[name], Integer)]
+    rank_of = {}
+    for column in pending:
+        cases = ' '.join(f"WHEN '{level.lower()}' THEN {rank}" for rank, level in enumerate(column.type.levels))
+        rank_of[column.key] = f'CASE lower(trim({column.key})) {cases} END'
+        # Check everything before altering anything: no label may be lost
+        unknown = connection.exec_driver_sql(
+            f'SELECT DISTINCT {column.key} FROM {table.name} '
+            f'WHERE {column.key} IS NOT NULL AND ({rank_of[column.key]}) IS NULL'
+        ).scalars().all()
+        if unknown:
+            raise ValueError(f"Unrecognised {column.key} value(s) {unknown}; expected one of "
+                             f"{', '.join(column.type.levels)}. Fix them and rerun the upgrade.")
+    for column in pending:
+        name, index = column.key, f'ix_{table.name}_{column.key}'
+        connection.exec_driver_sql(f'ALTER TABLE {table.name} ADD COLUMN {name}_rank SMALLINT')
+        connection.exec_driver_sql(f'UPDATE {table.name} SET {name}_rank = {rank_of[name]}')
+        connection.exec_driver_sql(f'DROP INDEX IF EXISTS {index}')
+        connection.exec_driver_sql(f'ALTER TABLE {table.name} DROP COLUMN {name}')
+        connection.exec_driver_sql(f'ALTER TABLE {table.name} RENAME COLUMN {name}_rank TO {name}')
+        connection.exec_driver_sql(f'CREATE INDEX {index} ON {table.name} ({name})')
+
+
+def add_image_variants(connection):
+    """Add the image_variants column to the tables with uploaded images"""
+    inspector = inspect(connection)
+    for model in (CorePillar, SustainabilityStrategy, Contributor):
+        table = model.__tablename__
+        if 'image_variants' not in {c['name'] for c in inspector.get_columns(table)}:
+            connection.exec_driver_sql(
+                f"ALTER TABLE {table} ADD COLUMN image_variants JSON NOT NULL DEFAULT '[]'"
+            )
+
+def add_stored_at(connection):
+    """Add stored_file.stored_at (last upload of the content), starting from created_at"""
+    inspector = inspect(connection)
+    if not inspector.has_table('stored_file'):
+        return
+    if 'stored_at' not in {c['name'] for c in inspector.get_columns('stored_file')}:
+        connection.exec_driver_sql('ALTER TABLE stored_file ADD COLUMN stored_at TIMESTAMP')
+        connection.exec_driver_sql('UPDATE stored_file SET stored_at = COALESCE(created_at, CURRENT_TIMESTAMP)')
+
+MIGRATIONS = [
+    (1, 'add foreign key, association and filter indexes', create_missing_indexes),
+    (2, 'add full-text search index for pillars and strategies', create_search_index),
+    (3, 'store strategy cost and performance as ordinal integers', convert_strategy_ratings),
+    (4, 'add image variants to pillars, strategies and contributors', add_image_variants),
+    (5, 'record when each stored upload was last stored', add_stored_at),
+]
+
+
+def upgrade():
+    """Create missing tables and apply pending migrations; returns their names"""
+    db.create_all()
+    applied = {m.id for m in SchemaMigration.query.all()}
+    done = []
+    for migration_id, name, step in MIGRATIONS:
+        if migration_id in applied:
+            continue
+        with db.engine.begin() as connection:
+            step(connection)
+        db.session.add(SchemaMigration(id=migration_id, name=name))
+        db.session.commit()
+        done.append(name)
+    return done
@@ -1,20 +1,137 @@
 from flask_sqlalchemy import SQLAlchemy
+from database import RoutingSession
+from sqlalchemy import func, select
+from sqlalchemy.orm import joinedload, selectinload, undefer, validates
 from datetime import datetime
+from serializers import serializer_for
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+
+
+class ProjectionMixin:
+    """Field projection (?fields=) shared by all API models.
+
+    Projectable fields are the model's columns (minus ``hidden_fields``) plus
+    ``computed_fields``, which map a to_dict key to a getter and the columns
+    the getter needs loaded. ``computed_columns`` gives the same fields as SQL
+    expressions so lists can be serialized from row tuples (serializers.py).
+    """
+    hidden_fields = ()
+    computed_fields = {}
+    serialized_tables = ()
+    # Indexed columns accepted by ?sort= besides id
+    sortable_fields = ()
+
+    @classmethod
+    def dependent_tables(cls):
+        """Tables whose changes can alter this model's serialized form"""
+        return cls.serialized_tables or (cls.__tablename__,)
+
+    @classmethod
+    def column_fields(cls):
+        return [c.key for c in cls.__table__.columns if c.key not in cls.hidden_fields]
+
+    @classmethod
+    def projectable_fields(cls):
+        return cls.column_fields() + list(cls.computed_fields)
+
+    @classmethod
+    def required_columns(cls, fields):
+        """Columns that must be SELECTed to serialize ``fields``"""
+        columns = {'id'}
+        for field in fields:
+            if field in cls.computed_fields:
+                columns.update(cls.computed_fields[field][1])
+            else:
+                columns.add(field)
+        return [c for c in cls.column_fields() if c in columns]
+
+    @classmethod
+    def field_loaders(cls):
+        """Loader options keyed by the computed field that needs them"""
+        return {}
+
+    @classmethod
+    def computed_columns(cls):
+        """SQL expressions for scalar computed fields (collections are loaded separately)"""
+        return {}
+
+    @classmethod
+    def loading_plan(cls, fields=None):
+        """Loader options that serialize ``fields`` in a constant number of queries"""
+        options = []
+        for field, loaders in cls.field_loaders().items():
+            if fields is None or field in fields:
+                options.extend(loaders)
+        return options
+
+    def to_dict(self, fields=None):
+        return serializer_for(type(self), fields).instance(self)
+
+# Ordered scales for strategy ratings, lowest first
+COST_LEVELS = ('Innovative', 'Very Low', 'Low', 'Moderate', 'High')
+PERFORMANCE_LEVELS = ('Low', 'Moderate', 'High', 'Exemplary')
+
+
+class Ordinal(db.TypeDecorator):
+    """A label from ``levels`` stored as its position, so it sorts and compares by rank"""
+    impl = db.SmallInteger
+    cache_ok = True
+
+    def __init__(self, levels):
+        super().__init__()
+        self.levels = tuple(levels)
+
+    def normalize(self, value):
+        """Canonical label for ``value`` (case/whitespace-insensitive) or ValueError"""
+        if isinstance(value, str):
+            wanted = ' '.join(value.split()).lower()
+            for level in self.levels:
+                if level.lower() == wanted:
+                    return level
+        raise ValueError(f"must be one of: {', '.join(self.levels)}")
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return self.levels.index(self.normalize(value))
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return self.levels[value]
+
+
+def level_error(column, value):
+    """Validation message if ``value`` is not a level of the Ordinal ``column`` (None if valid)"""
+    try:
+        column.type.normalize(value)
+    except ValueError as e:
+        return f'{column.key} {e}'
+    return None
 
 # Association tables for many-to-many relationships
+# The composite primary keys cover lookups by the first column; the second
+# column gets its own index for reverse lookups (e.g. strategies per synergy)
 core_pillar_certifications = db.Table('core_pillar_certifications',
     db.Column('core_pillar_id', db.Integer, db.ForeignKey('core_pillar.id'), primary_key=True),
-    db.Column('certification_id', db.Integer, db.ForeignKey('certification.id'), primary_key=True)
+    db.Column('certification_id', db.Integer, db.ForeignKey('certification.id'), primary_key=True, index=True)
 )
 
 strategy_synergies = db.Table('strategy_synergies',
     db.Column('sustainability_strategy_id', db.Integer, db.ForeignKey('sustainability_strategy.id'), primary_key=True),
-    db.Column('synergy_id', db.Integer, db.ForeignKey('synergy.id'), primary_key=True)
+    db.Column('synergy_id', db.Integer, db.ForeignKey('synergy.id'), primary_key=True, index=True)
 )
 
-class FoundationalPrinciple(db.Model):
+class TableVersion(db.Model):
+    """Change counter per table, bumped in the same transaction as the write"""
+    __tablename__ = 'table_version'
+    
+    table_name = db.Column(db.String(100), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    changed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+class FoundationalPrinciple(ProjectionMixin, db.Model):
     """Layer 1: Fixed 7 principles that cannot be deleted"""
     __tablename__ = 'foundational_principle'
     
@@ -27,52 +144,69 @@ class FoundationalPrinciple(db.Model):
     # Relationships
     core_pillars = db.relationship('CorePillar', backref='foundational_principle', lazy=True, cascade='all, delete-orphan')
     
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'name': self.name,
-            'description': self.description,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
-            'core_pillars_count': len(self.core_pillars)
-        }
+    serialized_tables = ('foundational_principle', 'core_pillar')
+    sortable_fields = ('name',)
+    computed_fields = {
+        'core_pillars_count': (lambda p: p.core_pillars_count, ()),
+    }
+    
+    @classmethod
+    def field_loaders(cls):
+        return {'core_pillars_count': [undefer(cls.core_pillars_count)]}
+    
+    @classmethod
+    def computed_columns(cls):
+        return {'core_pillars_count': cls.core_pillars_count}
 
-class CorePillar(db.Model):
+class CorePillar(ProjectionMixin, db.Model):
     """Layer 2: Variable core pillars under foundational principles"""
     __tablename__ = 'core_pillar'
     
     id = db.Column(db.Integer, primary_key=True)
-    foundational_principle_id = db.Column(db.Integer, db.ForeignKey('foundational_principle.id'), nullable=False)
-    name = db.Column(db.String(200), nullable=False)
+    foundational_principle_id = db.Column(db.Integer, db.ForeignKey('foundational_principle.id'), nullable=False, index=True)
+    name = db.Column(db.String(200), nullable=False, index=True)
     description = db.Column(db.Text)
     text_content = db.Column(db.Text)  # Text & Photos content
     image_url = db.Column(db.String(500))  # Image upload path
+    image_variants = db.Column(db.JSON, nullable=False, default=list, server_default='[]')  # Resized copies (images.py)
     author = db.Column(db.String(200))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationships
-    certifications = db.relationship('Certification', secondary=core_pillar_certifications, lazy='subquery',
+    certifications = db.relationship('Certification', secondary=core_pillar_certifications, lazy=True,
                                      backref=db.backref('core_pillars', lazy=True))
     sustainability_strategies = db.relationship('SustainabilityStrategy', backref='core_pillar', lazy=True, cascade='all, delete-orphan')
     
-    def to_dict(self):
+    serialized_tables = ('core_pillar', 'foundational_principle', 'certification',
+                         'core_pillar_certifications', 'sustainability_strategy')
+    sortable_fields = ('name',)
+    computed_fields = {
+        'foundational_principle_name': (lambda p: p.foundational_principle.name if p.foundational_principle else None,
+                                        ('foundational_principle_id',)),
+        'certifications': (lambda p: [c.to_dict() for c in p.certifications], ()),
+        'sustainability_strategies_count': (lambda p: p.sustainability_strategies_count, ()),
+    }
+    
+    @classmethod
+    def field_loaders(cls):
         return {
-            'id': self.id,
-            'foundational_principle_id': self.foundational_principle_id,
-            'foundational_principle_name': self.foundational_principle.name if self.foundational_principle else None,
-            'name': self.name,
-            'description': self.description,
-            'text_content': self.text_content,
-            'image_url': self.image_url,
-            'author': self.author,
-            'certifications': [c.to_dict() for c in self.certifications],
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
-            'sustainability_strategies_count': len(self.sustainability_strategies)
+            'foundational_principle_name': [joinedload(cls.foundational_principle)
+                                            .load_only(FoundationalPrinciple.id, FoundationalPrinciple.name)],
+            'certifications': [selectinload(cls.certifications)],
+            'sustainability_strategies_count': [undefer(cls.sustainability_strategies_count)],
+        }
+    
+    @classmethod
+    def computed_columns(cls):
+        return {
+            'foundational_principle_name': select(FoundationalPrinciple.name)
+                                           .where(FoundationalPrinciple.id == cls.foundational_principle_id)
+                                           .correlate_except(FoundationalPrinciple).scalar_subquery(),
+            'sustainability_strategies_count': cls.sustainability_strategies_count,
         }
 
-class Certification(db.Model):
+class Certification(ProjectionMixin, db.Model):
     """Green Building Certifications (SBTi, GHG Protocol, etc.)"""
     __tablename__ = 'certification'
     
@@ -81,51 +215,62 @@ class Certification(db.Model):
     icon_url = db.Column(db.String(500))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'name': self.name,
-            'icon_url': self.icon_url
-        }
+    hidden_fields = ('created_at',)
 
-class SustainabilityStrategy(db.Model):
+class SustainabilityStrategy(ProjectionMixin, db.Model):
     """Layer 3: Variable sustainability strategies under core pillars"""
     __tablename__ = 'sustainability_strategy'
     
     id = db.Column(db.Integer, primary_key=True)
-    core_pillar_id = db.Column(db.Integer, db.ForeignKey('core_pillar.id'), nullable=False)
-    name = db.Column(db.String(200), nullable=False)
+    core_pillar_id = db.Column(db.Integer, db.ForeignKey('core_pillar.id'), nullable=False, index=True)
+    name = db.Column(db.String(200), nullable=False, index=True)
     description = db.Column(db.Text)
     text_content = db.Column(db.Text)  # Text & Photos content
     image_url = db.Column(db.String(500))  # Image upload path
+    image_variants = db.Column(db.JSON, nullable=False, default=list, server_default='[]')  # Resized copies (images.py)
     author = db.Column(db.String(200))
-    cost = db.Column(db.String(50))  # Innovative, Very Low, Low, Moderate, High
-    performance_contribution = db.Column(db.String(50))  # Low, Moderate, High, Exemplary
+    cost = db.Column(Ordinal(COST_LEVELS), index=True)
+    performance_contribution = db.Column(Ordinal(PERFORMANCE_LEVELS), index=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationships
-    synergies = db.relationship('Synergy', secondary=strategy_synergies, lazy='subquery',
+    synergies = db.relationship('Synergy', secondary=strategy_synergies, lazy=True,
                                 backref=db.backref('strategies', lazy=True))
     
-    def to_dict(self):
+    serialized_tables = ('sustainability_strategy', 'core_pillar', 'synergy', 'strategy_synergies')
+    sortable_fields = ('name', 'cost', 'performance_contribution')
+    computed_fields = {
+        'core_pillar_name': (lambda s: s.core_pillar.name if s.core_pillar else None, ('core_pillar_id',)),
+        'synergies': (lambda s: [syn.to_dict() for syn in s.synergies], ()),
+    }
+    
+    @classmethod
+    def field_loaders(cls):
+        return {
+            'core_pillar_name': [joinedload(cls.core_pillar).load_only(CorePillar.id, CorePillar.name)],
+            'synergies': [selectinload(cls.synergies)],
+        }
+    
+    @classmethod
+    def computed_columns(cls):
         return {
-            'id': self.id,
-            'core_pillar_id': self.core_pillar_id,
-            'core_pillar_name': self.core_pillar.name if self.core_pillar else None,
-            'name': self.name,
-            'description': self.description,
-            'text_content': self.text_content,
-            'image_url': self.image_url,
-            'author': self.author,
-            'cost': self.cost,
-            'performance_contribution': self.performance_contribution,
-            'synergies': [s.to_dict() for s in self.synergies],
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+            'core_pillar_name': select(CorePillar.name).where(CorePillar.id == cls.core_pillar_id)
+                                .correlate_except(CorePillar).scalar_subquery(),
         }
+    
+    @validates('cost', 'performance_contribution')
+    def validate_level(self, key, value):
+        """Store ratings by their canonical label; unknown labels raise ValueError"""
+        if value is None:
+            return None
+        column = self.__table__.c[key]
+        error = level_error(column, value)
+        if error:
+            raise ValueError(error)
+        return column.type.normalize(value)
 
-class Synergy(db.Model):
+class Synergy(ProjectionMixin, db.Model):
     """Synergy categories (Site & Ecology, Energy Efficiency, etc.)"""
     __tablename__ = 'synergy'
     
@@ -134,14 +279,9 @@ class Synergy(db.Model):
     icon_url = db.Column(db.String(500))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'name': self.name,
-            'icon_url': self.icon_url
-        }
+    hidden_fields = ('created_at',)
 
-class Project(db.Model):
+class Project(ProjectionMixin, db.Model):
     """Project Portfolio entries"""
     __tablename__ = 'project'
     
@@ -154,21 +294,8 @@ class Project(db.Model):
     design_stage = db.Column(db.String(100))  # Feasibility Study, Concept Design, etc.
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
-    
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'project_name': self.project_name,
-            'project_size': float(self.project_size) if self.project_size else None,
-            'project_address': self.project_address,
-            'construction_type': self.construction_type,
-            'project_type': self.project_type,
-            'design_stage': self.design_stage,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None
-        }
 
-class Contributor(db.Model):
+class Contributor(ProjectionMixin, db.Model):
     """Contributors page entries"""
     __tablename__ = 'contributor'
     
@@ -178,18 +305,24 @@ class Contributor(db.Model):
     email = db.Column(db.String(200))
     bio = db.Column(db.Text)
     image_url = db.Column(db.String(500))
+    image_variants = db.Column(db.JSON, nullable=False, default=list, server_default='[]')
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
-    
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'name': self.name,
-            'role': self.role,
-            'email': self.email,
-            'bio': self.bio,
-            'image_url': self.image_url,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None
-        }
 
+# SQL-side counts: deferred correlated subqueries, undeferred by loading plans
+# so list endpoints never load a child collection just to take its length.
+FoundationalPrinciple.core_pillars_count = db.column_property(
+    select(func.count(CorePillar.id))
+    .where(CorePillar.foundational_principle_id == FoundationalPrinciple.id)
+    .correlate_except(CorePillar)
+    .scalar_subquery(),
+    deferred=True
+)
+
+CorePillar.sustainability_strategies_count = db.column_property(
+    select(func.count(SustainabilityStrategy.id))
+    .where(SustainabilityStrategy.core_pillar_id == CorePillar.id)
+    .correlate_except(SustainabilityStrategy)
+    .scalar_subquery(),
+    deferred=True
+)
@@ -0,0 +1,194 @@
+import base64
+import binascii
+import json
+
+from flask import jsonify, request
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import load_only
+
+from serializers import serializer_for
+from streaming import stream_query, wants_stream
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+class QueryParamError(ValueError):
+    """Raised for malformed list query parameters (reported as 400)"""
+
+
+def encode_cursor(values):
+    """Encode the keyset of the last row on a page as an opaque cursor"""
+    raw = json.dumps(values, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Decode a cursor produced by encode_cursor"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (binascii.Error, ValueError):
+        raise QueryParamError('Invalid cursor')
+    if not isinstance(values, list) or not values:
+        raise QueryParamError('Invalid cursor')
+    return values
+
+
+def parse_fields(model, args=None):
+    """Parse ?fields=a,b,c into a list of projectable fields (None = all)"""
+    raw = (request.args if args is None else args).get('fields')
+    if not raw:
+        return None
+    fields = [f.strip() for f in raw.split(',') if f.strip()]
+    allowed = model.projectable_fields()
+    unknown = [f for f in fields if f not in allowed]
+    if unknown:
+        raise QueryParamError(f"Unknown field(s): {', '.join(unknown)}")
+    return fields
+
+
+def parse_limit(args=None, default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE):
+    """Parse ?limit=N, capped at ``maximum`` (``default`` when absent)"""
+    limit = (request.args if args is None else args).get('limit')
+    if limit is None:
+        return default
+    try:
+        limit = int(limit)
+    except ValueError:
+        raise QueryParamError('limit must be an integer')
+    if limit < 1:
+        raise QueryParamError('limit must be positive')
+    return min(limit, maximum)
+
+
+def parse_sort(model):
+    """Parse ?sort=field / ?sort=-field into (column, descending); (None, False) = by id"""
+    raw = request.args.get('sort')
+    if not raw or raw in ('id', '-id'):
+        return None, raw == '-id'
+    descending = raw.startswith('-')
+    name = raw[1:] if descending else raw
+    if name not in model.sortable_fields:
+        allowed = ', '.join(('id',) + tuple(model.sortable_fields))
+        raise QueryParamError(f'Cannot sort by {name}; sortable fields: {allowed}')
+    return getattr(model, name), descending
+
+
+def sort_order(model, column, descending):
+    """ORDER BY for the sort, with the id as tie-breaker and NULLs lowest"""
+    if column is None:
+        return [model.id.desc() if descending else model.id]
+    if descending:
+        return [column.desc().nulls_last(), model.id.desc()]
+    return [column.asc().nulls_first(), model.id]
+
+
+def _decode_sort_cursor(model, column, cursor):
+    values = decode_cursor(cursor)
+    last_id = values[-1]
+    if not isinstance(last_id, int) or len(values) != (1 if column is None else 2):
+        raise QueryParamError('Invalid cursor')
+    if column is None:
+        return None, last_id
+    value = values[0]
+    if value is not None:
+        normalize = getattr(column.type, 'normalize', None)
+        try:
+            if not isinstance(value, str) or (normalize and normalize(value) != value):
+                raise ValueError
+        except ValueError:
+            raise QueryParamError('Invalid cursor')
+    return value, last_id
+
+
+def after_clause(model, column, descending, cursor):
+    """Rows strictly after the cursor's (sort value, id) in sort order"""
+    value, last_id = _decode_sort_cursor(model, column, cursor)
+    if column is None:
+        return model.id < last_id if descending else model.id > last_id
+    if descending:
+        # NULLs sort last: after a NULL only later NULLs remain
+        if value is None:
+            return and_(column.is_(None), model.id < last_id)
+        return or_(and_(column <= value, or_(column < value, model.id < last_id)), column.is_(None))
+    if value is None:
+        return or_(column.is_not(None), model.id > last_id)
+    return and_(column >= value, or_(column > value, model.id > last_id))
+
+
+def cursor_for(row, column):
+    if column is None:
+        return encode_cursor([row.id])
+    return encode_cursor([getattr(row, column.key), row.id])
+
+
+class Page:
+    """One page of a list endpoint"""
+
+    def __init__(self, items, next_cursor=None, paginated=False, facets=None):
+        self.items = items  # serialized rows
+        self.next_cursor = next_cursor
+        self.paginated = paginated
+        self.facets = facets
+
+    def to_response(self):
+        """Bare array for legacy callers, envelope once ?after/?limit/?facets is used"""
+        data = self.items
+        if self.facets is not None:
+            return {'items': data, 'next_cursor': self.next_cursor, 'facets': self.facets}
+        if not self.paginated:
+            return data
+        return {'items': data, 'next_cursor': self.next_cursor}
+
+
+def apply_projection(query, model, fields, extra_columns=()):
+    """Restrict the SELECT to the columns needed for ``fields`` (plus ``extra_columns``)"""
+    if fields is None:
+        return query
+    needed = set(model.required_columns(fields)) | set(extra_columns)
+    columns = [getattr(model, c) for c in model.column_fields() if c in needed]
+    return query.options(load_only(*columns))
+
+
+def paginate(query, model):
+    """Serialize the ?fields= of one keyset page of ``query``.
+
+    Rows are ordered by ?sort= (default: primary key) with the id as
+    tie-breaker; the cursor carries the last row's (sort value, id) so each
+    page is an index range scan regardless of how deep the client is.
+    Without ?after or ?limit the whole result is returned as before.
+    """
+    column, descending = parse_sort(model)
+    serializer = serializer_for(model, parse_fields(model))
+    # The sort column must be selected to build the next cursor
+    query = serializer.select(query, [column.key] if column is not None else ())
+    order = sort_order(model, column, descending)
+    paginated = 'after' in request.args or 'limit' in request.args
+    if not paginated:
+        return Page(serializer.serialize(query.order_by(*order).all(), query.session))
+
+    limit = parse_limit()
+    after = request.args.get('after')
+    if after:
+        query = query.filter(after_clause(model, column, descending, after))
+
+    rows = query.order_by(*order).limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = cursor_for(rows[-1], column)
+    return Page(serializer.serialize(rows, query.session), next_cursor, paginated=True)
+
+
+def list_response(query, model, facets=None):
+    """Response for a list endpoint: a page, or a stream of the whole collection"""
+    if wants_stream():
+        if facets is not None:
+            raise QueryParamError('facets cannot be combined with streaming')
+        serializer = serializer_for(model, parse_fields(model))
+        query = serializer.select(query).order_by(*sort_order(model, *parse_sort(model)))
+        return stream_query(query, serializer)
+    page = paginate(query, model)
+    page.facets = facets
+    return jsonify(page.to_response())
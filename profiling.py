@@ -0,0 +1,240 @@
+"""Per-request timing, SQL instrumentation and Prometheus metrics.
+
+``init_profiling(app)`` records for every request:
+
+- wall time (request start to the response leaving the view)
+- number of SQL statements and time spent in them (cursor events on every engine)
+- serialization time: compiled serializers (serializers.py) plus JSON encoding
+- response size (when known up front; streamed bodies are not measured)
+
+and reports them in a ``Server-Timing`` header and as per-endpoint histograms
+at ``/metrics`` (Prometheus text format, per process). With ``PROFILE_REQUESTS=1``
+(or in debug mode) ``?profile=1`` replaces the response with a cProfile report.
+Requests answered outside Flask (asgi.py) time themselves with
+``request_timing()`` and report through ``record_request()``.
+"""
+import cProfile
+import functools
+import io
+import os
+import pstats
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import perf_counter
+
+from flask import Response, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from serializers import Serializer
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+PROFILE_LINES = 60
+
+# Stats of a request handled without a Flask request context (asgi.py)
+_outside_stats = ContextVar('request_stats', default=None)
+
+
+class RequestStats:
+    def __init__(self):
+        self.start = perf_counter()
+        self.sql_count = 0
+        self.sql_seconds = 0.0
+        self.serialize_seconds = 0.0
+        self.serializing = False
+
+
+def current_stats():
+    if has_request_context():
+        return g.get('request_stats')
+    return _outside_stats.get()
+
+
+@contextmanager
+def request_timing():
+    """Collect RequestStats for a request that does not go through Flask"""
+    stats = RequestStats()
+    token = _outside_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _outside_stats.reset(token)
+
+
+class Histogram:
+    """A Prometheus histogram with one series per label set"""
+
+    def __init__(self, name, documentation, buckets, labels):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = buckets
+        self.labels = labels
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * len(self.buckets), 0, 0.0]
+            counts = series[0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            series[1] += 1
+            series[2] += value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = sorted(self._series.items())
+            for label_values, (counts, total, value_sum) in series:
+                labels = ','.join(f'{k}="{_escape(v)}"' for k, v in zip(self.labels, label_values))
+                for bound, count in zip(self.buckets, counts):
+                    lines.append(f'{self.name}_bucket{{{labels},le="{bound}"}} {count}')
+                lines.append(f'{self.name}_bucket{{{labels},le="+Inf"}} {total}')
+                lines.append(f'{self.name}_count{{{labels}}} {total}')
+                lines.append(f'{self.name}_sum{{{labels}}} {value_sum}')
+        return '\n'.join(lines)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+REQUEST_DURATION = Histogram('http_request_duration_seconds', 'Request wall time',
+                             DURATION_BUCKETS, ('method', 'endpoint', 'status'))
+SQL_QUERIES = Histogram('http_request_sql_queries', 'SQL statements per request',
+                        QUERY_COUNT_BUCKETS, ('method', 'endpoint'))
+SQL_DURATION = Histogram('http_request_sql_duration_seconds', 'Time in SQL statements per request',
+                         DURATION_BUCKETS, ('method', 'endpoint'))
+SERIALIZE_DURATION = Histogram('http_request_serialize_duration_seconds',
+                               'Time in to_dict and JSON encoding per request',
+                               DURATION_BUCKETS, ('method', 'endpoint'))
+RESPONSE_SIZE = Histogram('http_response_size_bytes', 'Response body size',
+                          SIZE_BUCKETS, ('method', 'endpoint'))
+METRICS = (REQUEST_DURATION, SQL_QUERIES, SQL_DURATION, SERIALIZE_DURATION, RESPONSE_SIZE)
+
+
+# The start time lives on the statement's execution context, which is discarded
+# with it: a statement that raises (no after_cursor_execute) leaves nothing behind
+@event.listens_for(Engine, 'before_cursor_execute')
+def _query_started(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context.profiling_start = perf_counter()
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _query_finished(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, 'profiling_start', None)
+    stats = current_stats()
+    if stats is not None and started is not None:
+        stats.sql_count += 1
+        stats.sql_seconds += perf_counter() - started
+
+
+def timed_serialization(method):
+    """Add the time spent in ``method`` to the request's serialization time (outermost call only)"""
+    if getattr(method, 'timed_serialization', False):
+        return method
+
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        stats = current_stats()
+        if stats is None or stats.serializing:
+            return method(*args, **kwargs)
+        stats.serializing = True
+        start = perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            stats.serialize_seconds += perf_counter() - start
+            stats.serializing = False
+    wrapper.timed_serialization = True
+    return wrapper
+
+
+# Wrapped once per process; outside a request the wrappers only call through.
+# Serializer.serialize also runs the nested-collection queries, which count as SQL time
+Serializer.convert = timed_serialization(Serializer.convert)
+Serializer.instance = timed_serialization(Serializer.instance)
+
+
+def _instrument_json(app):
+    # timed_serialization() leaves already wrapped methods alone, so this is idempotent
+    app.json.dumps = timed_serialization(app.json.dumps)
+    app.json.response = timed_serialization(app.json.response)
+
+
+def _endpoint():
+    return request.url_rule.rule if request.url_rule else 'unmatched'
+
+
+def _profile_requested(app):
+    return (app.config['PROFILE_REQUESTS'] or app.debug) and request.args.get('profile') == '1'
+
+
+def _profile_report(profiler, stats):
+    out = io.StringIO()
+    out.write(f'{request.method} {request.full_path}\n'
+              f'{stats.sql_count} SQL statements, {stats.sql_seconds * 1000:.1f} ms in SQL, '
+              f'{stats.serialize_seconds * 1000:.1f} ms serializing\n\n')
+    pstats.Stats(profiler, stream=out).sort_stats('cumulative').print_stats(PROFILE_LINES)
+    return Response(out.getvalue(), mimetype='text/plain')
+
+
+def server_timing(stats, total):
+    return ', '.join([
+        f'app;dur={total * 1000:.1f}',
+        f'db;dur={stats.sql_seconds * 1000:.1f};desc="{stats.sql_count} queries"',
+        f'serialize;dur={stats.serialize_seconds * 1000:.1f}',
+    ])
+
+
+def record_request(stats, method, endpoint, status, size):
+    """Add a finished request to the /metrics histograms"""
+    REQUEST_DURATION.observe(perf_counter() - stats.start, method, endpoint, status)
+    SQL_QUERIES.observe(stats.sql_count, method, endpoint)
+    SQL_DURATION.observe(stats.sql_seconds, method, endpoint)
+    SERIALIZE_DURATION.observe(stats.serialize_seconds, method, endpoint)
+    if size is not None:
+        RESPONSE_SIZE.observe(size, method, endpoint)
+
+
+def metrics():
+    """Prometheus text exposition of the request histograms"""
+    body = '\n'.join(m.render() for m in METRICS) + '\n'
+    return Response(body, mimetype='text/plain; version=0.0.4')
+
+
+def init_profiling(app):
+    app.config.setdefault('PROFILE_REQUESTS', os.environ.get('PROFILE_REQUESTS') == '1')
+    _instrument_json(app)
+    app.add_url_rule('/metrics', 'metrics', metrics)
+
+    @app.before_request
+    def start_request_stats():
+        g.request_stats = RequestStats()
+        if _profile_requested(app):
+            g.profiler = cProfile.Profile()
+            g.profiler.enable()
+
+    @app.after_request
+    def record_request_stats(response):
+        stats = g.pop('request_stats', None)
+        if stats is None:
+            return response
+        profiler = g.pop('profiler', None)
+        if profiler is not None:
+            profiler.disable()
+            response = _profile_report(profiler, stats)
+        total = perf_counter() - stats.start
+        response.headers['Server-Timing'] = server_timing(stats, total)
+        if request.endpoint == 'metrics':
+            return response
+        size = response.content_length or response.calculate_content_length()
+        record_request(stats, request.method, _endpoint(), response.status_code, size)
+        return response
@@ -0,0 +1,164 @@
+"""Ranked strategy recommendations for a project.
+
+Every strategy gets a score in three normalised (0..1) terms::
+
+    score = PERFORMANCE_WEIGHT * performance
+          - COST_WEIGHT * cost_sensitivity * cost
+          + SYNERGY_WEIGHT * synergy
+
+``performance`` and ``cost`` are the strategy's rating ranks scaled to 0..1
+(unrated counts as the worst value); ``synergy`` is the share of the project's
+target synergies the strategy has. Target synergies come from the project's
+type and construction type, cost sensitivity from its construction type and
+design stage.
+
+A score depends only on the strategy's (cost, performance) ratings and its
+number of matching synergies, so scoring is done per class over the bitsets
+in strategy_index: a bit-sliced adder over the target synergy postings splits
+the strategies by match count, each count is intersected with each rating
+class, and classes are visited best-first until ``limit`` strategies are
+collected. The work depends on the number of classes, not of strategies.
+"""
+from sqlalchemy.orm import load_only
+
+from cache import all_synergies
+from models import SustainabilityStrategy, COST_LEVELS, PERFORMANCE_LEVELS
+from pagination import parse_limit
+from strategy_index import bits, match_count_sets, strategy_index
+
+DEFAULT_RECOMMENDATIONS = 10
+MAX_RECOMMENDATIONS = 100
+
+PERFORMANCE_WEIGHT = 0.5
+COST_WEIGHT = 0.3
+SYNERGY_WEIGHT = 0.2
+
+# Synergies that matter most for each project type / construction type
+PROJECT_TYPE_SYNERGIES = {
+    'Resi - Detached House': ('Energy Efficiency', 'Indoor Wellbeing', 'Site & Ecology'),
+    'Resi - Apartment Unit': ('Energy Efficiency', 'Indoor Wellbeing'),
+    'Resi - Apartment Building': ('Energy Efficiency', 'Indoor Wellbeing', 'Water Conservation', 'Waste Management'),
+    'Office': ('Energy Efficiency', 'Indoor Wellbeing', 'Lifecycle Value'),
+    'Educational': ('Indoor Wellbeing', 'Energy Efficiency', 'Site & Ecology'),
+    'Retail': ('Energy Efficiency', 'Waste Management', 'Lifecycle Value'),
+    'Industrial': ('Energy Efficiency', 'Water Conservation', 'Waste Management'),
+    'Data Centre': ('Energy Efficiency', 'Water Conservation', 'Lifecycle Value'),
+    'Other Commercial': ('Energy Efficiency', 'Lifecycle Value'),
+}
+CONSTRUCTION_TYPE_SYNERGIES = {
+    'New Construction': ('Site & Ecology', 'Sustainable Materials'),
+    'Retrofit': ('Energy Efficiency', 'Lifecycle Value'),
+    'Interior Renovation': ('Sustainable Materials', 'Indoor Wellbeing'),
+    'Fit-Out': ('Sustainable Materials', 'Waste Management'),
+    'Extension': ('Site & Ecology', 'Sustainable Materials'),
+}
+# Work on existing buildings and late design stages leave less budget headroom
+CONSTRUCTION_COST_SENSITIVITY = {
+    'New Construction': 1.0,
+    'Extension': 1.0,
+    'Retrofit': 1.25,
+    'Interior Renovation': 1.25,
+    'Fit-Out': 1.5,
+}
+DESIGN_STAGE_COST_SENSITIVITY = {
+    'Feasibility Study': 0.75,
+    'Concept Design': 0.85,
+    'Technical Design': 1.0,
+    'Construction': 1.25,
+    'Handover & Close-Out': 1.5,
+    'Operation / In-Use': 1.5,
+}
+
+
+def _key(value):
+    return ' '.join(str(value).split()).lower() if value else None
+
+
+def _lookup(table, value, default):
+    wanted = _key(value)
+    for name, result in table.items():
+        if _key(name) == wanted:
+            return result
+    return default
+
+
+def project_profile(project):
+    """Target synergies (id, name) and cost sensitivity for ``project``"""
+    names = _lookup(PROJECT_TYPE_SYNERGIES, project.project_type, ())
+    names += _lookup(CONSTRUCTION_TYPE_SYNERGIES, project.construction_type, ())
+    synergy_ids = {_key(s['name']): s['id'] for s in all_synergies()}
+    targets = {}
+    for name in names:
+        synergy_id = synergy_ids.get(_key(name))
+        if synergy_id is not None:
+            targets.setdefault(synergy_id, name)
+    sensitivity = (_lookup(CONSTRUCTION_COST_SENSITIVITY, project.construction_type, 1.0)
+                   * _lookup(DESIGN_STAGE_COST_SENSITIVITY, project.design_stage, 1.0))
+    return list(targets.items()), sensitivity
+
+
+def score_breakdown(ranks, matches, targets, sensitivity):
+    cost_rank, performance_rank = ranks
+    performance = (performance_rank or 0) / (len(PERFORMANCE_LEVELS) - 1)
+    cost = (len(COST_LEVELS) - 1 if cost_rank is None else cost_rank) / (len(COST_LEVELS) - 1)
+    synergy = matches / targets if targets else 0.0
+    return {
+        'performance': round(PERFORMANCE_WEIGHT * performance, 4),
+        'cost': 0.0 - round(COST_WEIGHT * sensitivity * cost, 4),
+        'synergy': round(SYNERGY_WEIGHT * synergy, 4),
+    }
+
+
+def rank_strategies(targets, sensitivity, limit):
+    """Top ``limit`` (strategy id, score, breakdown, matched synergy ids), best first"""
+    target_ids = [synergy_id for synergy_id, _ in targets]
+    target_mask = sum(1 << synergy_id for synergy_id in target_ids)
+    with strategy_index.reading() as index:
+        count_sets = match_count_sets([index.postings.get(s, 0) for s in target_ids], index.live)
+        classes = []
+        for ranks, members in index.rating_sets.items():
+            for matches, with_count in enumerate(count_sets):
+                selected = members & with_count
+                if selected:
+                    breakdown = score_breakdown(ranks, matches, len(target_ids), sensitivity)
+                    classes.append((round(sum(breakdown.values()), 4), ranks[1] or 0, selected, breakdown))
+        # Best score first, ties to the better performer; lower ids first within a class
+        classes.sort(key=lambda c: (-c[0], -c[1]))
+        ranked = []
+        for score, _, selected, breakdown in classes:
+            for position in bits(selected):
+                matched = list(bits(index.masks[position] & target_mask))
+                ranked.append((index.ids[position], score, breakdown, matched))
+                if len(ranked) == limit:
+                    return ranked
+    return ranked
+
+
+def recommend(project):
+    """Response body for GET /projects/<id>/recommended-strategies"""
+    targets, sensitivity = project_profile(project)
+    limit = parse_limit(default=DEFAULT_RECOMMENDATIONS, maximum=MAX_RECOMMENDATIONS)
+    ranked = rank_strategies(targets, sensitivity, limit)
+    strategy = SustainabilityStrategy
+    rows = strategy.query.options(load_only(
+        strategy.id, strategy.core_pillar_id, strategy.name, strategy.cost, strategy.performance_contribution
+    )).filter(strategy.id.in_([r[0] for r in ranked])).all()
+    by_id = {row.id: row for row in rows}
+    names = dict(targets)
+    items = []
+    for strategy_id, score, breakdown, matched in ranked:
+        row = by_id.get(strategy_id)
+        if row is None:
+            continue
+        items.append({
+            'strategy': row.to_dict(['id', 'core_pillar_id', 'name', 'cost', 'performance_contribution']),
+            'score': score,
+            'breakdown': breakdown,
+            'matched_synergies': [names[s] for s in matched],
+        })
+    return {
+        'project_id': project.id,
+        'profile': {'target_synergies': [name for _, name in targets], 'cost_sensitivity': sensitivity},
+        'weights': {'performance': PERFORMANCE_WEIGHT, 'cost': COST_WEIGHT, 'synergy': SYNERGY_WEIGHT},
+        'items': items,
+    }
@@ -0,0 +1,163 @@
+"""Full-text search over core pillars and sustainability strategies.
+
+On SQLite the searchable columns are mirrored into an FTS5 table kept in sync
+by triggers, so bulk/Core writes are indexed too. The FTS rowid encodes the
+source row (``id * 2`` for pillars, ``id * 2 + 1`` for strategies) so updates
+and deletes touch the index by rowid. Other databases fall back to LIKE.
+"""
+import html
+import re
+
+from flask import request
+from sqlalchemy import literal, or_, select, text, union_all
+
+from filters import LIKE_ESCAPE, contains_pattern
+from models import db, CorePillar, SustainabilityStrategy
+from pagination import QueryParamError, decode_cursor, encode_cursor, parse_limit
+
+SEARCH_TABLE = 'search_index'
+SEARCH_COLUMNS = ('name', 'description', 'text_content', 'author')
+# bm25 weights per column: a hit in the name outranks one in the body text
+COLUMN_WEIGHTS = (10.0, 4.0, 2.0, 1.0)
+
+# (type, source table, rowid offset)
+SOURCES = (
+    ('core_pillar', 'core_pillar', 0),
+    ('sustainability_strategy', 'sustainability_strategy', 1),
+)
+TYPES = {kind: offset for kind, _, offset in SOURCES}
+# snippet() delimits matches with these private-use characters; the text is
+# HTML-escaped first and only then are they replaced by <mark> tags
+MATCH_START, MATCH_END = '\ue000', '\ue001'
+
+
+def _columns(prefix=''):
+    return ', '.join(prefix + c for c in SEARCH_COLUMNS)
+
+
+def fts_ddl():
+    """Statements creating the FTS table and its sync triggers"""
+    statements = [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5("
+        f"{_columns()}, tokenize='unicode61 remove_diacritics 2')"
+    ]
+    for _, table, offset in SOURCES:
+        rowid = f'new.id * 2 + {offset}'
+        old_rowid = f'old.id * 2 + {offset}'
+        statements += [
+            f"CREATE TRIGGER IF NOT EXISTS {table}_search_ai AFTER INSERT ON {table} BEGIN "
+            f"INSERT INTO {SEARCH_TABLE}(rowid, {_columns()}) VALUES ({rowid}, {_columns('new.')}); END",
+            f"CREATE TRIGGER IF NOT EXISTS {table}_search_ad AFTER DELETE ON {table} BEGIN "
+            f"DELETE FROM {SEARCH_TABLE} WHERE rowid = {old_rowid}; END",
+            f"CREATE TRIGGER IF NOT EXISTS {table}_search_au AFTER UPDATE OF {_columns()} ON {table} BEGIN "
+            f"DELETE FROM {SEARCH_TABLE} WHERE rowid = {old_rowid}; "
+            f"INSERT INTO {SEARCH_TABLE}(rowid, {_columns()}) VALUES ({rowid}, {_columns('new.')}); END",
+        ]
+    return statements
+
+
+def create_search_index(connection):
+    """Migration step: create the FTS table and triggers, then backfill it"""
+    if connection.dialect.name != 'sqlite':
+        return
+    for statement in fts_ddl():
+        connection.exec_driver_sql(statement)
+    connection.exec_driver_sql(f'DELETE FROM {SEARCH_TABLE}')
+    for _, table, offset in SOURCES:
+        connection.exec_driver_sql(
+            f'INSERT INTO {SEARCH_TABLE}(rowid, {_columns()}) '
+            f'SELECT id * 2 + {offset}, {_columns()} FROM {table}'
+        )
+    connection.exec_driver_sql(f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('optimize')")
+
+
+def to_fts_query(q):
+    """Turn free text into an FTS5 query: every term must match, the last as a prefix"""
+    terms = re.findall(r'\w+', q, flags=re.UNICODE)
+    if not terms:
+        raise QueryParamError('q must contain at least one word')
+    quoted = ['"' + t + '"' for t in terms]
+    quoted[-1] += '*'
+    return ' '.join(quoted)
+
+
+def _parse_types():
+    raw = request.args.get('type')
+    if not raw:
+        return list(TYPES)
+    types = list(dict.fromkeys(t.strip() for t in raw.split(',') if t.strip()))
+    unknown = [t for t in types if t not in TYPES]
+    if unknown:
+        raise QueryParamError(f"Unknown type(s): {', '.join(unknown)}")
+    return types
+
+
+def _parse_offset():
+    after = request.args.get('after')
+    if not after:
+        return 0
+    offset = decode_cursor(after)[-1]
+    if not isinstance(offset, int) or offset < 0:
+        raise QueryParamError('Invalid cursor')
+    return offset
+
+
+def highlight(snippet):
+    """HTML for an FTS snippet: stored text escaped, matches wrapped in <mark>"""
+    if snippet is None:
+        return None
+    return html.escape(snippet).replace(MATCH_START, '<mark>').replace(MATCH_END, '</mark>')
+
+
+def _fts_search(q, types, limit, offset):
+    weights = ', '.join(str(w) for w in COLUMN_WEIGHTS)
+    kind_filter = '' if len(types) == len(TYPES) else f'AND (rowid % 2) = {TYPES[types[0]]}'
+    rows = db.session.execute(text(
+        f"SELECT rowid, bm25({SEARCH_TABLE}, {weights}) AS score, name, "
+        f"snippet({SEARCH_TABLE}, -1, '{MATCH_START}', '{MATCH_END}', '…', 16) AS snippet "
+        f"FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH :query {kind_filter} "
+        f"ORDER BY score LIMIT :limit OFFSET :offset"
+    ), {'query': to_fts_query(q), 'limit': limit + 1, 'offset': offset}).all()
+    return [{
+        'type': SOURCES[row.rowid % 2][0],
+        'id': row.rowid // 2,
+        'name': row.name,
+        'snippet': highlight(row.snippet),
+        'score': round(-row.score, 4),
+    } for row in rows]
+
+
+def _like_search(q, types, limit, offset):
+    """Portable fallback: case-insensitive substring match on every column"""
+    terms = re.findall(r'\w+', q, flags=re.UNICODE)
+    if not terms:
+        raise QueryParamError('q must contain at least one word')
+    models = {'core_pillar': CorePillar, 'sustainability_strategy': SustainabilityStrategy}
+    selects = []
+    for kind in types:
+        model = models[kind]
+        conditions = [or_(*[getattr(model, c).ilike(contains_pattern(t), escape=LIKE_ESCAPE) for c in SEARCH_COLUMNS])
+                      for t in terms]
+        selects.append(select(literal(kind).label('type'), model.id, model.name).where(*conditions))
+    query = union_all(*selects).order_by(text('name')).limit(limit + 1).offset(offset)
+    return [{'type': row.type, 'id': row.id, 'name': row.name, 'snippet': None, 'score': None}
+            for row in db.session.execute(query)]
+
+
+def search():
+    """Run the search described by the request's q/type/limit/after"""
+    q = (request.args.get('q') or '').strip()
+    if not q:
+        raise QueryParamError('q is required')
+    types = _parse_types()
+    limit = parse_limit()
+    offset = _parse_offset()
+    if db.session.get_bind().dialect.name == 'sqlite':
+        items = _fts_search(q, types, limit, offset)
+    else:
+        items = _like_search(q, types, limit, offset)
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        next_cursor = encode_cursor([offset + limit])
+    return {'items': items, 'next_cursor': next_cursor}
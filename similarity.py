@@ -0,0 +1,89 @@
+"""Strategy similarity and synergy co-occurrence from the strategy bitset index.
+
+Similarity is the Jaccard index of two strategies' synergy sets,
+``|A & B| / |A | B|``. It depends only on the shared count and the other
+strategy's synergy count, so candidates are split into classes by both (two
+bit-sliced counts over the synergy postings) and classes are visited
+best-first; no per-strategy or per-pair work is done until the top-k are known.
+
+Co-occurrence counts come from ANDing the synergy postings pairwise.
+"""
+from flask import abort
+
+from cache import all_synergies
+from models import SustainabilityStrategy
+from pagination import parse_limit
+from strategy_index import bits, match_count_sets, strategy_index
+
+DEFAULT_SIMILAR = 10
+MAX_SIMILAR = 100
+
+
+def similar_strategies(strategy_id, limit):
+    """Top ``limit`` (strategy id, similarity, shared synergy ids), or None for an unknown strategy"""
+    with strategy_index.reading() as index:
+        position = index.positions.get(strategy_id)
+        if position is None:
+            return None
+        mask = index.masks[position]
+        own = list(bits(mask))
+        if not own:
+            return []
+        others = index.live & ~(1 << position)
+        shared_sets = match_count_sets([index.postings[s] for s in own], others)
+        size_sets = match_count_sets(list(index.postings.values()), others)
+        classes = []
+        for shared in range(1, len(own) + 1):
+            if not shared_sets[shared]:
+                continue
+            for size in range(shared, len(size_sets)):
+                selected = shared_sets[shared] & size_sets[size]
+                if selected:
+                    classes.append((shared / (len(own) + size - shared), shared, selected))
+        # Most similar first, ties to the strategy sharing more synergies
+        classes.sort(key=lambda c: (-c[0], -c[1]))
+        ranked = []
+        for similarity, _, selected in classes:
+            for other in bits(selected):
+                ranked.append((index.ids[other], similarity, list(bits(index.masks[other] & mask))))
+                if len(ranked) == limit:
+                    return ranked
+        return ranked
+
+
+def similar_response(strategy_id):
+    """Response body for GET /sustainability-strategies/<id>/similar"""
+    limit = parse_limit(default=DEFAULT_SIMILAR, maximum=MAX_SIMILAR)
+    ranked = similar_strategies(strategy_id, limit)
+    if ranked is None:
+        abort(404)
+    strategy = SustainabilityStrategy
+    rows = strategy.query.with_entities(strategy.id, strategy.core_pillar_id, strategy.name).filter(
+        strategy.id.in_([r[0] for r in ranked])
+    ).all()
+    by_id = {row.id: row for row in rows}
+    names = {s['id']: s['name'] for s in all_synergies()}
+    items = []
+    for other_id, similarity, shared in ranked:
+        row = by_id.get(other_id)
+        if row is None:
+            continue
+        items.append({
+            'strategy': {'id': row.id, 'core_pillar_id': row.core_pillar_id, 'name': row.name},
+            'similarity': round(similarity, 4),
+            'shared_synergies': [names.get(s) for s in shared],
+        })
+    return {'strategy_id': strategy_id, 'items': items}
+
+
+def co_occurrence():
+    """Synergy x synergy matrix of strategy counts (the diagonal is each synergy's total)"""
+    synergies = [{'id': s['id'], 'name': s['name']} for s in all_synergies()]
+    with strategy_index.reading() as index:
+        postings = [index.postings.get(s['id'], 0) for s in synergies]
+    size = len(postings)
+    matrix = [[0] * size for _ in range(size)]
+    for i in range(size):
+        for j in range(i, size):
+            matrix[i][j] = matrix[j][i] = (postings[i] & postings[j]).bit_count()
+    return {'synergies': synergies, 'matrix': matrix}
@@ -0,0 +1,100 @@
+"""Dashboard statistics: row counts and strategy breakdowns.
+
+All counts come from a single UNION ALL of grouped SELECTs. The rollup is
+cached against the ``table_version`` of the counted tables (see cache.py), so
+a read costs one version lookup, shared with the ETag of ``GET /api/stats``,
+and the aggregate query only runs after a commit in any worker process or
+once ``STATS_CACHE_TTL`` seconds have passed.
+"""
+import os
+
+from sqlalchemy import Integer, String, func, literal, null, select, type_coerce, union_all
+
+from cache import TTLCache
+from change_tracking import subscribe
+from models import (db, FoundationalPrinciple, CorePillar, SustainabilityStrategy, Project, Contributor,
+                    Certification, Synergy, core_pillar_certifications, strategy_synergies,
+                    COST_LEVELS, PERFORMANCE_LEVELS)
+
+# Totals key -> model counted
+COUNTED_MODELS = {
+    'foundational_principles': FoundationalPrinciple,
+    'core_pillars': CorePillar,
+    'sustainability_strategies': SustainabilityStrategy,
+    'projects': Project,
+    'contributors': Contributor,
+    'certifications': Certification,
+    'synergies': Synergy,
+}
+STATS_TABLES = tuple(m.__tablename__ for m in COUNTED_MODELS.values()) + (
+    core_pillar_certifications.name, strategy_synergies.name)
+
+stats_cache = TTLCache(maxsize=1, ttl=float(os.environ.get('STATS_CACHE_TTL', 30)))
+subscribe(stats_cache.invalidate_tables)
+
+
+def _part(kind, key, name, count):
+    """One grouped SELECT of the union: (kind, key, name, count)"""
+    return select(literal(kind, String).label('kind'), type_coerce(key, Integer).label('key'),
+                  type_coerce(name, String).label('name'), count.label('count'))
+
+
+def stats_statement():
+    strategy, pillar = SustainabilityStrategy, CorePillar
+    parts = [_part('total', null(), literal(key), func.count()).select_from(model)
+             for key, model in COUNTED_MODELS.items()]
+    parts += [
+        # Ordinal columns are grouped by their stored rank
+        _part('cost', strategy.cost, null(), func.count()).group_by(strategy.cost),
+        _part('performance', strategy.performance_contribution, null(), func.count())
+        .group_by(strategy.performance_contribution),
+        _part('principle', FoundationalPrinciple.id, FoundationalPrinciple.name, func.count(strategy.id))
+        .select_from(FoundationalPrinciple)
+        .outerjoin(pillar, pillar.foundational_principle_id == FoundationalPrinciple.id)
+        .outerjoin(strategy, strategy.core_pillar_id == pillar.id)
+        .group_by(FoundationalPrinciple.id, FoundationalPrinciple.name),
+        _part('synergy', Synergy.id, Synergy.name, func.count(strategy_synergies.c.synergy_id))
+        .select_from(Synergy).outerjoin(strategy_synergies, strategy_synergies.c.synergy_id == Synergy.id)
+        .group_by(Synergy.id, Synergy.name),
+        _part('certification', Certification.id, Certification.name,
+              func.count(core_pillar_certifications.c.certification_id))
+        .select_from(Certification)
+        .outerjoin(core_pillar_certifications, core_pillar_certifications.c.certification_id == Certification.id)
+        .group_by(Certification.id, Certification.name),
+    ]
+    return union_all(*parts)
+
+
+def _levels(counts, levels):
+    """Counts per level in rank order, with unrated rows last (if any)"""
+    breakdown = [{'level': level, 'count': counts.get(rank, 0)} for rank, level in enumerate(levels)]
+    if counts.get(None):
+        breakdown.append({'level': None, 'count': counts[None]})
+    return breakdown
+
+
+def compute_stats():
+    """Totals and breakdowns, from one query"""
+    totals, grouped = {}, {'cost': {}, 'performance': {}, 'principle': [], 'synergy': [], 'certification': []}
+    for kind, key, name, count in db.session.execute(stats_statement()):
+        if kind == 'total':
+            totals[name] = count
+        elif kind in ('cost', 'performance'):
+            grouped[kind][key] = count
+        else:
+            grouped[kind].append({'id': key, 'name': name, 'count': count})
+    for kind in ('principle', 'synergy', 'certification'):
+        grouped[kind].sort(key=lambda item: item['id'])
+    return {
+        'totals': totals,
+        'strategies_by_cost': _levels(grouped['cost'], COST_LEVELS),
+        'strategies_by_performance': _levels(grouped['performance'], PERFORMANCE_LEVELS),
+        'strategies_by_principle': grouped['principle'],
+        'synergy_usage': grouped['synergy'],
+        'certification_usage': grouped['certification'],
+    }
+
+
+def dashboard_stats():
+    """The cached rollup, rebuilt when a counted table's version moves or the TTL runs out"""
+    return stats_cache.get_or_load('dashboard', STATS_TABLES, compute_stats)
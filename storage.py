@@ -0,0 +1,298 @@
+"""Content-addressed, deduplicated storage for uploaded images.
+
+An upload is streamed to a temporary file while it is hashed, then stored
+under its SHA-256 (``<hh>/<sha256>.<ext>``, served as ``/uploads/<key>``), so
+identical files are stored once and two uploads never overwrite each other.
+
+Each stored file has a ``stored_file`` row counting the pillars, strategies
+and contributors whose ``image_url`` points at it. The row is committed (and
+its ``stored_at`` refreshed) before the file is written or reused, so garbage
+collection, which deletes a file under the same row lock, never removes a
+file an upload has just claimed. Counts are adjusted on flush; when a commit
+leaves a count at zero, the file (and its image variants) is removed, after
+checking that no row still refers to it, unless it was stored within the
+last ``UPLOAD_GC_GRACE_SECONDS``: its upload may not have committed yet.
+``flask gc-uploads`` sweeps everything, including files with no row at all.
+
+Files live in a backend (``LocalStorage`` on disk by default); another
+backend, e.g. an object store, only needs the same methods and is installed
+with ``init_storage(app, backend)``.
+"""
+import hashlib
+import os
+import re
+import tempfile
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import event, insert, inspect, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from models import db, CorePillar, SustainabilityStrategy, Contributor
+
+UPLOAD_PREFIX = '/uploads/'
+UPLOAD_MODELS = (CorePillar, SustainabilityStrategy, Contributor)
+ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
+CHUNK_SIZE = 64 * 1024
+# <hh>/<sha256>.<ext>; variants (<sha256>@...) and temporary files don't match
+STORED_KEY = re.compile(r'(?P<prefix>[0-9a-f]{2})/(?P=prefix)[0-9a-f]{62}\.[a-z0-9]+')
+
+_RELEASED_KEY = 'released_files'
+
+
+class StoredFile(db.Model):
+    """A stored upload and how many rows refer to it"""
+    __tablename__ = 'stored_file'
+
+    key = db.Column(db.String(100), primary_key=True)
+    size = db.Column(db.Integer, nullable=False)
+    refcount = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    stored_at = db.Column(db.DateTime, default=datetime.utcnow)  # last upload of this content
+
+
+class LocalStorage:
+    """Stores files under a directory on local disk"""
+
+    def __init__(self, root):
+        self.root = root
+
+    def path(self, key):
+        return os.path.join(self.root, key)
+
+    def temp_file(self):
+        # In the storage directory so that save() is a rename, not a copy
+        os.makedirs(self.root, exist_ok=True)
+        return tempfile.NamedTemporaryFile(dir=self.root, prefix='.upload-', delete=False)
+
+    def exists(self, key):
+        return os.path.isfile(self.path(key))
+
+    def save(self, key, temp_path):
+        """Move a finished temporary file into place (atomically)"""
+        os.makedirs(os.path.dirname(self.path(key)), exist_ok=True)
+        os.chmod(temp_path, 0o644)  # temp files are created private
+        os.replace(temp_path, self.path(key))
+
+    def discard(self, temp_path):
+        os.remove(temp_path)
+
+    def stored_keys(self):
+        """(key, last modified UTC) of every content-addressed file"""
+        if not os.path.isdir(self.root):
+            return
+        for prefix in os.listdir(self.root):
+            directory = os.path.join(self.root, prefix)
+            if len(prefix) != 2 or not os.path.isdir(directory):
+                continue
+            for name in os.listdir(directory):
+                key = f'{prefix}/{name}'
+                if STORED_KEY.fullmatch(key):
+                    yield key, datetime.utcfromtimestamp(os.path.getmtime(os.path.join(directory, name)))
+
+    def delete(self, key):
+        """Remove ``key`` and its variants (``<stem>@...``)"""
+        name = os.path.basename(key)
+        variant_prefix = os.path.splitext(name)[0] + '@'
+        directory = os.path.dirname(self.path(key))
+        if not os.path.isdir(directory):
+            return
+        for entry in os.listdir(directory):
+            if entry == name or entry.startswith(variant_prefix):
+                os.remove(os.path.join(directory, entry))
+
+
+def init_storage(app, backend=None):
+    """Install the upload backend (default: LocalStorage over UPLOAD_FOLDER)"""
+    app.config.setdefault('UPLOAD_GC_GRACE_SECONDS', int(os.environ.get('UPLOAD_GC_GRACE_SECONDS', 600)))
+    app.extensions['upload_storage'] = backend or LocalStorage(app.config['UPLOAD_FOLDER'])
+
+
+def get_backend():
+    return current_app.extensions['upload_storage']
+
+
+def allowed_file(filename):
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+
+
+def key_for_url(url):
+    """Storage key of an /uploads URL, or None for anything else"""
+    if url and url.startswith(UPLOAD_PREFIX):
+        return url[len(UPLOAD_PREFIX):]
+    return None
+
+
+def store_upload(file):
+    """Store an uploaded file (a werkzeug FileStorage) and return its URL.
+
+    Returns None when there is no file or its type is not allowed. The
+    ``stored_file`` row is committed here, in its own transaction (call this
+    before the session writes anything); a reference is counted once the URL
+    is assigned to a pillar, strategy or contributor and flushed.
+    """
+    if not file or not allowed_file(file.filename):
+        return None
+    extension = file.filename.rsplit('.', 1)[1].lower()
+    backend = get_backend()
+    digest = hashlib.sha256()
+    size = 0
+    with backend.temp_file() as temp:
+        try:
+            while True:
+                chunk = file.stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                temp.write(chunk)
+                size += len(chunk)
+        except BaseException:
+            temp.close()
+            backend.discard(temp.name)
+            raise
+    sha = digest.hexdigest()
+    key = f'{sha[:2]}/{sha}.{extension}'
+    _claim(key, size)
+    # After the claim: a collection that got in first has deleted the file, so it is written again
+    if backend.exists(key):
+        backend.discard(temp.name)
+    else:
+        backend.save(key, temp.name)
+    return UPLOAD_PREFIX + key
+
+
+def _claim(key, size):
+    """Commit the stored_file row for ``key`` with a fresh ``stored_at``.
+
+    Waits for a collection deleting the same key to finish; once committed,
+    collections leave the file alone for the grace period.
+    """
+    table = StoredFile.__table__
+    now = datetime.utcnow()
+    try:
+        with db.engine.begin() as connection:
+            if not connection.execute(update(table).where(table.c.key == key).values(stored_at=now)).rowcount:
+                connection.execute(insert(table).values(key=key, size=size, refcount=0, created_at=now, stored_at=now))
+    except IntegrityError:
+        pass  # inserted by a concurrent upload of the same content, just now
+
+
+def _reference_changes(session):
+    """Stored-file key -> change in references made by this flush"""
+    changes = {}
+
+    def count(url, delta):
+        key = key_for_url(url)
+        if key:
+            changes[key] = changes.get(key, 0) + delta
+
+    for obj in session.new:
+        if isinstance(obj, UPLOAD_MODELS):
+            count(obj.image_url, 1)
+    for obj in session.dirty:
+        if isinstance(obj, UPLOAD_MODELS):
+            history = inspect(obj).attrs.image_url.history
+            for url in history.added:
+                count(url, 1)
+            for url in history.deleted:
+                count(url, -1)
+    for obj in session.deleted:
+        if isinstance(obj, UPLOAD_MODELS):
+            count(obj.image_url, -1)
+    return {key: delta for key, delta in changes.items() if delta}
+
+
+@event.listens_for(Session, 'after_flush')
+def _count_references(session, flush_context):
+    changes = _reference_changes(session)
+    if not changes:
+        return
+    connection = session.connection()
+    released = session.info.setdefault(_RELEASED_KEY, set())
+    for key, delta in changes.items():
+        connection.execute(
+            update(StoredFile).where(StoredFile.key == key).values(refcount=StoredFile.refcount + delta)
+        )
+        if delta < 0:
+            released.add(key)
+
+
+@event.listens_for(Session, 'after_commit')
+def _collect_released(session):
+    keys = session.info.pop(_RELEASED_KEY, None)
+    if keys:
+        collect_garbage(keys)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_released(session):
+    session.info.pop(_RELEASED_KEY, None)
+
+
+def _still_referenced(connection, keys):
+    urls = [UPLOAD_PREFIX + key for key in keys]
+    referenced = set()
+    for model in UPLOAD_MODELS:
+        referenced.update(connection.execute(
+            select(model.image_url).where(model.image_url.in_(urls)).distinct()
+        ).scalars())
+    return {key_for_url(url) for url in referenced}
+
+
+def collect_garbage(keys=None):
+    """Delete stored files with no references (of ``keys``, or all); returns the deleted keys.
+
+    Files stored within the grace period are kept. A full sweep (no ``keys``)
+    also deletes content-addressed files that have no ``stored_file`` row.
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=current_app.config['UPLOAD_GC_GRACE_SECONDS'])
+    table = StoredFile.__table__
+    backend = get_backend()
+    collectable = (table.c.refcount <= 0, table.c.stored_at < cutoff)
+    with db.engine.connect() as connection:
+        query = select(table.c.key).where(*collectable)
+        if keys is not None:
+            query = query.where(table.c.key.in_(list(keys)))
+        candidates = set(connection.execute(query).scalars())
+        # The count is maintained by ORM flushes only; trust the tables
+        orphans = candidates - _still_referenced(connection, candidates) if candidates else set()
+    deleted = []
+    for key in sorted(orphans):
+        with db.engine.begin() as connection:
+            # Checked again under the row lock: an upload may have claimed the key since
+            if connection.execute(table.delete().where(table.c.key == key, *collectable)).rowcount:
+                backend.delete(key)
+                deleted.append(key)
+    if keys is None:
+        deleted.extend(_collect_unrecorded(backend, cutoff))
+    return sorted(deleted)
+
+
+def _collect_unrecorded(backend, cutoff):
+    """Delete content-addressed files older than ``cutoff`` that have no stored_file row"""
+    table = StoredFile.__table__
+    with db.engine.connect() as connection:
+        recorded = set(connection.execute(select(table.c.key)).scalars())
+        unrecorded = [key for key, modified in backend.stored_keys() if key not in recorded and modified < cutoff]
+        unrecorded = set(unrecorded) - _still_referenced(connection, unrecorded) if unrecorded else set()
+    deleted = []
+    for key in sorted(unrecorded):
+        try:
+            with db.engine.begin() as connection:
+                # Hold the key while deleting, as for recorded files
+                connection.execute(insert(table).values(key=key, size=0, refcount=0, stored_at=cutoff))
+                backend.delete(key)
+                connection.execute(table.delete().where(table.c.key == key))
+        except IntegrityError:
+            continue  # claimed by an upload meanwhile
+        deleted.append(key)
+    return deleted
+
+
+# Load the old image_url when it is replaced, so the flush can release it
+@event.listens_for(CorePillar.image_url, 'set', active_history=True)
+@event.listens_for(SustainabilityStrategy.image_url, 'set', active_history=True)
+@event.listens_for(Contributor.image_url, 'set', active_history=True)
+def _track_replaced_url(target, value, oldvalue, initiator):
+    pass
@@ -0,0 +1,241 @@
+"""In-memory bitset index of strategy ratings and synergies.
+
+Each live strategy has a position; a set of strategies is a Python int used as
+a bitset over positions, so AND/OR/popcount over the whole collection run a
+machine word (64 strategies) at a time in C:
+
+- ``postings[synergy_id]``: strategies having the synergy (one row of the
+  synergy x strategy matrix)
+- ``rating_sets[(cost rank, performance rank)]``: strategies rated that way
+- ``masks[position]``: the strategy's synergy ids as a bitset (its column of
+  the matrix)
+
+recommend.py and similarity.py query it. The index is loaded on first use. Commits made by this process are applied
+incrementally by re-reading just the strategies they touched; when another
+process has written (the ``table_version`` counters moved further than this
+process accounts for) the index is reloaded.
+"""
+import threading
+from contextlib import contextmanager
+
+from sqlalchemy import select
+
+from change_tracking import subscribe, table_version
+from models import db, SustainabilityStrategy, COST_LEVELS, PERFORMANCE_LEVELS, strategy_synergies
+
+INDEX_TABLES = ('sustainability_strategy', 'strategy_synergies')
+# Above this share of touched strategies a reload is cheaper than a patch
+RELOAD_FRACTION = 0.25
+
+COST_RANKS = {level: rank for rank, level in enumerate(COST_LEVELS)}
+PERFORMANCE_RANKS = {level: rank for rank, level in enumerate(PERFORMANCE_LEVELS)}
+
+
+def bits(bitset):
+    """Positions of the set bits, lowest first"""
+    while bitset:
+        low = bitset & -bitset
+        yield low.bit_length() - 1
+        bitset ^= low
+
+
+def match_count_sets(postings, universe):
+    """Split ``universe`` by how many of ``postings`` each member is in.
+
+    Returns a list whose element ``n`` is the bitset of members in exactly
+    ``n`` postings, computed with a bit-sliced adder (binary counter planes).
+    """
+    planes = []
+    for posting in postings:
+        carry = posting & universe
+        for i, plane in enumerate(planes):
+            if not carry:
+                break
+            planes[i], carry = plane ^ carry, plane & carry
+        if carry:
+            planes.append(carry)
+    count_sets = []
+    for count in range(len(postings) + 1):
+        if count >> len(planes):
+            count_sets.append(0)
+            continue
+        members = universe
+        for i, plane in enumerate(planes):
+            members &= plane if count >> i & 1 else ~plane
+        count_sets.append(members)
+    return count_sets
+
+
+def _bitset(positions, size):
+    """Build a bitset from many positions in O(size) (OR-ing bits one at a time is quadratic)"""
+    buffer = bytearray((size >> 3) + 1)
+    for position in positions:
+        buffer[position >> 3] |= 1 << (position & 7)
+    return int.from_bytes(buffer, 'little')
+
+
+def _ranks(cost, performance):
+    return (COST_RANKS.get(cost), PERFORMANCE_RANKS.get(performance))
+
+
+class StrategyIndex:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.version = None
+        self._pending_ids = set()
+        self._pending_versions = 0
+        self._reload = False
+        self._reset()
+
+    def _reset(self):
+        self.ids = []          # position -> strategy id (None once deleted)
+        self.positions = {}    # strategy id -> position
+        self.ratings = []      # position -> (cost rank, performance rank)
+        self.masks = []        # position -> bitset of synergy ids
+        self.postings = {}     # synergy id -> bitset of positions
+        self.rating_sets = {}  # (cost rank, performance rank) -> bitset of positions
+        self.live = 0          # bitset of live positions
+
+    def __len__(self):
+        return len(self.positions)
+
+    def _load(self, version):
+        strategy = SustainabilityStrategy
+        rows = db.session.execute(
+            select(strategy.id, strategy.cost, strategy.performance_contribution).order_by(strategy.id)
+        ).all()
+        links = db.session.execute(
+            select(strategy_synergies.c.sustainability_strategy_id, strategy_synergies.c.synergy_id)
+        ).all()
+        self._reset()
+        size = len(rows)
+        rating_members = {}
+        for position, (strategy_id, cost, performance) in enumerate(rows):
+            ranks = _ranks(cost, performance)
+            self.ids.append(strategy_id)
+            self.positions[strategy_id] = position
+            self.ratings.append(ranks)
+            self.masks.append(0)
+            rating_members.setdefault(ranks, []).append(position)
+        posting_members = {}
+        for strategy_id, synergy_id in links:
+            position = self.positions.get(strategy_id)
+            if position is not None:
+                self.masks[position] |= 1 << synergy_id
+                posting_members.setdefault(synergy_id, []).append(position)
+        self.rating_sets = {ranks: _bitset(members, size) for ranks, members in rating_members.items()}
+        self.postings = {synergy_id: _bitset(members, size) for synergy_id, members in posting_members.items()}
+        self.live = (1 << size) - 1
+        self.version = version
+
+    def _remove(self, strategy_id):
+        position = self.positions.pop(strategy_id, None)
+        if position is None:
+            return
+        bit = 1 << position
+        ranks = self.ratings[position]
+        self.rating_sets[ranks] &= ~bit
+        for synergy_id in bits(self.masks[position]):
+            self.postings[synergy_id] &= ~bit
+        self.ids[position] = None
+        self.masks[position] = 0
+        self.live &= ~bit
+
+    def _add(self, strategy_id, ranks, synergy_ids):
+        # New positions are appended, so position order stays id order
+        position = len(self.ids)
+        bit = 1 << position
+        self.ids.append(strategy_id)
+        self.positions[strategy_id] = position
+        self.ratings.append(ranks)
+        mask = 0
+        for synergy_id in synergy_ids:
+            mask |= 1 << synergy_id
+            self.postings[synergy_id] = self.postings.get(synergy_id, 0) | bit
+        self.masks.append(mask)
+        self.rating_sets[ranks] = self.rating_sets.get(ranks, 0) | bit
+        self.live |= bit
+
+    def _update(self, strategy_id, ranks, synergy_ids):
+        position = self.positions[strategy_id]
+        bit = 1 << position
+        old_ranks, old_mask = self.ratings[position], self.masks[position]
+        mask = 0
+        for synergy_id in synergy_ids:
+            mask |= 1 << synergy_id
+        if ranks != old_ranks:
+            self.rating_sets[old_ranks] &= ~bit
+            self.rating_sets[ranks] = self.rating_sets.get(ranks, 0) | bit
+            self.ratings[position] = ranks
+        for synergy_id in bits(old_mask & ~mask):
+            self.postings[synergy_id] &= ~bit
+        for synergy_id in bits(mask & ~old_mask):
+            self.postings[synergy_id] = self.postings.get(synergy_id, 0) | bit
+        self.masks[position] = mask
+
+    def _patch(self, strategy_ids, version):
+        strategy = SustainabilityStrategy
+        rows = db.session.execute(
+            select(strategy.id, strategy.cost, strategy.performance_contribution)
+            .where(strategy.id.in_(strategy_ids)).order_by(strategy.id)
+        ).all()
+        links = {}
+        for strategy_id, synergy_id in db.session.execute(
+            select(strategy_synergies.c.sustainability_strategy_id, strategy_synergies.c.synergy_id)
+            .where(strategy_synergies.c.sustainability_strategy_id.in_(strategy_ids))
+        ):
+            links.setdefault(strategy_id, []).append(synergy_id)
+        found = set()
+        for strategy_id, cost, performance in rows:
+            found.add(strategy_id)
+            ranks = _ranks(cost, performance)
+            if strategy_id in self.positions:
+                self._update(strategy_id, ranks, links.get(strategy_id, ()))
+            else:
+                self._add(strategy_id, ranks, links.get(strategy_id, ()))
+        for strategy_id in set(strategy_ids) - found:
+            self._remove(strategy_id)
+        self.version = version
+
+    def _on_commit(self, tables, rows):
+        """Change-tracking callback: remember which strategies a local commit touched"""
+        changed = tables & set(INDEX_TABLES)
+        if not changed:
+            return
+        with self._lock:
+            strategy_ids = rows.get('sustainability_strategy')
+            # Links removed by deleting a synergy aren't attributable to strategies
+            if not strategy_ids or 'synergy' in rows:
+                self._reload = True
+            else:
+                self._pending_ids |= strategy_ids
+            self._pending_versions += len(changed)
+
+    def _refresh(self, version):
+        if version == self.version:
+            return
+        expected = self.version is not None and version == self.version + self._pending_versions
+        pending = self._pending_ids
+        if (expected and not self._reload and pending
+                and len(pending) <= max(1, RELOAD_FRACTION * len(self.positions))):
+            self._patch(sorted(pending), version)
+        else:
+            self._load(version)
+        self._pending_ids = set()
+        self._pending_versions = 0
+        self._reload = False
+
+    @contextmanager
+    def reading(self):
+        """Hold the index, brought up to date with the database, for a query.
+
+        Costs one version query when nothing changed.
+        """
+        version = table_version(*INDEX_TABLES)
+        with self._lock:
+            self._refresh(version)
+            yield self
+
+
+strategy_index = StrategyIndex()
+subscribe(strategy_index._on_commit, rows=True)
@@ -0,0 +1,50 @@
+from flask import Response, current_app, request, stream_with_context
+
+STREAM_BATCH_SIZE = 500
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+
+def wants_stream():
+    """Streaming is opt-in: ?stream=1 or an NDJSON Accept header"""
+    return request.args.get('stream') == '1' or wants_ndjson()
+
+
+def wants_ndjson():
+    return request.accept_mimetypes.best == NDJSON_MIMETYPE
+
+
+def _iter_batches(query, serializer):
+    # yield_per keeps a bounded window of rows; nested collections are
+    # loaded once per batch instead of once per row. Each batch is sent as one
+    # chunk: one write, and one compressor flush (compression.py)
+    batch = []
+    for row in query.yield_per(STREAM_BATCH_SIZE):
+        batch.append(row)
+        if len(batch) == STREAM_BATCH_SIZE:
+            yield list(serializer.serialize(batch, query.session))
+            batch = []
+    if batch:
+        yield list(serializer.serialize(batch, query.session))
+
+
+def _json_array(batches, dumps):
+    yield '['
+    separator = ''
+    for batch in batches:
+        yield separator + ','.join(dumps(data) for data in batch)
+        separator = ','
+    yield ']\n'
+
+
+def _ndjson(batches, dumps):
+    for batch in batches:
+        yield ''.join(dumps(data) + '\n' for data in batch)
+
+
+def stream_query(query, serializer):
+    """Stream a select()ed query as a JSON array, or as NDJSON if the client asked for it"""
+    dumps = current_app.json.dumps
+    batches = _iter_batches(query, serializer)
+    if wants_ndjson():
+        return Response(stream_with_context(_ndjson(batches, dumps)), mimetype=NDJSON_MIMETYPE)
+    return Response(stream_with_context(_json_array(batches, dumps)), mimetype='application/json')
@@ -0,0 +1,37 @@
+"""Shared fixtures: the app on a scratch SQLite database with a small seeded dataset.
+
+DATABASE_URL has to be set before ``app`` is first imported, so it is set
+here at collection time rather than in a fixture.
+"""
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, 'benchmarks')]
+
+WORKDIR = tempfile.mkdtemp(prefix='sustainability-tests-')
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(WORKDIR, 'test.sqlite')
+os.environ.pop('DATABASE_READ_URL', None)
+
+# Enough rows that a full table scan shows up in query plans
+SEED_COUNTS = {'pillars': 40, 'strategies': 400, 'projects': 100, 'contributors': 20}
+
+
+@pytest.fixture(scope='session')
+def app():
+    from app import app
+    from seed import seed
+    from storage import LocalStorage, init_storage
+    app.config['UPLOAD_FOLDER'] = os.path.join(WORKDIR, 'uploads')
+    init_storage(app, LocalStorage(app.config['UPLOAD_FOLDER']))
+    with app.app_context():
+        seed(SEED_COUNTS)
+    return app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
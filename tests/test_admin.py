@@ -0,0 +1,23 @@
+"""Admin search and the pillar lookup match % and _ literally."""
+import pytest
+
+
+@pytest.fixture(scope='module')
+def pillar(app):
+    client = app.test_client()
+    response = client.post('/api/core-pillars', json={'foundational_principle_id': 1, 'name': '100% Recycled_Steel'})
+    assert response.status_code == 201
+    return response.json
+
+
+@pytest.mark.parametrize('q', ['%', '_', '0% R'])
+def test_lookup_wildcards_are_literal(client, pillar, q):
+    response = client.get('/admin/core-pillars/lookup', query_string={'q': q})
+    assert [item['id'] for item in response.json] == [pillar['id']]
+
+
+def test_table_search_underscore_is_literal(client, pillar):
+    client.post('/api/core-pillars', json={'foundational_principle_id': 1, 'name': 'Recycled Steel'})
+    page = client.get('/admin/core-pillars', query_string={'q': 'Recycled_Steel'}).get_data(as_text=True)
+    assert '100% Recycled_Steel' in page
+    assert '>Recycled Steel<' not in page
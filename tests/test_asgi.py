@@ -0,0 +1,104 @@
+"""The async fast path in asgi.py answers like the Flask views, including revalidation."""
+import asyncio
+
+import pytest
+from werkzeug.datastructures import Headers
+
+pytest.importorskip('a2wsgi')
+pytest.importorskip('aiosqlite')
+pytest.importorskip('greenlet')  # SQLAlchemy's asyncio support
+
+
+@pytest.fixture(scope='module')
+def asgi_get(app):
+    import asgi
+    loop = asyncio.new_event_loop()
+
+    def get(path, headers=()):
+        scope = {'type': 'http', 'method': 'GET', 'path': path, 'query_string': b'',
+                 'headers': [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in headers]}
+        messages = []
+
+        async def receive():
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+        async def send(message):
+            messages.append(message)
+
+        loop.run_until_complete(asgi.app(scope, receive, send))
+        start, body = messages[0], b''.join(m.get('body', b'') for m in messages[1:])
+        return start['status'], Headers([(k.decode('latin-1'), v.decode('latin-1')) for k, v in start['headers']]), body
+
+    yield get
+    loop.run_until_complete(asgi.engine.dispose())
+    loop.close()
+
+
+@pytest.fixture(scope='module')
+def validators(app, asgi_get):
+    # A write so the projects table has a Last-Modified time
+    app.test_client().post('/api/projects', json={'project_name': 'ASGI revalidation'})
+    status, headers, _ = asgi_get('/api/projects/1')
+    assert status == 200
+    return headers
+
+
+def test_no_validator(client, asgi_get, validators):
+    status, headers, body = asgi_get('/api/projects/1')
+    assert status == 200
+    assert headers['ETag'] == validators['ETag']
+    assert body == client.get('/api/projects/1').get_data()
+
+
+def test_if_none_match(asgi_get, validators):
+    status, headers, body = asgi_get('/api/projects/1', [('If-None-Match', validators['ETag'])])
+    assert (status, body) == (304, b'')
+    assert headers['ETag'] == validators['ETag']
+
+
+def test_weak_if_none_match(asgi_get, validators):
+    status, headers, _ = asgi_get('/api/projects/1', [('If-None-Match', 'W/' + validators['ETag'])])
+    assert status == 304
+    assert headers['ETag'] == 'W/' + validators['ETag']
+
+
+def test_if_modified_since(asgi_get, validators):
+    status, headers, body = asgi_get('/api/projects/1', [('If-Modified-Since', validators['Last-Modified'])])
+    assert (status, body) == (304, b'')
+    assert headers['ETag'] == validators['ETag']
+
+
+def _comparable(headers):
+    # Server-Timing durations differ between any two requests
+    return sorted((k, v) for k, v in headers.items() if k not in ('Server-Timing', 'Date'))
+
+
+@pytest.mark.parametrize('request_headers', [
+    [],
+    [('Origin', 'http://client.example')],
+    [('Origin', 'http://client.example'), ('Accept-Encoding', 'gzip')],
+])
+@pytest.mark.parametrize('revalidate', [False, True])
+def test_headers_match_flask(client, asgi_get, validators, request_headers, revalidate):
+    if revalidate:
+        etag = validators['ETag'] if len(request_headers) < 2 else 'W/' + validators['ETag']
+        request_headers = request_headers + [('If-None-Match', etag)]
+    flask_response = client.get('/api/projects', headers=request_headers)
+    status, headers, body = asgi_get('/api/projects', request_headers)
+    assert status == flask_response.status_code
+    assert _comparable(headers) == _comparable(flask_response.headers)
+    assert body == flask_response.get_data()
+    assert headers['Server-Timing'].startswith('app;dur=')
+
+
+def test_requests_are_recorded_in_metrics(client, asgi_get):
+    series = ('http_request_duration_seconds_count'
+              '{method="GET",endpoint="/api/contributors/<int:contributor_id>",status="200"} ')
+
+    def count():
+        lines = client.get('/metrics').get_data(as_text=True).splitlines()
+        return next((int(line[len(series):]) for line in lines if line.startswith(series)), 0)
+
+    before = count()
+    asgi_get('/api/contributors/1')
+    assert count() == before + 1
@@ -0,0 +1,92 @@
+"""Bulk writes validate items with the same rules as the single-item endpoints."""
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+import bulk
+
+
+def test_boolean_id_is_rejected(client):
+    response = client.post('/api/projects/bulk', json=[{'id': True, 'project_name': 'Renamed'}])
+    assert response.status_code == 400
+    assert response.json['results'][0]['error'] == 'id must be an integer'
+
+
+@pytest.mark.parametrize('url', ['/api/sustainability-strategies', '/api/sustainability-strategies/bulk'])
+def test_ratings_are_optional(client, url):
+    item = {'core_pillar_id': 1, 'name': 'Unrated strategy'}
+    response = client.post(url, json=[item] if url.endswith('/bulk') else item)
+    assert response.status_code in (200, 201)
+
+
+@pytest.mark.parametrize('url', ['/api/sustainability-strategies', '/api/sustainability-strategies/bulk'])
+def test_name_is_required(client, url):
+    item = {'core_pillar_id': 1, 'cost': 'Low'}
+    response = client.post(url, json=[item] if url.endswith('/bulk') else item)
+    assert response.status_code == 400
+    error = response.json['results'][0]['error'] if url.endswith('/bulk') else response.json['error']
+    assert error == 'Missing required field(s): name'
+
+
+@pytest.mark.parametrize('body', [[1, 2], 'ids', None, {'ids': [1, True]}])
+def test_delete_requires_an_ids_object(client, body):
+    response = client.delete('/api/projects/bulk', json=body)
+    assert response.status_code == 400
+    assert response.json == {'error': 'ids must be a list of integers'}
+
+
+def test_constraint_violation_is_reported_without_details(client, monkeypatch):
+    def violate(spec, items):
+        raise IntegrityError('INSERT INTO project ...', {'project_name': 'secret'}, Exception('FOREIGN KEY'))
+    monkeypatch.setattr(bulk, 'apply_items', violate)
+    response = client.post('/api/projects/bulk', json=[{'project_name': 'Conflicting'}])
+    assert response.status_code == 400
+    assert response.json == {'error': 'Bulk write failed: an item conflicts with existing data'}
+
+
+def test_unexpected_errors_are_not_client_errors(app, monkeypatch):
+    def fail(spec, items):
+        raise RuntimeError('bug')
+    monkeypatch.setattr(bulk, 'apply_items', fail)
+    monkeypatch.setitem(app.config, 'PROPAGATE_EXCEPTIONS', False)
+    response = app.test_client().post('/api/projects/bulk', json=[{'project_name': 'Unlucky'}])
+    assert response.status_code == 500
+
+
+@pytest.mark.parametrize('item', [{'id': 1, 'name': None}, {'id': 1, 'core_pillar_id': ''}])
+def test_update_cannot_clear_a_required_field(client, item):
+    response = client.post('/api/sustainability-strategies/bulk', json=[item])
+    assert response.status_code == 400
+    assert response.json['results'][0]['error'].startswith('Missing required field(s): ')
+
+
+def test_update_may_omit_required_fields(client):
+    response = client.post('/api/sustainability-strategies/bulk', json=[{'id': 1, 'author': 'Bulk editor'}])
+    assert response.status_code == 200
+
+
+def _delete_queries(app, client, url, ids):
+    from instrumentation import count_queries
+    from models import db
+    with app.app_context():
+        engines = list(db.engines.values())
+    with count_queries(*engines) as counter:
+        response = client.delete(url, json={'ids': ids})
+    assert response.status_code == 200
+    assert {r['status'] for r in response.json['results']} == {'deleted'}
+    return counter.count
+
+
+@pytest.mark.parametrize('url, make', [
+    ('/api/sustainability-strategies',
+     lambda i: {'core_pillar_id': 1, 'name': f'Doomed strategy {i}', 'synergy_ids': [1, 2]}),
+    ('/api/core-pillars',
+     lambda i: {'foundational_principle_id': 1, 'name': f'Doomed pillar {i}', 'certification_ids': [1, 2]}),
+])
+def test_bulk_delete_query_count_does_not_grow(app, client, url, make):
+    created = client.post(url + '/bulk', json=[make(i) for i in range(6)]).json['results']
+    ids = [r['id'] for r in created]
+    if url == '/api/core-pillars':
+        # Each pillar also cascades to a strategy with synergies
+        client.post('/api/sustainability-strategies/bulk', json=[
+            {'core_pillar_id': pillar_id, 'name': 'Cascaded', 'synergy_ids': [1]} for pillar_id in ids])
+    assert _delete_queries(app, client, url + '/bulk', ids[:2]) == _delete_queries(app, client, url + '/bulk', ids[2:])
@@ -0,0 +1,35 @@
+"""Cached reference data follows writes made by other worker processes."""
+from sqlalchemy import text
+
+from models import db
+
+
+def _write_from_another_process(app, statement):
+    # A plain connection skips the session events, like a commit in another worker:
+    # only the shared table_version counter tells this process about it
+    with app.app_context(), db.engine.begin() as connection:
+        connection.execute(text(statement))
+        connection.execute(text("UPDATE table_version SET version = version + 1 WHERE table_name = 'certification'"))
+        if not connection.execute(text("SELECT 1 FROM table_version WHERE table_name = 'certification'")).first():
+            connection.execute(text("INSERT INTO table_version (table_name, version, changed_at) "
+                                    "VALUES ('certification', 1, CURRENT_TIMESTAMP)"))
+
+
+def test_reference_list_reloads_after_remote_write(app, client):
+    first = client.get('/api/certifications')
+    _write_from_another_process(app, "UPDATE certification SET name = 'Renamed elsewhere' WHERE id = 1")
+    second = client.get('/api/certifications')
+    assert second.headers['ETag'] != first.headers['ETag']
+    assert second.json[0]['name'] == 'Renamed elsewhere'
+    # The old validator is no longer answered with 304
+    assert client.get('/api/certifications', headers={'If-None-Match': first.headers['ETag']}).status_code == 200
+
+
+def test_versions_are_looked_up_per_request_in_a_shared_app_context(app, client):
+    # CLI commands and scripts run many requests inside one app context
+    with app.app_context():
+        first = client.get('/api/certifications')
+        _write_from_another_process(app, "UPDATE certification SET name = 'Renamed again' WHERE id = 1")
+        second = client.get('/api/certifications')
+    assert second.headers['ETag'] != first.headers['ETag']
+    assert second.json[0]['name'] == 'Renamed again'
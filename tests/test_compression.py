@@ -0,0 +1,28 @@
+"""Compressed streams can be decoded chunk by chunk, as they are produced."""
+import json
+import zlib
+
+STREAM_URL = '/api/sustainability-strategies'
+
+
+def _decoded_chunks(response):
+    decoder = zlib.decompressobj(31)
+    return [decoder.decompress(chunk).decode() for chunk in response.response]
+
+
+def test_json_stream_chunks_decode_immediately(client):
+    response = client.get(STREAM_URL, query_string={'stream': 1}, headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    decoded = _decoded_chunks(response)
+    # The opening bracket is sent before the first query returns
+    assert decoded[0] == '['
+    assert json.loads(''.join(decoded)) == client.get(STREAM_URL, query_string={'stream': 1}).json
+
+
+def test_ndjson_stream_flushes_whole_batches(client, monkeypatch):
+    monkeypatch.setattr('streaming.STREAM_BATCH_SIZE', 7)
+    response = client.get(STREAM_URL, headers={'Accept': 'application/x-ndjson', 'Accept-Encoding': 'gzip'})
+    decoded = [chunk for chunk in _decoded_chunks(response) if chunk]
+    assert len(decoded) > 1
+    assert all(chunk.endswith('\n') for chunk in decoded)
+    assert len(decoded[0].splitlines()) == 7
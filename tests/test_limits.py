@@ -0,0 +1,20 @@
+"""?limit= is parsed by pagination.parse_limit everywhere, with the same 400s."""
+import pytest
+
+from recommend import MAX_RECOMMENDATIONS
+
+URLS = ['/api/projects', '/api/projects/1/recommended-strategies', '/api/sustainability-strategies/1/similar']
+
+
+@pytest.mark.parametrize('url', URLS)
+@pytest.mark.parametrize('limit, error', [('ten', 'limit must be an integer'), ('0', 'limit must be positive')])
+def test_invalid_limit(client, url, limit, error):
+    response = client.get(url, query_string={'limit': limit})
+    assert response.status_code == 400
+    assert response.json == {'error': error}
+
+
+def test_recommendations_are_capped(client):
+    response = client.get('/api/projects/1/recommended-strategies', query_string={'limit': 10000})
+    assert response.status_code == 200
+    assert len(response.json['items']) == MAX_RECOMMENDATIONS
@@ -0,0 +1,27 @@
+"""Request profiling: statement counts survive failing statements and re-initialisation."""
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+import profiling
+from models import db
+
+
+def test_init_profiling_wraps_serializers_once(app):
+    dumps, response = app.json.dumps, app.json.response
+    profiling._instrument_json(app)
+    assert (app.json.dumps, app.json.response) == (dumps, response)
+    assert profiling.timed_serialization(dumps) is dumps
+
+
+def test_failed_statement_leaves_no_timing_behind(app):
+    with app.test_request_context():
+        app.preprocess_request()
+        try:
+            db.session.execute(text('SELECT * FROM no_such_table'))
+        except OperationalError:
+            db.session.rollback()
+        db.session.execute(text('SELECT 1'))
+        connection = db.session.connection()
+        stats = profiling.current_stats()
+        assert stats.sql_count == 1
+        assert 'query_start' not in connection.info
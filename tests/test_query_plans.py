@@ -0,0 +1,15 @@
+"""Query budgets and index usage, the checks behind ``flask check-query-plans``.
+
+The endpoints are requested in ``QUERY_BUDGETS`` order, as the command does:
+later budgets assume the reference caches warmed by the earlier requests.
+"""
+from instrumentation import check_index_usage, check_query_budgets
+from models import db
+
+
+def test_query_budgets(app):
+    assert check_query_budgets(app, db) == []
+
+
+def test_index_usage(app):
+    assert check_index_usage(app, db) == []
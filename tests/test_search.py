@@ -0,0 +1,24 @@
+"""Search results: literal LIKE terms, escaped snippets and the type filter."""
+from search import _like_search
+
+
+def test_like_fallback_underscore_is_literal(app, client):
+    for name in ('Grey_Water Reuse', 'Grey Water Reuse'):
+        client.post('/api/core-pillars', json={'foundational_principle_id': 1, 'name': name})
+    with app.app_context():
+        items = _like_search('Grey_Water', ['core_pillar'], 10, 0)
+    assert [item['name'] for item in items] == ['Grey_Water Reuse']
+
+
+def test_snippet_escapes_stored_markup(client):
+    client.post('/api/sustainability-strategies', json={
+        'core_pillar_id': 1, 'name': 'Markup strategy',
+        'description': '<img src=x onerror=alert(1)> photovoltaic'})
+    items = client.get('/api/search', query_string={'q': 'photovoltaic'}).json['items']
+    snippets = [item['snippet'] for item in items if item['name'] == 'Markup strategy']
+    assert snippets == ['&lt;img src=x onerror=alert(1)&gt; <mark>photovoltaic</mark>']
+
+
+def test_repeated_type_still_filters(client):
+    items = client.get('/api/search', query_string={'q': 'energy', 'type': 'core_pillar,core_pillar'}).json['items']
+    assert items and {item['type'] for item in items} == {'core_pillar'}
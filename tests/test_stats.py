@@ -0,0 +1,31 @@
+"""Dashboard statistics come from one query and follow writes from any worker."""
+from sqlalchemy import text
+
+from instrumentation import count_queries
+from models import db
+
+
+def test_stats_match_row_counts(client):
+    stats = client.get('/api/stats').json
+    assert stats['totals']['sustainability_strategies'] == sum(l['count'] for l in stats['strategies_by_cost'])
+    assert stats['totals']['sustainability_strategies'] == sum(p['count'] for p in stats['strategies_by_principle'])
+
+
+def test_stats_follow_remote_write(app, client):
+    first = client.get('/api/stats')
+    # As committed by another worker: the row and the shared version counter, no session events
+    with app.app_context(), db.engine.begin() as connection:
+        connection.execute(text("INSERT INTO contributor (name, image_variants) VALUES ('Remote', '[]')"))
+        connection.execute(text("UPDATE table_version SET version = version + 1 WHERE table_name = 'contributor'"))
+    second = client.get('/api/stats')
+    assert second.headers['ETag'] != first.headers['ETag']
+    assert second.json['totals']['contributors'] == first.json['totals']['contributors'] + 1
+
+
+def test_cached_dashboard_costs_one_lookup(app, client):
+    client.get('/admin/')
+    with app.app_context():
+        engines = list(db.engines.values())
+    with count_queries(*engines) as counter:
+        assert client.get('/admin/').status_code == 200
+    assert counter.count == 1
@@ -0,0 +1,73 @@
+"""Garbage collection of stored uploads never removes a file an upload has claimed."""
+import io
+import os
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from werkzeug.datastructures import FileStorage
+
+from models import db, CorePillar
+from storage import StoredFile, collect_garbage, get_backend, store_upload
+
+
+def _upload(content):
+    return FileStorage(stream=io.BytesIO(content), filename='image.png')
+
+
+def _age(app, key, seconds):
+    with app.app_context():
+        db.session.get(StoredFile, key).stored_at = datetime.utcnow() - timedelta(seconds=seconds)
+        db.session.commit()
+
+
+@pytest.fixture
+def no_grace(app, monkeypatch):
+    monkeypatch.setitem(app.config, 'UPLOAD_GC_GRACE_SECONDS', 0)
+
+
+def test_reused_blob_survives_release_before_commit(app):
+    with app.test_request_context():
+        url = store_upload(_upload(b'shared image'))
+        key = url[len('/uploads/'):]
+        pillar = db.session.get(CorePillar, 1)
+        pillar.image_url = url
+        db.session.commit()
+    _age(app, key, 3600)
+
+    with app.test_request_context():
+        # A second upload of the same content reuses the blob, but its row is not committed yet...
+        assert store_upload(_upload(b'shared image')) == url
+        with app.app_context():
+            # ...when the only committed reference goes away
+            db.session.get(CorePillar, 1).image_url = None
+            db.session.commit()
+        assert get_backend().exists(key)
+        db.session.get(CorePillar, 2).image_url = url
+        db.session.commit()
+        assert db.session.get(StoredFile, key).refcount == 1
+
+
+def test_unreferenced_blob_is_collected(app, no_grace):
+    with app.test_request_context():
+        url = store_upload(_upload(b'orphaned image'))
+        key = url[len('/uploads/'):]
+        time.sleep(0.01)
+        assert key in collect_garbage()
+        assert not get_backend().exists(key)
+        assert db.session.get(StoredFile, key) is None
+
+
+def test_sweep_removes_files_without_a_row(app):
+    stale, fresh = 'ab/ab' + '0' * 62 + '.png', 'cd/cd' + '0' * 62 + '.png'
+    with app.app_context():
+        backend = get_backend()
+        for key in (stale, fresh):
+            os.makedirs(os.path.dirname(backend.path(key)), exist_ok=True)
+            with open(backend.path(key), 'wb') as out:
+                out.write(b'left by a failed commit')
+        old = time.time() - 2 * app.config['UPLOAD_GC_GRACE_SECONDS']
+        os.utime(backend.path(stale), (old, old))
+        deleted = collect_garbage()
+    assert stale in deleted and fresh not in deleted
+    assert not backend.exists(stale) and backend.exists(fresh)
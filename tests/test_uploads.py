@@ -0,0 +1,35 @@
+"""?w= responses are cached for long only once the answer is final."""
+import io
+import os
+
+import pytest
+
+from images import VARIANT_WIDTHS, variant_name
+from uploads import FALLBACK_CACHE, RESOLVED_CACHE
+
+
+@pytest.fixture
+def image_url(client):
+    response = client.post('/api/core-pillars/1/upload-image', content_type='multipart/form-data',
+                           data={'image': (io.BytesIO(b'\x89PNG\r\n\x1a\n' + os.urandom(64)), 'photo.png')})
+    assert response.status_code == 200
+    return response.json['image_url']
+
+
+def test_original_is_not_cached_while_variants_are_pending(client, image_url):
+    response = client.get(image_url, query_string={'w': 300})
+    assert response.headers['Cache-Control'] == FALLBACK_CACHE
+
+
+def test_original_is_final_beyond_the_widest_variant(client, image_url):
+    response = client.get(image_url, query_string={'w': max(VARIANT_WIDTHS) + 1})
+    assert response.headers['Cache-Control'] == RESOLVED_CACHE
+
+
+def test_rendered_variant_is_cached(app, client, image_url):
+    relative = image_url[len('/uploads/'):]
+    with open(os.path.join(app.config['UPLOAD_FOLDER'], variant_name(relative, 320, 'png')), 'wb') as f:
+        f.write(b'\x89PNG\r\n\x1a\nvariant')
+    response = client.get(image_url, query_string={'w': 300})
+    assert response.get_data() == b'\x89PNG\r\n\x1a\nvariant'
+    assert response.headers['Cache-Control'] == RESOLVED_CACHE
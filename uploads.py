@@ -0,0 +1,75 @@
+"""Serving of uploaded files.
+
+Content-addressed uploads (see storage.py) never change, so they are sent
+with a year-long ``immutable`` Cache-Control and their hash as a strong ETag.
+Responses answer ``If-None-Match`` with 304 and support byte ranges.
+
+To keep file transfer off the app workers, set ``UPLOAD_ACCEL_REDIRECT`` to
+an nginx ``internal`` location aliasing the upload folder: the app then
+answers with headers only and nginx sends the file. ``USE_X_SENDFILE=1`` does
+the same for Apache/lighttpd (``X-Sendfile``). Plain files under /uploads/
+can also be served by the web server directly; only ``?w=`` needs the app.
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from flask import Blueprint, abort, current_app, request, send_from_directory
+from werkzeug.utils import safe_join
+
+from images import VARIANT_WIDTHS, resolve_variant
+
+uploads_bp = Blueprint('uploads', __name__)
+
+IMMUTABLE_CACHE = 'public, max-age=31536000, immutable'
+# ?w= picks a variant by Accept and by which variants exist yet
+RESOLVED_CACHE = 'public, max-age=86400'
+# ...and sends the original until the variants are rendered; revalidating
+# (a cheap 304) lets clients switch to the variant as soon as it exists
+FALLBACK_CACHE = 'public, no-cache'
+# Older uploads (named by upload time) may be replaced in place
+REVALIDATE_CACHE = 'public, no-cache'
+
+CONTENT_ADDRESSED = re.compile(r'[0-9a-f]{2}/(?P<sha>[0-9a-f]{64})(?P<variant>@\d+w)?\.[a-z0-9]+')
+
+
+def cache_control_for(filename, served, width=None):
+    if width is not None:
+        final = served != filename or width > max(VARIANT_WIDTHS)
+        return RESOLVED_CACHE if final else FALLBACK_CACHE
+    return IMMUTABLE_CACHE if CONTENT_ADDRESSED.fullmatch(filename) else REVALIDATE_CACHE
+
+
+def _accel_redirect(prefix, filename):
+    response = current_app.response_class(
+        mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    )
+    response.headers['X-Accel-Redirect'] = prefix.rstrip('/') + '/' + quote(filename)
+    return response
+
+
+@uploads_bp.route('/uploads/<path:filename>')
+def uploaded_file(filename):
+    """Serve uploaded files; ?w=<px> picks the best pre-rendered variant"""
+    folder = current_app.config['UPLOAD_FOLDER']
+    width = request.args.get('w', type=int)
+    resolved = width is not None and width > 0
+    served = resolve_variant(folder, filename, width, request.accept_mimetypes) if resolved else filename
+    path = safe_join(folder, served)
+    if path is None or not os.path.isfile(path):
+        abort(404)
+
+    accel_prefix = current_app.config.get('UPLOAD_ACCEL_REDIRECT')
+    if accel_prefix:
+        response = _accel_redirect(accel_prefix, served)
+    else:
+        match = CONTENT_ADDRESSED.fullmatch(served)
+        # The content hash is a strong validator for an original upload
+        etag = match['sha'] if match and not match['variant'] else True
+        response = send_from_directory(folder, served, etag=etag, conditional=True)
+        response.accept_ranges = 'bytes'
+    response.headers['Cache-Control'] = cache_control_for(filename, served, width if resolved else None)
+    if resolved:
+        response.vary.add('Accept')
+    return response
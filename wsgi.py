@@ -0,0 +1,8 @@
+"""WSGI entry point for production servers.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+``python app.py`` runs the single-process development server with the
+debugger; use this (or asgi.py) to serve real traffic.
+"""
+from app import app  # noqa: F401